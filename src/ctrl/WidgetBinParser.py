@@ -14,10 +14,13 @@ from PyQt6 import QtWidgets
 
 from ctrl.qtapp import AppCtrl
 from ctrl.qtapp import AutoRefreshTimer
+from ctrl.qtapp import ExprCompleter
 from ctrl.qtapp import HistoryMenu
 from ctrl.qtapp import set_app_title
 from helper import qtmodel
 from modules.expr_parser import InvalidExpression
+from modules.expr_parser import split_slice_expr
+from modules.utils.column import ArrayColumn
 from modules.utils.typ import Stream
 from plugins import loadpdb
 from view import WidgetBinParser
@@ -64,6 +67,7 @@ class BinParser(QtWidgets.QWidget):
         self.ui.btnParse.clicked.connect(self._onBtnParseClicked)
         self.ui.checkParseTable.clicked.connect(self._onCheckParseTableClicked)
         self.ui.lineStruct.returnPressed.connect(self._onBtnParseClicked)
+        self._completer = ExprCompleter(self.ui.lineStruct, self._completeExpr)
         self.ui.lineOffset.returnPressed.connect(self._onBtnParseClicked)
         self.ui.lineOffset.editingFinished.connect(self._onLineOffsetChanged)
         self.ui.btnToggleHex.clicked.connect(self._onBtnToggleHexClicked)
@@ -86,6 +90,9 @@ class BinParser(QtWidgets.QWidget):
             "table": AutoRefreshTimer(self, self.ui.tableView),
         }
 
+    def _completeExpr(self, text: str) -> list[str]:
+        return self.app.plugin(loadpdb.LoadPdb).complete_expr(text)
+
     @property
     def var_watcher(self):
         tab = self.ui.stackedWidget.currentWidget()
@@ -254,7 +261,8 @@ class BinParser(QtWidgets.QWidget):
         self.setEnabled(False)
 
         if pdb.is_loading():
-            QtCore.QTimer.singleShot(100, self._onBtnParseClicked)
+            # parsed once the PDB is loaded
+            pdb.loadFinished.connect(lambda _: self._onBtnParseClicked(), QtCore.Qt.ConnectionType.SingleShotConnection)
             return
 
         def _cb_table(res):
@@ -310,7 +318,17 @@ class BinParser(QtWidgets.QWidget):
 
         count = self.ui.spinParseCount.value()
 
-        if self.ui.checkParseTable.isChecked():
+        if self.ui.checkParseTable.isChecked() and split_slice_expr(structname) is not None:
+            # ie: g_table.entries[0:100], the count is given by the slice
+            self.app.exec_async(
+                pdb.query_column,
+                structname,
+                virtual_base=self.viewAddress + self.parse_offset,
+                io_stream=self.fileio,
+                finished_cb=_cb_table,
+                errored_cb=_err,
+            )
+        elif self.ui.checkParseTable.isChecked():
             self.app.exec_async(
                 pdb.parse_expr_to_table,
                 structname,
@@ -364,9 +382,12 @@ class BinParser(QtWidgets.QWidget):
             self.ui.treeView.resizeColumnToContents(c)
         return model
 
-    def _load_table(self, data: list) -> qtmodel.StructTableModel:
+    def _load_table(self, data: list | ArrayColumn) -> qtmodel.StructTableModel:
         self.ui.stackedWidget.setCurrentWidget(self.ui.pageTable)
-        model = qtmodel.StructTableModel(data)
+        if isinstance(data, ArrayColumn):
+            model = qtmodel.ColumnTableModel([data])
+        else:
+            model = qtmodel.StructTableModel(data)
         model.toggleHexMode(self.ui.btnToggleHex.isChecked())
         if self.fileio:
             model.loadStream(self.fileio)
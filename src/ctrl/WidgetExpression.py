@@ -8,11 +8,13 @@ from PyQt6 import QtWidgets
 
 from ctrl.qtapp import AppCtrl
 from ctrl.qtapp import AutoRefreshTimer
+from ctrl.qtapp import ExprCompleter
 from ctrl.qtapp import HistoryMenu
 from ctrl.qtapp import set_app_title
 from ctrl.WidgetBinParser import BinParser
 from helper import qtmodel
 from modules.expr_parser import InvalidExpression
+from modules.utils.profiling import dump_profiles
 from plugins import debugger
 from plugins import dock
 from plugins import loadpdb
@@ -54,6 +56,7 @@ class Expression(QtWidgets.QWidget):
         # event bindingd
         self.installEventFilter(self)
         self.ui.lineStruct.returnPressed.connect(self._addExpression)
+        self._completer = ExprCompleter(self.ui.lineStruct, self._completeExpr)
         self.ui.btnParse.clicked.connect(self._addExpression)
         # self.ui.treeView.expanded.connect(lambda: self.ui.treeView.resizeColumnToContents(0))
         self.ui.btnToggleHex.toggled.connect(self._onBtnToggleHexClicked)
@@ -64,9 +67,13 @@ class Expression(QtWidgets.QWidget):
 
         self._init_ui()
 
+        self._reloading = set()
         self.var_watcher = AutoRefreshTimer(self, self.ui.treeView)
         self.var_watcher.timeOut.connect(self._onAutoRefreshTimeout)
 
+    def _completeExpr(self, text: str) -> list[str]:
+        return self.app.plugin(loadpdb.LoadPdb).complete_expr(text)
+
     def _init_ui(self):
         pdb = self.app.plugin(loadpdb.LoadPdb)
         empty_struct = pdb.parse_expr_to_struct("")
@@ -101,6 +108,9 @@ class Expression(QtWidgets.QWidget):
                         model = self.ui.treeView.model()
                         model.removeRow(indexes[0].row(), indexes[0].parent())
                         return True
+                case (CTRL, QtCore.Qt.Key.Key_V):
+                    self.pasteExpressions()
+                    return True
         else:
             match (modifiers, key):
                 case (CTRL, QtCore.Qt.Key.Key_L):
@@ -137,6 +147,7 @@ class Expression(QtWidgets.QWidget):
         model = self.ui.treeView.model()
         if not isinstance(model, qtmodel.StructTreeModel):
             return
+        self._reloadIfOutdated(i)
         if model.rowCount(i) == 0:
             # to avoid logging too much things, only log the specific data having no children item
             item = model.itemFromIndex(i)
@@ -146,7 +157,10 @@ class Expression(QtWidgets.QWidget):
 
     def _try_get_virtual_base(self, cb=None, err_cb=None) -> int | None:
         try:
-            return self.debugger.get_virtual_base()
+            virt_base = self.debugger.get_virtual_base()
+            # the other modules are at their own bases
+            self.app.plugin(loadpdb.LoadPdb).load_module_bases(self.debugger)
+            return virt_base
         except OSError as e:
             if callable(err_cb):
                 err_cb(e)
@@ -173,6 +187,10 @@ class Expression(QtWidgets.QWidget):
             if rtn == QtWidgets.QMessageBox.StandardButton.Yes:
                 self.app.run_cmd("AttachCurrentProcess", callback=cb)
 
+    def addExpression(self, expr: str):
+        self.ui.lineStruct.setText(expr)
+        self._addExpression()
+
     def _addExpression(self):
         pdb = self.app.plugin(loadpdb.LoadPdb)
 
@@ -204,6 +222,7 @@ class Expression(QtWidgets.QWidget):
             expr=expr,
             virtual_base=virt_base,
             io_stream=self.debugger.get_memory_stream(),
+            profile=self.profiling,
             finished_cb=_cb,
             errored_cb=functools.partial(_err, self),
             block_UIs=[
@@ -234,36 +253,127 @@ class Expression(QtWidgets.QWidget):
         if virt_base is None:
             return
             
-        def _cb(struct_record, index):
-            item = index.internalPointer()
-            if struct_record is None:
-                item["_is_invalid"] = True
-                return
-            if struct_record is None:
+        indexes = [ind for ind in indexes if ind.column() == 0]
+        exprs = [model.data(ind) for ind in indexes]
+        if not exprs:
+            return
+        items = [model.itemFromIndex(ind) for ind in indexes]
+        self._reloading.update(id(x) for x in items)
+
+        def _cb(struct_records):
+            self._reloading.difference_update(id(x) for x in items)
+            if struct_records is None:
                 return
-            item["_is_invalid"] = False
             if isinstance(model, qtmodel.StructTreeModel):
                 model.loadStream(self.debugger.get_memory_stream())
-                model.setItem(struct_record, index)
+            errors = []
+            for index, expr, struct_record in zip(indexes, exprs, struct_records):
+                item = index.internalPointer()
+                if struct_record is None:
+                    # address chain not changed, only the values need reading
+                    if isinstance(model, qtmodel.StructTreeModel):
+                        model.refreshIndex(index)
+                    continue
+                if isinstance(struct_record, Exception):
+                    item["_is_invalid"] = True
+                    errors.append("%s: %s" % (expr, struct_record))
+                    continue
+                item["_is_invalid"] = False
+                if isinstance(model, qtmodel.StructTreeModel):
+                    model.setItem(struct_record, index)
+            self._warnExprErrors(errors)
+
+        logger.debug("Reload: %r (Virtual Base = %s)" % (exprs, hex(virt_base)))
+
+        def _err_reload(err, traceback):
+            self._reloading.difference_update(id(x) for x in items)
+            _err(self, err, traceback)
 
-        for ind in indexes:
-            if ind.column() != 0:
-                continue
-            expr = self.ui.treeView.model().data(ind)
+        self.app.exec_async(
+            pdb.reload_structs,
+            structs=[x.copy() for x in items],
+            exprs=exprs,
+            virtual_base=virt_base,
+            io_stream=self.debugger.get_memory_stream(),
+            profile=self.profiling,
+            finished_cb=_cb,
+            errored_cb=_err_reload,
+            block_UIs=[
+                self.ui.treeView,
+            ],
+        )
 
-            logger.debug("Reload: %r (Virtual Base = %s)" % (expr, hex(virt_base)))
+    def _reloadIfOutdated(self, index: QtCore.QModelIndex):
+        """re-query the expression only if any pointer along its address chain has changed"""
+        while index.parent().isValid():
+            index = index.parent()
+        model = self.ui.treeView.model()
+        item = model.itemFromIndex(index)
+        if "_depends" not in item or id(item) in self._reloading:
+            return
+        try:
+            virt_base = self.debugger.get_virtual_base()
+        except (OSError, debugger.ProcessNotConnected):
+            return
+        pdb = self.app.plugin(loadpdb.LoadPdb)
+        if pdb.is_struct_outdated(item, virt_base, self.debugger.get_memory_stream()):
+            logger.debug("Outdated: %r" % item["expr"])
+            self.reloadExpressions([index])
 
-            self.app.exec_async(
-                pdb.query_struct,
-                expr=expr,
-                virtual_base=virt_base,
-                io_stream=self.debugger.get_memory_stream(),
-                finished_cb=functools.partial(_cb, index=ind),
-                errored_cb=functools.partial(_err, self),
-                block_UIs=[
-                    self.ui.treeView,
-                ],
-            )
+    def pasteExpressions(self):
+        """add all the expressions from clipboard, one expression per line"""
+        pdb = self.app.plugin(loadpdb.LoadPdb)
+        text = QtGui.QGuiApplication.clipboard().text()
+        exprs = [x.strip() for x in text.splitlines() if x.strip()]
+        if not exprs:
+            return
+
+        virt_base = self._try_get_virtual_base(self.pasteExpressions)
+        if virt_base is None:
+            return
+
+        def _cb(struct_records):
+            if struct_records is None:
+                return
+            model = self.ui.treeView.model()
+            if not isinstance(model, qtmodel.StructTreeModel):
+                return
+            model.loadStream(self.debugger.get_memory_stream())
+            errors = []
+            for expr, struct_record in zip(exprs, struct_records):
+                if isinstance(struct_record, Exception):
+                    errors.append("%s: %s" % (expr, struct_record))
+                    continue
+                self.parse_hist.add_data(expr)
+                model.appendItem(struct_record)
+            for c in range(2, model.columnCount()):
+                self.ui.treeView.resizeColumnToContents(c)
+            self._warnExprErrors(errors)
+
+        logger.debug("Paste: %r (Virtual Base = %s)" % (exprs, hex(virt_base)))
+
+        self.app.exec_async(
+            pdb.query_structs,
+            exprs=exprs,
+            virtual_base=virt_base,
+            io_stream=self.debugger.get_memory_stream(),
+            profile=self.profiling,
+            finished_cb=_cb,
+            errored_cb=functools.partial(_err, self),
+            block_UIs=[
+                self.ui.lineStruct,
+                self.ui.treeView,
+            ],
+        )
+
+    def _warnExprErrors(self, errors: list[str]):
+        if not errors:
+            return
+        QtWidgets.QMessageBox.warning(
+            self,
+            self.__class__.__name__,
+            self.tr("Invalid Expression: %s") % "\n".join(errors),
+        )
 
     def _change_expr(self, index):
         pdb = self.app.plugin(loadpdb.LoadPdb)
@@ -290,6 +400,7 @@ class Expression(QtWidgets.QWidget):
             expr=item["expr"],
             virtual_base=virt_base,
             io_stream=self.debugger.get_memory_stream(),
+            profile=self.profiling,
             finished_cb=_cb,
             errored_cb=functools.partial(_err, self),
             block_UIs=[
@@ -366,6 +477,10 @@ class Expression(QtWidgets.QWidget):
             action = menu.addAction(self.tr("Copy Expression"))
             action.triggered.connect(lambda: QtGui.QGuiApplication.clipboard().setText(item["expr"]))
 
+        action = menu.addAction(self.tr("Paste Expressions"))
+        action.setEnabled(bool(QtGui.QGuiApplication.clipboard().text()))
+        action.triggered.connect(self.pasteExpressions)
+
         menu.addSeparator()
 
         if len(indexes):
@@ -429,6 +544,27 @@ class Expression(QtWidgets.QWidget):
         stream.seek(item["address"])
         return stream.read(item["size"])
 
+    @property
+    def profiling(self) -> bool:
+        model = self.ui.treeView.model()
+        return isinstance(model, qtmodel.StructTreeModel) and model.profiling
+
+    def setProfiling(self, enabled: bool):
+        """attach the query and value reading cost to every expression queried from now on"""
+        model = self.ui.treeView.model()
+        if isinstance(model, qtmodel.StructTreeModel):
+            model.profiling = enabled
+
+    def dumpProfiles(self):
+        model = self.ui.treeView.model()
+        if not isinstance(model, qtmodel.StructTreeModel):
+            return
+        profiles = list(model.iterProfiles())
+        if not profiles:
+            logger.info("No expression profiled, enable profiling and add the expressions again")
+            return
+        logger.info("Expression profiles (time in ms):\n%s" % dump_profiles(profiles))
+
     def refreshTree(self, index: QtCore.QModelIndex):
         index = index or QtCore.QModelIndex()
         model = self.ui.treeView.model()
@@ -6,10 +6,12 @@ from PyQt6 import QtGui
 from PyQt6 import QtWidgets
 
 from ctrl.qtapp import AppCtrl
+from ctrl.qtapp import ExprCompleter
 from ctrl.qtapp import HistoryMenu
 from ctrl.qtapp import set_app_title
 from helper import qtmodel
 from modules.expr_parser import InvalidExpression
+from modules.expr_parser import evaluate_int_expr
 from plugins import debugger
 from plugins import loadpdb
 from view import WidgetMemory
@@ -41,6 +43,10 @@ class Memory(QtWidgets.QWidget):
 
         self.ui.lineAddress.returnPressed.connect(self._loadMemory)
         self.ui.lineSize.returnPressed.connect(self._loadMemory)
+        self._completers = [
+            ExprCompleter(self.ui.lineAddress, self._completeExpr),
+            ExprCompleter(self.ui.lineSize, self._completeExpr),
+        ]
         self.ui.comboItemColumn.currentTextChanged.connect(self._onItemColumnChanged)
         self.ui.comboItemSize.currentIndexChanged.connect(self._onItemColumnSize)
         self.ui.tableMemory.setItemDelegate(qtmodel.BorderItemDelegate())
@@ -63,12 +69,16 @@ class Memory(QtWidgets.QWidget):
                 return
         e.accept()
 
+    def _completeExpr(self, text: str) -> list[str]:
+        return self.app.plugin(loadpdb.LoadPdb).complete_expr(text)
+
     def inputAddress(self) -> int:
-        with suppress(Exception):
-            return eval(self.ui.lineAddress.text())
+        with suppress(InvalidExpression):
+            return evaluate_int_expr(self.ui.lineAddress.text())
         try:
             pdb = self.app.plugin(loadpdb.LoadPdb)
             virt_base = self.debugger.get_virtual_base()
+            pdb.load_module_bases(self.debugger)
             stream = self.debugger.get_memory_stream()
             return int(pdb.query_cstruct(self.ui.lineAddress.text(), virt_base, stream))
         except InvalidExpression as e:
@@ -96,11 +106,12 @@ class Memory(QtWidgets.QWidget):
         return model.viewSize
 
     def inputSize(self) -> int:
-        with suppress(Exception):
-            return eval(self.ui.lineSize.text())
+        with suppress(InvalidExpression):
+            return evaluate_int_expr(self.ui.lineSize.text())
         try:
             pdb = self.app.plugin(loadpdb.LoadPdb)
             virt_base = self.debugger.get_virtual_base()
+            pdb.load_module_bases(self.debugger)
             stream = self.debugger.get_memory_stream()
             return int(pdb.query_cstruct(self.ui.lineSize.text(), virt_base, stream))
         except ValueError:
@@ -235,4 +246,4 @@ if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
     window = Memory(None, None)
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
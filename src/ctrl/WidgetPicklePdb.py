@@ -9,7 +9,7 @@ from PyQt6 import QtWidgets
 from ctrl.qtapp import AppCtrl
 from ctrl.qtapp import set_app_title
 from helper import qtmodel
-from modules.pdbparser.pdbparser import picklepdb
+from modules.pdbloader import PdbConverter
 from view import WidgetPicklePdb
 from view import resource
 
@@ -28,10 +28,19 @@ class PicklePdb(QtWidgets.QWidget):
         self.ui.btnOpenFolder.clicked.connect(self._open_folder)
         self.ui.btnGenerateSelected.clicked.connect(self._generate_pdbin)
         self.ui.btnLoadSelected.clicked.connect(self._load_pdbin)
+        self.ui.treePdb.setContextMenuPolicy(QtCore.Qt.ContextMenuPolicy.CustomContextMenu)
+        self.ui.treePdb.customContextMenuRequested.connect(self._onContextMenuOpened)
+
+        self._converter: PdbConverter | None = None
+        self._convert_timer = QtCore.QTimer(self)
+        self._convert_timer.setInterval(100)
+        self._convert_timer.timeout.connect(self._on_convert_progress)
 
         if app and (val := self.app.app_setting.value("LoadPdb/pdbin", "")):
             self.setEnabled(False)
-            loaded_db_folder = Path(val).parent.parent  # TARGET/vsdbg/xx.pdbin
+            # TARGET/.vsdbg/<hash>/xx.pdbin, or TARGET/.vsdbg/xx.pdbin of before
+            loaded = Path(val)
+            loaded_db_folder = next((x.parent for x in loaded.parents if x.name == ".vsdbg"), loaded.parent.parent)
             QtCore.QTimer.singleShot(0, lambda: self._open_folder(loaded_db_folder))
 
     def _open_folder(self, folder=""):
@@ -62,55 +71,86 @@ class PicklePdb(QtWidgets.QWidget):
         self.setEnabled(True)
 
     def _generate_pdbin(self):
+        if self._converter is not None:
+            return
         indexes = [x for x in self.ui.treePdb.selectedIndexes() if x.column() == 0]
         model = self.ui.treePdb.model()
         if indexes and isinstance(model, qtmodel.FileExplorerModel):
             files = [model.itemFromIndex(x) for x in indexes]
-            logging.info("Generate: %r" % [model.itemFromIndex(x) for x in indexes])
-
-            def progressing():
-                val = self.ui.progressBar.value()
-                self.ui.progressBar.setValue(val + 1)
-
-            timer = QtCore.QTimer()
-            timer.timeout.connect(progressing)
-            timer.start(1000)
-
-            self.ui.progressBar.setMaximum(200)
-            def cb(res):
-                timer.stop()
-                self.ui.progressBar.setValue(200)
-                if res is None:
-                    return
-                QtWidgets.QMessageBox.information(
-                    self,
-                    self.__class__.__name__,
-                    "Generation Done!",
-                )
-                self._on_generated_done()
-
-            def err(e, tb):
-                self.ui.progressBar.setStyleSheet("QProgressBar::chunk {background: red}")
-                QtWidgets.QMessageBox.warning(
-                    self,
-                    self.__class__.__name__,
-                    tb + str(e),
-                )
-
+            files = [f for f in files if Path(f).suffix == ".pdb"]
+            if not files:
+                return
+            logging.info("Generate: %r" % files)
+
+            self._converter = PdbConverter(files, Path(self.ui.labelFolder.text()) / ".vsdbg")
+            self._converter.start()
+            self.ui.btnGenerateSelected.setEnabled(False)
+            self.ui.progressBar.setMaximum(1000)
             self.ui.progressBar.setValue(0)
             self.ui.progressBar.setPalette(self.palette())
             self.ui.progressBar.setStyleSheet("")
-            self.app.exec_async(
-                picklepdb.convert_pdbs,
-                pdb_files = files,
-                out_dir = Path(self.ui.labelFolder.text()) / ".vsdbg",
-                finished_cb=cb,
-                errored_cb=err,
-                block_UIs=[
-                    self.ui.treePdb,
-                    self.ui.btnGenerateSelected,
-                ],
+            self._convert_timer.start()
+
+    def _on_convert_progress(self):
+        converter = self._converter
+        if converter is None:
+            return
+        for ev in converter.poll():
+            if ev.stage in {"done", "failed", "cancelled"}:
+                logging.info("Generate %s: %r %s" % (ev.stage, ev.file, ev.error))
+        self.ui.progressBar.setValue(int(converter.fraction() * 1000))
+        running = [Path(ev.file).name for ev in converter.progress.values() if ev.stage in {"parse", "types", "write"}]
+        ended = sum(ev.stage in {"done", "failed", "cancelled"} for ev in converter.progress.values())
+        self.ui.progressBar.setFormat("%d/%d %s" % (ended, len(converter.progress), ", ".join(running)))
+        if not converter.finished:
+            return
+
+        self._convert_timer.stop()
+        converter.shutdown()
+        self._converter = None
+        self.ui.btnGenerateSelected.setEnabled(True)
+        self.ui.progressBar.setFormat("%p%")
+        failed = ["%s: %s" % (Path(ev.file).name, ev.error) for ev in converter.progress.values() if ev.stage == "failed"]
+        if failed:
+            self.ui.progressBar.setStyleSheet("QProgressBar::chunk {background: red}")
+            QtWidgets.QMessageBox.warning(
+                self,
+                self.__class__.__name__,
+                "\n".join(failed),
             )
+        else:
+            QtWidgets.QMessageBox.information(
+                self,
+                self.__class__.__name__,
+                "Generation Done!",
+            )
+        self._on_generated_done()
+
+    def _onContextMenuOpened(self, position):
+        converter = self._converter
+        if converter is None:
+            return
+        model = self.ui.treePdb.model()
+        indexes = [x for x in self.ui.treePdb.selectedIndexes() if x.column() == 0]
+        files = [str(model.itemFromIndex(x)) for x in indexes]
+        files = [f for f in files if f in converter.progress]
+
+        menu = QtWidgets.QMenu()
+        action = menu.addAction(self.tr("Cancel Selected"))
+        action.setEnabled(bool(files))
+        action.triggered.connect(lambda: [converter.cancel(f) for f in files])
+        action = menu.addAction(self.tr("Cancel All"))
+        action.triggered.connect(converter.cancel_all)
+        menu.exec(self.ui.treePdb.viewport().mapToGlobal(position))
+
+    def closeEvent(self, a0: QtGui.QCloseEvent) -> None:
+        if self._converter is not None:
+            self._convert_timer.stop()
+            self._converter.cancel_all()
+            self._converter.shutdown()
+            self._converter = None
+            self.ui.btnGenerateSelected.setEnabled(True)
+        super().closeEvent(a0)
 
     def _on_generated_done(self):
         root = Path(self.ui.labelFolder.text())
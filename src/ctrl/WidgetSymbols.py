@@ -0,0 +1,94 @@
+import logging
+import re
+
+from PyQt6 import QtCore
+from PyQt6 import QtGui
+from PyQt6 import QtWidgets
+
+from ctrl.qtapp import AppCtrl
+from helper import qtmodel
+from modules.utils.myfunc import parse_int_literal
+from plugins import loadpdb
+from view import WidgetSymbols
+
+logger = logging.getLogger(__name__)
+
+
+class Symbols(QtWidgets.QWidget):
+    symbolActivated = QtCore.pyqtSignal(str)
+
+    def __init__(self, app: AppCtrl):
+        super().__init__()
+        self.ui = WidgetSymbols.Ui_Form()
+        self.ui.setupUi(self)
+        self.setWindowIcon(QtGui.QIcon(":icon/images/vswin2019/Database_16x.svg"))
+
+        self.app = app
+        self.model = qtmodel.SymbolTableModel(self)
+        self.ui.tableSymbols.setModel(self.model)
+        self.ui.tableSymbols.doubleClicked.connect(self._onDoubleClicked)
+        self.ui.tableSymbols.setContextMenuPolicy(QtCore.Qt.ContextMenuPolicy.CustomContextMenu)
+        self.ui.tableSymbols.customContextMenuRequested.connect(self._onContextMenuOpened)
+
+        # filtered once the typing pauses
+        self._filter_timer = QtCore.QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(200)
+        self._filter_timer.timeout.connect(self.applyFilter)
+        for line in (self.ui.lineName, self.ui.lineType, self.ui.lineFrom, self.ui.lineTo):
+            line.textChanged.connect(lambda _: self._filter_timer.start())
+        self.ui.chkRegex.toggled.connect(lambda _: self._filter_timer.start())
+
+        pdb = self.app.plugin(loadpdb.LoadPdb)
+        pdb.symbolTableBuilt.connect(self.applyFilter)
+        self.applyFilter()
+
+    def _offset(self, line: QtWidgets.QLineEdit) -> int | None:
+        if not line.text().strip():
+            return None
+        try:
+            return parse_int_literal(line.text())[0]
+        except ValueError:
+            return None
+
+    def applyFilter(self):
+        table = self.app.plugin(loadpdb.LoadPdb).get_symbol_table(wait=False)
+        if table is None:
+            self.model.setRows(None, ())
+            self.ui.labelCount.setText(self.tr("Not loaded"))
+            return
+        name = self.ui.lineName.text().strip()
+        regex = self.ui.chkRegex.isChecked()
+        try:
+            rows = table.select(
+                prefix="" if regex else name,
+                pattern=name if regex else "",
+                type_name=self.ui.lineType.text().strip(),
+                start=self._offset(self.ui.lineFrom),
+                end=self._offset(self.ui.lineTo),
+            )
+        except re.error as e:
+            self.ui.labelCount.setText(self.tr("Invalid regex: %s") % e)
+            return
+        self.model.setRows(table, rows)
+        self.ui.labelCount.setText(self.tr("%d of %d symbols") % (len(rows), len(table)))
+
+    def _onDoubleClicked(self, index: QtCore.QModelIndex):
+        name, _ = self.model.symbolFromIndex(index)
+        self.symbolActivated.emit(name)
+
+    def _onContextMenuOpened(self, position):
+        indexes = [i for i in self.ui.tableSymbols.selectedIndexes() if i.column() == 0]
+        if not indexes:
+            return
+        symbols = [self.model.symbolFromIndex(i) for i in indexes]
+
+        menu = QtWidgets.QMenu()
+        action = menu.addAction(self.tr("Add to Expression View"))
+        action.triggered.connect(lambda: [self.symbolActivated.emit(name) for name, _ in symbols])
+        menu.addSeparator()
+        action = menu.addAction(self.tr("Copy Name"))
+        action.triggered.connect(lambda: QtGui.QGuiApplication.clipboard().setText("\n".join(name for name, _ in symbols)))
+        action = menu.addAction(self.tr("Copy Offset"))
+        action.triggered.connect(lambda: QtGui.QGuiApplication.clipboard().setText("\n".join("%#x" % off for _, off in symbols)))
+        menu.exec(self.ui.tableSymbols.viewport().mapToGlobal(position))
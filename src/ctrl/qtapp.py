@@ -556,4 +556,39 @@ class AutoRefreshTimer(QtCore.QObject):
                 del self.auto_refresh_timers[i]
         if not self.auto_refresh_timers:
             self.parent().app.evt.apply_hook("WidgetTimerCleared", self.parent())
-        return len(indexes)
\ No newline at end of file
+        return len(indexes)
+
+
+class ExprCompleter(QtWidgets.QCompleter):
+    """popup of what `complete_fn` gives for the text before the cursor, each a whole new text"""
+
+    def __init__(self, line: QtWidgets.QLineEdit, complete_fn: Callable[[str], list[str]]):
+        super().__init__(line)
+        self.line = line
+        self._complete_fn = complete_fn
+        self._tail = ""
+        self._model = QtCore.QStringListModel(self)
+        self.setModel(self._model)
+        self.setCompletionMode(QtWidgets.QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setMaxVisibleItems(12)
+        self.setWidget(line)
+        self.activated.connect(self._onActivated)
+        line.textEdited.connect(self._onTextEdited)
+
+    def _onTextEdited(self, text: str):
+        pos = self.line.cursorPosition()
+        self._tail = text[pos:]
+        try:
+            candidates = self._complete_fn(text[:pos])
+        except Exception as e:
+            logger.debug("completion: %r", e)
+            candidates = []
+        self._model.setStringList(candidates)
+        if candidates:
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def _onActivated(self, text: str):
+        self.line.setText(text + self._tail)
+        self.line.setCursorPosition(len(text))
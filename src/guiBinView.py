@@ -146,6 +146,10 @@ class BinViewer(AppCtrl):
 
 
 if __name__ == '__main__':
+    # the worker processes of a frozen app start from here too
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     from argparse import ArgumentParser
     p = ArgumentParser()
     p.add_argument("files", nargs="*", default=[])
@@ -123,6 +123,10 @@ class VisualStudioDebugger(AppCtrl):
 
 
 if __name__ == '__main__':
+    # the worker processes of a frozen app start from here too
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     # https://stackoverflow.com/questions/1551605/how-to-set-applications-taskbar-icon-in-windows-7
     import ctypes
     myappid = __file__
@@ -3,6 +3,7 @@ import io
 import logging
 import math
 import os
+import time
 from collections import defaultdict
 from contextlib import suppress
 from pathlib import Path
@@ -14,10 +15,16 @@ from PyQt6 import QtCore
 from PyQt6 import QtGui
 from PyQt6 import QtWidgets
 
+from modules.expr_parser import InvalidExpression
+from modules.expr_parser import evaluate_int_expr
+from modules.symtable import SymbolTable
+from modules.utils.column import ArrayColumn
+from modules.utils.lazyrecord import LazyRecord
 from modules.utils.myfunc import BITMASK
 from modules.utils.myfunc import float_from_int
 from modules.utils.myfunc import hex2
 from modules.utils.myfunc import int_from_float
+from modules.utils.readplan import ReadPlanner
 from modules.utils.typ import Stream
 
 logger = logging.getLogger(__name__)
@@ -254,8 +261,8 @@ def _calc_val(fileio: Stream, item: dict) -> int:
     if not item.get("_refresh_requested", False) and item.get("value", None):
         # return cached value unless _refresh_requested set to True
         return item["value"]
-    if item.get("address", None) is None and item.get("value", None) is not None:
-        return item["value"]
+    if item.get("address", None) is None:
+        return item.get("value", None)
 
     base = item["address"]
     size = item["size"]
@@ -283,6 +290,44 @@ def _calc_val(fileio: Stream, item: dict) -> int:
     return val
 
 
+def _iter_pending_reads(items: Any):
+    for _, x in iter_children(items):
+        if not x.get("_refresh_requested", False) and x.get("value", None):
+            continue
+        if x.get("address", None) is None or not x.get("size", None) or x["size"] > 8:
+            continue
+        yield x["address"], x["size"]
+
+
+class ViewReader(ReadPlanner):
+    """
+    ReadPlanner for the view models, read blocks only live until the event loop
+    comes back, i.e. they are shared by all the items painted in one update.
+    """
+
+    def __init__(self, stream: Stream) -> None:
+        super().__init__(stream)
+        self._planned = None
+
+    def plan(self, items: Any) -> "ViewReader":
+        """prefetch all the values of sibling items in one go"""
+        if self._planned is None:
+            self._planned = set()
+            QtCore.QTimer.singleShot(0, self.invalidate)
+        if items is not None and id(items) not in self._planned:
+            self._planned.add(id(items))
+            self.prefetch(_iter_pending_reads(items))
+        return self
+
+    def read(self, size: int) -> bytes:
+        self.plan(None)
+        return super().read(size)
+
+    def invalidate(self):
+        self._planned = None
+        super().invalidate()
+
+
 class StructTreeModel(AbstractTreeModel):
     pointerDereferenced = QtCore.pyqtSignal(QtCore.QModelIndex, int)
     pvoidStructChanged = QtCore.pyqtSignal(QtCore.QModelIndex, int)
@@ -299,15 +344,21 @@ class StructTreeModel(AbstractTreeModel):
 
     def post_init(self):
         self.fileio = io.BytesIO()
+        self.reader = ViewReader(self.fileio)
         self.hex_mode = True
         self.allow_dereferece_pointer = False
         self.allow_edit_top_expr = True
+        self.profiling = False
         self._value_version = 0
         self.dataChanged.connect(self._onDataChanging)
 
     def child(self, row, parent):
         item = self.itemFromIndex(parent)
-        for r, (_, x) in enumerate(iter_children(item.get("fields", None))):
+        fields = item.get("fields", None)
+        if isinstance(fields, list):
+            # an array may form its elements on access, do not walk through
+            return fields[row] if 0 <= row < len(fields) else None
+        for r, (_, x) in enumerate(iter_children(fields)):
             if row == r:
                 return x
         return None
@@ -321,7 +372,7 @@ class StructTreeModel(AbstractTreeModel):
         if self.canFetchMore(index):
             return 1
 
-        if isinstance(item["fields"], list):
+        if isinstance(item["fields"], list) and "_visual" not in item:
             # TreeView calls `rowCount` before `index`
             # so just make a psuedo internal layer here
             child_cnt = len(item["fields"])
@@ -329,15 +380,23 @@ class StructTreeModel(AbstractTreeModel):
                 item["_count"] = child_cnt
                 childs = item["fields"]
                 item["fields"] = []
-                for off in range(0, child_cnt, 100):
+                base = item.get("_index_base", 0)
+                # at most 100 layers, a layer of more is split again once expanded
+                step = 100
+                while step * 100 < child_cnt:
+                    step *= 100
+                for off in range(0, child_cnt, step):
                     fake_layer = childs[0].copy()
                     fake_layer["expr"] = ""
-                    cnt = min(child_cnt, off + 99) - off + 1
-                    fake_layer["levelname"] = "[%d:%d]" % (off, min(child_cnt - 1, off + 99))
+                    fake_layer["value"] = None
+                    cnt = min(child_cnt, off + step) - off
+                    fake_layer["levelname"] = "[%d:%d]" % (base + off, base + off + cnt - 1)
+                    fake_layer["_index_base"] = base + off
                     fake_layer["type"] += "..."
-                    fake_layer["address"] += off * fake_layer["size"]
+                    if fake_layer["address"] is not None:
+                        fake_layer["address"] += off * fake_layer["size"]
                     fake_layer["size"] *= cnt
-                    fake_layer["fields"] = childs[off: off + 100]
+                    fake_layer["fields"] = childs[off: off + step]
                     item["fields"].append(fake_layer)
 
         return len(item["fields"]) if item["fields"] is not None else 0
@@ -390,9 +449,12 @@ class StructTreeModel(AbstractTreeModel):
             case QtCore.Qt.ItemDataRole.DisplayRole | QtCore.Qt.ItemDataRole.EditRole:
                 match tag:
                     case "value":
+                        if "_display" in item:
+                            return item["_display"]
                         if item["fields"] and item["size"] == len(item["fields"]):
                             # try display c-string
-                            values = [_calc_val(self.fileio, x) for _, x in iter_children(item["fields"])]
+                            reader = self.reader.plan(item["fields"])
+                            values = [_calc_val(reader, x) for _, x in iter_children(item["fields"])]
                             if all(x is not None and x <= 0xFF for x in values):
                                 data = bytes(values)
                                 if is_cstring(data):
@@ -400,7 +462,7 @@ class StructTreeModel(AbstractTreeModel):
                                     cstr = bytes_to_ascii(data[:end])
                                     if len(cstr) <= 64:
                                         return repr(cstr)
-                        val = _calc_val(self.fileio, item)
+                        val = self._calcVal(index, item)
                         if val is not None:
                             bitsz = item.get("bitsize", None) or item["size"] * 8
                             if self.hex_mode:
@@ -412,6 +474,8 @@ class StructTreeModel(AbstractTreeModel):
                         else:
                             return ""
                     case "count":
+                        if "_visual" in item:
+                            return item["_count"]
                         if isinstance(item["fields"], list):
                             return item.get("_count", len(item["fields"]))
                         if item["is_pointer"] and self.allow_dereferece_pointer:
@@ -423,13 +487,15 @@ class StructTreeModel(AbstractTreeModel):
                         else:
                             return str(val)
             case QtCore.Qt.ItemDataRole.ToolTipRole:
+                if profile := item.get("_profile", None):
+                    return "%s\n%s" % (item.get("expr", ""), profile.summary())
                 return item.get("expr", None)
             case QtCore.Qt.ItemDataRole.ForegroundRole:
                 # QTreeView request order:
                 #   - ForegroundRole
                 #   - DisplayRole, if we _calc_val here, ForegroundRole will be updated in the next cycle
                 #   - BackgroundRole
-                _calc_val(self.fileio, item)  # update value in advanced to render correct color
+                self._calcVal(index, item)  # update value in advanced to render correct color
                 if item.get("_is_invalid", False):
                     return
                 if tag == "value":
@@ -462,23 +528,26 @@ class StructTreeModel(AbstractTreeModel):
                     return True
                 elif tag == "value":
                     try:
-                        val = eval(value)
-                    except:
-                        return False
+                        val = evaluate_int_expr(value)
+                    except InvalidExpression:
+                        try:
+                            val = float(value)
+                        except ValueError:
+                            return False
 
                     base = item["address"]
                     size = item["size"]
                     boff = item["bitoff"]
                     bsize = item.get("bitsize", size * 8)
 
-                    if size is None or base == 0:
+                    if size is None or not base:
                         return False
 
                     if isinstance(val, float):
                         val = int_from_float(val, bsize)
 
-                    self.fileio.seek(base)
-                    old_val = int.from_bytes(self.fileio.read(size), "little")
+                    self.reader.seek(base)
+                    old_val = int.from_bytes(self.reader.read(size), "little")
                     if boff and bsize:
                         val = (val & BITMASK(bsize))
                         new_val = old_val & ~(BITMASK(bsize) << boff)
@@ -494,7 +563,7 @@ class StructTreeModel(AbstractTreeModel):
 
                     item["value"] = val
                     int_with_sign = item.get("has_sign", False) and not item.get("is_real", False)
-                    self.fileio.write(new_val.to_bytes(size, "little", signed=int_with_sign))
+                    self.reader.write(new_val.to_bytes(size, "little", signed=int_with_sign))
                     return True
                 elif tag == "type":
                     old_value = item.get(tag, "")
@@ -555,12 +624,14 @@ class StructTreeModel(AbstractTreeModel):
         return True
 
     def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
-        if not self.allow_dereferece_pointer:
-            return False
         item = self.itemFromIndex(parent)
         if item is None:
             return False
-        addr = _calc_val(self.fileio, item) or 0
+        if "_visual" in item:
+            return item["fields"] is None
+        if not self.allow_dereferece_pointer:
+            return False
+        addr = _calc_val(self.reader, item) or 0
         return (
             addr > 0
             and not item["type"].lower().endswith("pvoid")
@@ -569,6 +640,21 @@ class StructTreeModel(AbstractTreeModel):
         )
 
     def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+        item = self.itemFromIndex(parent)
+        if visual := item.get("_visual", None):
+            # visualized container, only the items of this range are formed
+            childs = visual.children(self.reader, *item.get("_visual_range", (0, visual.count)))
+            if "_raw_view" in item:
+                childs.insert(0, item["_raw_view"])
+            self.layoutAboutToBeChanged.emit()
+            if childs:
+                self.beginInsertRows(parent, 0, len(childs) - 1)
+                item["fields"] = childs
+                self.endInsertRows()
+            else:
+                item["fields"] = childs
+            self.layoutChanged.emit()
+            return
         self.insertRow(0, parent)
         index = self.index(0, 0, parent)
         item = self.itemFromIndex(index)
@@ -605,10 +691,14 @@ class StructTreeModel(AbstractTreeModel):
 
         def _clear_value(r: dict):
             r["_refresh_requested"] = True
+            if isinstance(r, LazyRecord) and not r.formed:
+                # no member has a value yet
+                return
             for _, c in iter_children(r["fields"]):
                 _clear_value(c)
 
         _clear_value(item)
+        self.reader.invalidate()
         self.refresh(index)
 
     def _onDataChanging(self, tl, br, roles=None):
@@ -623,12 +713,43 @@ class StructTreeModel(AbstractTreeModel):
 
     def loadStream(self, fileio: Stream):
         self.fileio = fileio
+        self.reader = ViewReader(fileio)
         self.refresh()
 
     def toggleHexMode(self, hexmode: bool):
         self.hex_mode = hexmode
         self.refresh()
 
+    def _siblingReader(self, index: QtCore.QModelIndex) -> ViewReader:
+        p_item = self.itemFromIndex(self.parent(index))
+        return self.reader.plan(p_item.get("fields", None))
+
+    def _topProfile(self, index: QtCore.QModelIndex):
+        while self.parent(index).isValid():
+            index = self.parent(index)
+        return self.itemFromIndex(index).get("_profile", None)
+
+    def _calcVal(self, index: QtCore.QModelIndex, item: dict) -> int:
+        """_calc_val, the cost is added to the profile of the top-level expression when profiling"""
+        profile = self._topProfile(index) if self.profiling else None
+        if profile is None:
+            return _calc_val(self._siblingReader(index), item)
+        read_count, read_bytes = self.reader.read_count, self.reader.read_bytes
+        start = time.perf_counter()
+        val = _calc_val(self._siblingReader(index), item)
+        profile.add_values(
+            self.reader.read_count - read_count,
+            self.reader.read_bytes - read_bytes,
+            time.perf_counter() - start,
+        )
+        return val
+
+    def iterProfiles(self):
+        """profiles of the top-level expressions, the ones not profiled are skipped"""
+        for _, x in iter_children(self._rootItem.get("fields", None)):
+            if profile := x.get("_profile", None):
+                yield profile
+
 
 class BorderItemDelegate(QtWidgets.QStyledItemDelegate):
     color = QtGui.QColor("#d8d8d8")
@@ -644,13 +765,26 @@ class BorderItemDelegate(QtWidgets.QStyledItemDelegate):
         painter.restore()
 
 
+# rows of a table shown at first, and added each time the view scrolls to the end
+FETCH_ROWS = 1024
+
+
 class StructTableModel(QtCore.QAbstractTableModel):
+    """
+    rows of the leaf records, the view gets them `FETCH_ROWS` at a time, so a
+    table of millions of rows starts as fast as a small one.
+    """
+
     def __init__(self, data: list, parent=None):
         super().__init__(parent)
         self.fileio = io.BytesIO()
+        self.reader = ViewReader(self.fileio)
         self.hex_mode = True
         self.char_mode = False
         self._data = data
+        self._fetched = min(len(data), FETCH_ROWS)
+        # by (row, column, role), the rows may be formed again
+        self._role_data = {}
         if isinstance(data, list) and data != []:
             self.titles = [x["expr"].replace(".", "\n.").lstrip() for x in data[0]]
         else:
@@ -669,10 +803,10 @@ class StructTableModel(QtCore.QAbstractTableModel):
         row = index.row()
         col = index.column()
         item = self._data[row][col]
-        if val := item.get("_role_data", {}).get(role, None):
+        if val := self._role_data.get((row, col, role), None):
             return val
         if role in {QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole}:
-            val = _calc_val(self.fileio, item)
+            val = _calc_val(self.reader.plan(self._data[row]), item)
             if val is not None:
                 if self.char_mode:
                     raw = val.to_bytes(item["size"], "little")
@@ -692,7 +826,7 @@ class StructTableModel(QtCore.QAbstractTableModel):
             #   - ForegroundRole
             #   - DisplayRole, if we _calc_val here, ForegroundRole will be updated in the next cycle
             #   - BackgroundRole
-            _calc_val(self.fileio, item)  # update value in advanced to render correct color
+            _calc_val(self.reader.plan(self._data[row]), item)  # update value in advanced to render correct color
             if not (self.flags(index) & QtCore.Qt.ItemFlag.ItemIsEnabled):
                 return
             if item.get("_changed_since_prev", False):
@@ -701,14 +835,9 @@ class StructTableModel(QtCore.QAbstractTableModel):
             #     return QtGui.QColor("blue")
 
     def setData(self, index: QtCore.QModelIndex, value: Any, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> bool:
-        row = index.row()
-        col = index.column()
-        item = self._data[row][col]
-        rd = item.get("_role_data")
-        if rd is None:
-            item["_role_data"] = {}
-        changed = item["_role_data"].get(role, None) != value
-        item["_role_data"][role] = value
+        key = (index.row(), index.column(), role)
+        changed = self._role_data.get(key, None) != value
+        self._role_data[key] = value
         return changed
 
     def _onDataChanging(self, tl, rb, roles=None):
@@ -718,6 +847,7 @@ class StructTableModel(QtCore.QAbstractTableModel):
                 row_data = self._data[row]
                 for col in range(tl.column(), rb.column() + 1):
                     row_data[col]["_refresh_requested"] = True
+            self.reader.invalidate()
 
     def flags(self, index: QtCore.QModelIndex):
         flags = super().flags(index)
@@ -725,11 +855,26 @@ class StructTableModel(QtCore.QAbstractTableModel):
         return flags
 
     def rowCount(self, parent=QtCore.QModelIndex()):
-        return len(self._data)
+        if parent.isValid():
+            return 0
+        return self._fetched
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         return len(self._data[0]) if self.rowCount() else 0
 
+    def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+        return not parent.isValid() and self._fetched < len(self._data)
+
+    def fetchMore(self, parent: QtCore.QModelIndex):
+        if parent.isValid():
+            return
+        count = min(FETCH_ROWS, len(self._data) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
     def refresh(self):
         tl = self.index(0, 0)
         br = self.index(self.rowCount() - 1, self.columnCount() - 1)
@@ -737,6 +882,7 @@ class StructTableModel(QtCore.QAbstractTableModel):
 
     def loadStream(self, fileio: Stream):
         self.fileio = fileio
+        self.reader = ViewReader(fileio)
         self.refresh()
 
     def toggleHexMode(self, hexmode: bool):
@@ -749,6 +895,9 @@ class StructTableModel(QtCore.QAbstractTableModel):
 
     def getTextFromIndexes(self, indexes: list[QtCore.QModelIndex]=None) -> str:
         if indexes is None:
+            # all the rows, also the ones the view has not fetched yet
+            while self.canFetchMore(QtCore.QModelIndex()):
+                self.fetchMore(QtCore.QModelIndex())
             indexes = [self.index(r, c) for r in range(self.rowCount()) for c in range(self.columnCount())]
         cols = sorted(set(i.column() for i in indexes))
         headers = [self.headerData(c, QtCore.Qt.Orientation.Horizontal) for c in cols]
@@ -763,12 +912,147 @@ class StructTableModel(QtCore.QAbstractTableModel):
         return csvf.getvalue()
 
 
+class ColumnTableModel(StructTableModel):
+    """
+    table of ArrayColumn, one row for each element in the slice,
+    all the cells are decoded from the block read of the columns.
+    """
+
+    def __init__(self, columns: list[ArrayColumn], parent=None):
+        super().__init__([], parent)
+        self.columns = columns
+        self.leaves = [x for c in columns for x in c.leaves()]
+        self.titles = [
+            (x.expr[len(c.expr):] or c.expr).replace(".", "\n.").lstrip()
+            for c in columns
+            for x in c.leaves()
+        ]
+        self._changed = [None] * len(self.leaves)
+        self._role_data = {}
+        self._reload_pending = False
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and orientation == QtCore.Qt.Orientation.Vertical:
+            index = self.leaves[0].index if self.leaves else None
+            return str(index[section] if index is not None else section)
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QtCore.QModelIndex, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        col = self.leaves[index.column()]
+        row = index.row()
+        if val := self._role_data.get((row, index.column(), role), None):
+            return val
+        if role in {QtCore.Qt.ItemDataRole.DisplayRole, QtCore.Qt.ItemDataRole.EditRole}:
+            val = col[row]
+            if isinstance(val, bytes):
+                return val.hex(" ") if self.hex_mode else str(val)
+            elif self.char_mode and isinstance(val, int):
+                return str((val & BITMASK(col.size * 8)).to_bytes(col.size, "little"))
+            elif self.hex_mode and isinstance(val, int):
+                bitsz = col.bitsize or col.size * 8
+                size = min(col.size, math.ceil(bitsz / 8))
+                return f"{{:#0{size * 2 + 2}x}}".format(val & BITMASK(bitsz))
+            else:
+                return str(val)
+        elif role == QtCore.Qt.ItemDataRole.FontRole:
+            return QtGui.QFont("Consolas")
+        elif role == QtCore.Qt.ItemDataRole.ForegroundRole:
+            changed = self._changed[index.column()]
+            if changed is not None and changed[row]:
+                return QtGui.QColor("red")
+
+    def setData(self, index: QtCore.QModelIndex, value: Any, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> bool:
+        key = (index.row(), index.column(), role)
+        changed = self._role_data.get(key, None) != value
+        self._role_data[key] = value
+        return changed
+
+    def _onDataChanging(self, tl, rb, roles=None):
+        roles = roles or []
+        if QtCore.Qt.ItemDataRole.UserRole in roles and not self._reload_pending:
+            # cells refreshed together share one read of the array span
+            self._reload_pending = True
+            QtCore.QTimer.singleShot(0, self.reloadColumns)
+
+    def reloadColumns(self):
+        self._reload_pending = False
+        old_values = [c.values for c in self.leaves]
+        for c in self.columns:
+            try:
+                c.reload(self.fileio)
+            except Exception as e:
+                logger.warning("Fail to reload %r: %s" % (c.expr, e))
+        self._changed = [old != c.values for old, c in zip(old_values, self.leaves)]
+        self.refresh()
+
+    def flags(self, index: QtCore.QModelIndex):
+        return QtCore.QAbstractTableModel.flags(self, index)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return len(self.leaves[0]) if self.leaves else 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.leaves)
+
+    def loadStream(self, fileio: Stream):
+        self.fileio = fileio
+        self.refresh()
+
+
 def get_icon(filename):
     fileInfo = QtCore.QFileInfo(filename)
     iconProvider = QtWidgets.QFileIconProvider()
     return iconProvider.icon(fileInfo)
 
 
+class SymbolTableModel(QtCore.QAbstractTableModel):
+    """`rows` of a SymbolTable, a cell is formed once painted"""
+    titles = ["Name", "Offset", "Size", "Type"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.table: SymbolTable | None = None
+        self.rows: Sequence[int] = ()
+
+    def setRows(self, table: SymbolTable | None, rows: Sequence[int]):
+        self.beginResetModel()
+        self.table = table
+        self.rows = rows if table is not None else ()
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return len(self.titles)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if role == QtCore.Qt.ItemDataRole.DisplayRole and orientation == QtCore.Qt.Orientation.Horizontal:
+            return self.titles[section]
+        return super().headerData(section, orientation, role)
+
+    def symbolFromIndex(self, index: QtCore.QModelIndex) -> tuple[str, int]:
+        row = int(self.rows[index.row()])
+        return self.table.names[row], int(self.table.offsets[row])
+
+    def data(self, index: QtCore.QModelIndex, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.table is None:
+            return
+        row = int(self.rows[index.row()])
+        col = index.column()
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return self.table.names[row]
+            elif col == 1:
+                return "{:#010x}".format(int(self.table.offsets[row]))
+            elif col == 2:
+                return str(self.table.size(row))
+            elif col == 3:
+                return self.table.type_name(int(self.table.type_ids[row]))
+        elif role == QtCore.Qt.ItemDataRole.FontRole and col in {1, 2}:
+            return QtGui.QFont("Consolas")
+
+
 class FileExplorerModel(AbstractTreeModel):
 
     headers = ["File"]
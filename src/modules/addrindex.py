@@ -0,0 +1,106 @@
+"""
+reverse lookup of the global symbols by address, i.e. to name a function pointer
+
+the offsets of the symbols are sorted once after load, an offset is looked up
+by bisect and one inside a symbol is named as `name+0x10`. the PDB gives no
+sizes, a symbol is taken to end where the next one starts, the last one only
+matches at its start. a pdbin v2 keeps the offsets sorted already.
+"""
+from typing import Callable
+from typing import Sequence
+
+import numpy as np
+
+from modules.utils.pdbin import MappedPdb
+from modules.utils.perpdb import per_pdb
+
+
+class AddressIndex:
+    """
+    symbols sorted by offset, the name of the i-th is `names[i]`, or `names(i)`
+    decoded once asked for.
+    """
+
+    def __init__(self, offsets: Sequence[int] | np.ndarray, names: Sequence[str] | Callable[[int], str]) -> None:
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self._name_of = names if callable(names) else names.__getitem__
+        self._names: dict[int, str] = {}
+        # the next greater offset, a symbol sharing the offset of another one ends there too
+        starts = np.unique(self.offsets)
+        nxt = np.searchsorted(starts, self.offsets, side="right")
+        self.ends = np.where(nxt < len(starts), starts[np.minimum(nxt, len(starts) - 1)], self.offsets)
+
+    @classmethod
+    def from_pdb(cls, p) -> "AddressIndex":
+        if isinstance(p, MappedPdb):
+            addresses = p.file.addresses
+            rows = np.flatnonzero(addresses["offset"] != 0)
+            return cls(addresses["offset"][rows], lambda i: p.file.name(int(addresses["symbol"][rows[i]])))
+        symbols = []
+        for name in p.glb_stream.symbols.keys():
+            try:
+                _, offset = p.get_lf_from_name(name)
+            except Exception:
+                continue
+            # not located, i.e. an imported one
+            if offset:
+                symbols.append((offset, name))
+        symbols.sort(key=lambda x: x[0])
+        return cls([x[0] for x in symbols], [x[1] for x in symbols])
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def name(self, i: int) -> str:
+        name = self._names.get(i, None)
+        if name is None:
+            name = self._names.setdefault(i, self._name_of(i))
+        return name
+
+    def locate(self, offsets: np.ndarray) -> np.ndarray:
+        """index of the symbol at or containing each of `offsets`, -1 if none"""
+        offsets = np.asarray(offsets, dtype=np.uint64)
+        if len(self.offsets) == 0:
+            return np.full(offsets.shape, -1, dtype=np.int64)
+        last = np.searchsorted(self.offsets, offsets, side="right") - 1
+        start = self.offsets[np.maximum(last, 0)]
+        found = (last >= 0) & ((offsets < self.ends[np.maximum(last, 0)]) | (offsets == start))
+        # the first one of those at the same offset, as `get_refname_from_offset`
+        first = np.searchsorted(self.offsets, start, side="left")
+        return np.where(found, first, -1).astype(np.int64)
+
+    def lookup(self, offset: int) -> tuple[str, int] | None:
+        """(name, displacement) of the symbol at or containing `offset`"""
+        if offset < 0:
+            return None
+        i = int(self.locate(np.array([offset], dtype=np.uint64))[0])
+        if i < 0:
+            return None
+        return self.name(i), offset - int(self.offsets[i])
+
+    def refname(self, offset: int) -> str | None:
+        found = self.lookup(offset)
+        if found is None:
+            return None
+        name, displacement = found
+        return name if displacement == 0 else "%s+0x%x" % (name, displacement)
+
+    def refnames(self, values: np.ndarray, base: int=0) -> list[str | None]:
+        """names of the pointer `values`, a whole table in one pass"""
+        values = np.asarray(values).astype(np.uint64)
+        valid = values >= np.uint64(base)
+        offsets = np.where(valid, values - np.uint64(base), 0)
+        found = np.where(valid, self.locate(offsets), -1)
+        displacements = offsets - self.offsets[np.maximum(found, 0)] if len(self.offsets) else offsets
+        out = []
+        for i, d in zip(found.tolist(), displacements.tolist()):
+            if i < 0:
+                out.append(None)
+            else:
+                out.append(self.name(i) if d == 0 else "%s+0x%x" % (self.name(i), d))
+        return out
+
+
+@per_pdb
+def get_address_index(p) -> AddressIndex:
+    return AddressIndex.from_pdb(p)
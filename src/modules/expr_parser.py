@@ -1,16 +1,47 @@
 import logging
 import os
 import re
+import threading
+import time
+from collections import Counter
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from dataclasses import replace
+from functools import cache
+from functools import lru_cache
+from functools import partial
 from typing import Any
+from typing import Callable
 from typing import NoReturn
 
+import numpy as np
 import tree_sitter_c as tsc
 from tree_sitter import Language
 from tree_sitter import Node
 from tree_sitter import Parser
 
+from modules.layoutcache import LayoutCache
+from modules.layoutcache import get_layout_cache
+from modules.pdbmodules import module_name
 from modules.pdbparser.pdbparser import pdb
+from modules.utils.column import ArrayColumn
+from modules.utils.column import column_dtype
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyrecord import LazyRecord
 from modules.utils.myfunc import BITMASK
+from modules.utils.myfunc import c_binary_op
+from modules.utils.myfunc import c_unary_op
+from modules.utils.myfunc import int_from_float
+from modules.utils.myfunc import parse_int_literal
+from modules.utils.myfunc import wrap_int
+from modules.utils.perpdb import per_pdb
+from modules.utils.profiling import ExprProfile
+from modules.utils.readplan import ReadPlanner
+from modules.utils.record import Record
 from modules.utils.typ import Stream
 
 logger = logging.getLogger(__name__)
@@ -27,8 +58,14 @@ class ArgumentError(Exception):
     """argument error"""
 
 
+_CMP_OPS = {"==", "!=", "<", ">", "<=", ">=", "&&", "||"}
+
+
 def _calc_val(fileio: Stream, item: pdb.StructRecord) -> Any:
     if item["value"] is not None:
+        if isinstance(fileio, _ReadRecorder) and "_raw" in item:
+            # value read in another evaluation, still a dependency here
+            fileio.reads.append(item["_raw"])
         return item["value"]
     if fileio is None:
         raise ArgumentError("You shall provide a io_stream")
@@ -39,20 +76,38 @@ def _calc_val(fileio: Stream, item: pdb.StructRecord) -> Any:
 
     fileio.seek(base)
     int_with_sign = item.get("has_sign", False) and not item.get("is_real", False)
-    val = int.from_bytes(fileio.read(size), "little", signed=int_with_sign)
+    data = fileio.read(size)
+    val = int.from_bytes(data, "little", signed=int_with_sign)
     if boff is not None and bsize is not None:
         val = (val >> boff) & BITMASK(bsize)
     item["value"] = val
+    item["_raw"] = (base, data)
 
     return val
 
 
+@cache
+def _c_language() -> Language:
+    return Language(tsc.language())
+
+
 def get_syntax_tree(src: str):
-    parser = Parser(Language(tsc.language()))
+    parser = Parser(_c_language())
     tree = parser.parse(src.encode())
     return tree
 
 
+def _pointer_address(io_stream: Stream | None, struct: pdb.StructRecord, ref_expr=b"", allow_null_pointer=False) -> int:
+    try:
+        _addr = _calc_val(io_stream, struct)
+    except OSError as e:
+        raise OSError("%s: 0x%x, %r" % (str(e), struct["address"], ref_expr))
+
+    if _addr == 0 and not allow_null_pointer:
+        raise InvalidExpression("Try to access pointer at address 0 for %r" % ref_expr)
+    return _addr
+
+
 def deref_pointer(p: pdb.PDB7, io_stream: Stream | None, struct: pdb.StructRecord, index: int | None, ref_expr=b"", allow_null_pointer=False) -> pdb.StructRecord:
     """
     index:
@@ -60,27 +115,18 @@ def deref_pointer(p: pdb.PDB7, io_stream: Stream | None, struct: pdb.StructRecor
         int: deref by x[n]
     """
 
-    if struct["value"] is None or struct["value"] == 0:
-        try:
-            _addr = _calc_val(io_stream, struct)
-        except OSError as e:
-            raise OSError("%s: 0x%x, %r" % (str(e), struct["address"], ref_expr))
-    else:
-        _addr = struct["value"]
-
-    if _addr == 0 and not allow_null_pointer:
-        raise InvalidExpression("Try to access pointer at address 0 for %r" % ref_expr)
+    _addr = _pointer_address(io_stream, struct, ref_expr, allow_null_pointer)
 
     if not struct.get("pointer_literal", False):
         try:
-            struct = p.tpi_stream.deref_pointer(struct["lf"], _addr, recursive=False)
+            struct = _layouts(p).deref(struct["lf"], _addr)
         except ValueError as e:
             raise InvalidExpression("%s at %r" % (e, ref_expr))
         except NotImplementedError as e:
             raise InvalidExpression("Fail to deref: %r" % ref_expr)
 
     assert isinstance(_addr, int), repr(_addr)
-    out_struct = p.tpi_stream.form_structs(struct["lf"], _addr, recursive=False)
+    out_struct = _layouts(p).form(struct["lf"], _addr)
     if index is not None:
         out_struct["levelname"] = "[%d]" % index
         out_struct["address"] += out_struct["size"] * index
@@ -100,234 +146,944 @@ def deref_pointer(p: pdb.PDB7, io_stream: Stream | None, struct: pdb.StructRecor
     return out_struct
 
 
-def query_struct_from_expr(p: pdb.PDB7, expr: str, virt_base=0, io_stream=None, allow_null_pointer=False) -> pdb.StructRecord:
-    if p is None:
-        return pdb.new_struct()
-    tree = get_syntax_tree(expr)
+class _ReadRecorder:
+    """stream wrapper recording every (address, data) read, i.e. what an evaluation depends on"""
+
+    def __init__(self, stream: Stream) -> None:
+        self.stream = stream
+        self.reads: list[tuple[int, bytes]] = []
+        self.read_count = 0
+        self.read_bytes = 0
+        self._offset = 0
+
+    def seek(self, offset: int, pos=os.SEEK_SET) -> int:
+        rtn = self.stream.seek(offset, pos)
+        if pos == os.SEEK_SET:
+            self._offset = offset
+        elif pos == os.SEEK_CUR:
+            self._offset += offset
+        else:
+            self._offset = rtn
+        return rtn
+
+    def tell(self) -> int:
+        return self._offset
 
-    def _get_value_of(x: pdb.StructRecord | int) -> int:
+    def read(self, size: int, record=True) -> bytes:
+        data = self.stream.read(size)
+        self.read_count += 1
+        self.read_bytes += len(data)
+        if record:
+            self.reads.append((self._offset, data))
+        self._offset += len(data)
+        return data
+
+    def write(self, buf: bytes) -> int:
+        return self.stream.write(buf)
+
+
+@dataclass(slots=True)
+class _EvalContext:
+    p: pdb.PDB7
+    virt_base: int
+    io_stream: Stream | None
+    allow_null_pointer: bool
+    bits: int
+    shared: set[bytes] | None = None
+    memo: dict[bytes, Any] = field(default_factory=dict)
+    profile: ExprProfile | None = None
+    this: int = 0
+
+    @property
+    def reads(self) -> list[tuple[int, bytes]]:
+        if isinstance(self.io_stream, _ReadRecorder):
+            return self.io_stream.reads
+        return []
+
+    def evaluate(self, node: "_Node") -> pdb.StructRecord | int:
+        """evaluate `node`, a shared prefix is only evaluated once per context"""
+        if self.shared is None or node.text not in self.shared:
+            return node.evaluate(self)
+        reads = self.reads
+        if node.text not in self.memo:
+            start = len(reads)
+            try:
+                result = node.evaluate(self)
+            except Exception as e:
+                result = e
+            self.memo[node.text] = (result, reads[start:])
+        else:
+            # the memory the shared prefix depends on, is also a dependency here
+            result, depends = self.memo[node.text]
+            reads.extend(depends)
+        if isinstance(result, Exception):
+            raise result.with_traceback(None)
+        return result
+
+    def value_of(self, x: pdb.StructRecord | int) -> int:
         if isinstance(x, dict):
-            return _calc_val(io_stream, x)
+            return _calc_val(self.io_stream, x)
         else:
             return x
 
-    def _walk_syntax_node(node: Node) -> pdb.StructRecord | int:
-        childs = node.children
-        match node.type:
-            case "translation_unit":
-                assert childs != [], "Translation Unit is empty."
-                assert len(childs) == 1 or childs[1].type == ";", "Translation Unit not support: %r" % node.text
-                return _walk_syntax_node(childs[0])
-            case "expression_statement":
-                assert len(childs) < 2 or childs[1].type == ";", "Expression/Statement not support: %r" % node.text
-                return _walk_syntax_node(childs[0])
-            case "ERROR":
-                assert len(childs) == 1, "Invalid syntax: %r" % node.text
-                return _walk_syntax_node(childs[0])
-            case "parenthesized_expression":
-                # assert childs[0].type == '(' and childs[2].type == ')', "Invalid syntax: %r" % node.text
-                assert len(childs) == 3, "Invalid syntax: %r" % node.text
-                return _walk_syntax_node(childs[1])
-            case "cast_expression":
-                # assert childs[0].type == '(' and childs[2].type == ')'
-                structname = childs[1].text.decode()
-                match = REG_STRUCT.match(structname)
-                if match is None:
-                    raise InvalidExpression("Bad struct casting: b%r" % structname)
-                if match["STAR"] is not None:
-                    # ie: xxx_def *
-                    lf, _ = p.get_lf_from_name(match.group("STRUCT"))
-                    pointer_literal = True
-                else:
-                    # ie: xxx_def_ptr
-                    lf, _ = p.get_lf_from_name(structname)
-                    pointer_literal = False
-                if lf is None:
-                    raise InvalidExpression("Bad struct casting: b%r" % structname)
-
-                right = _walk_syntax_node(childs[3])
-                address = _get_value_of(right)
-                struct = pdb.new_struct(
-                    type=structname,
-                    value=address,
-                    address=None,
-                    size=p.tpi_stream.ARCH_PTR_SIZE,
-                    is_pointer=True,
-                    lf=lf,
-                )
-                struct["pointer_literal"] = pointer_literal
-                return struct
-            case "pointer_expression":
-                # assert childs[0].type in {"&", "*"}
-                struct = _walk_syntax_node(childs[1])
-                if childs[0].type == "&":
-                    if isinstance(struct, dict):
-                        return struct["address"]
-                    elif isinstance(struct, int):
-                        return struct
-                    else:
-                        assert False, repr(node)
-                elif childs[0].type == "*":
-                    return deref_pointer(p, io_stream, struct, None, childs[1].text, allow_null_pointer)
-                else:
-                    assert False, repr(node)
-            case "field_expression":
-                # foo.bar
-                # foo->bar
-                struct = _walk_syntax_node(childs[0])
-                assert isinstance(struct, dict), "Not a struct: %r" % childs[0].text
-                notation = childs[1].type
-                field = childs[2].text.decode()
-                if notation == ".":
-                    assert struct["fields"] is not None, "Notation error for pointer: b'%s%s'" % (notation, field)
-                    assert not isinstance(struct["fields"], list), "Notation error for array: b'%s%s'" % (notation, field)
-                    sub_struct = struct["fields"][field]
-                elif notation == "->":
-                    struct = deref_pointer(p, io_stream, struct, None, childs[0].text, allow_null_pointer)
-                    assert isinstance(struct["fields"], dict), "Member not exists: b%r" % field
-                    sub_struct = struct["fields"][field]
-                else:
-                    raise NotImplementedError(node.text)
-                return p.tpi_stream.form_structs(
-                    sub_struct["lf"],
-                    addr=sub_struct["address"],
-                    recursive=False
-                )
-            case "subscript_expression":
-                # foo[0]
-                # assert childs[1].type == '[' and childs[3].type == ']'
-                struct = _walk_syntax_node(childs[0])
-                assert isinstance(struct, dict), "Fail to get index from: %r" % childs[0].text
-                index = _get_value_of(_walk_syntax_node(childs[2]))
-                if struct["fields"] is None:
-                    struct = deref_pointer(p, io_stream, struct, index, childs[0].text, allow_null_pointer)
-                assert isinstance(struct["fields"], list), "Shall be an array or pointer: %r" % childs[0]
-                try:
-                    sub_struct = struct["fields"][index]
-                except IndexError:
-                    raise InvalidExpression("Index out of range: b'[%d]'" % index)
-                return p.tpi_stream.form_structs(
-                    sub_struct["lf"],
-                    sub_struct["address"],
-                    recursive=False,
-                )
-            case "identifier":
-                structname = node.text.decode()
-                lf, offset = p.get_lf_from_name(structname)
-                assert lf is not None, "Identifier not found: %r" % structname
-                out_struct = p.tpi_stream.form_structs(lf, virt_base + offset, recursive=False)
-                return out_struct
-            case "type_identifier":
-                structname = node.text.decode()
-                lf, offset = p.get_lf_from_name(structname)
-                assert lf is not None, "Identifier not found: %r" % structname
-                out_struct = p.tpi_stream.form_structs(lf, virt_base + offset, recursive=False)
-                return out_struct
-            case "number_literal":
-                return eval(node.text.decode())
-            case "sizeof_expression":
-                struct = _walk_syntax_node(childs[1])
-                if isinstance(struct, int):
-                    return p.tpi_stream.ARCH_PTR_SIZE
-                elif isinstance(struct, dict):
-                    return struct["size"]
-                else:
-                    raise InvalidExpression("Fail to calculate: %r" % node.text)
-            case "binary_expression":
-                lhs = _walk_syntax_node(childs[0])
-                operator = childs[1].type
-                rhs = _walk_syntax_node(childs[2])
-                if isinstance(lhs, dict) and lhs["is_pointer"] and isinstance(rhs, int):
-                    # shift pointer by count
-                    if operator not in "+-":
-                        raise InvalidExpression("Invalid pointer movement: %r" % node.text)
-                    deref_struct = deref_pointer(p, io_stream, lhs, None, childs[0].text, allow_null_pointer)
-                    lhs["address"] = _get_value_of(lhs) + deref_struct["size"] * rhs * (-1 if operator == "-" else 1)
-                    return lhs
-                elif isinstance(lhs, dict) and isinstance(lhs["fields"], list) and isinstance(rhs, int):
-                    # shift array head by count
-                    if operator not in "+-":
-                        raise InvalidExpression("Invalid array movement: %r" % node.text)
-                    lhs = lhs["fields"][0]
-                    lhs["address"] += lhs["size"] * rhs * (-1 if operator == "-" else 1)
-                    lhs["levelname"] = "[%d]" % rhs
-                    return lhs
-                elif isinstance(lhs, dict) and operator == "&" and isinstance(rhs, dict):
-                    # (LHS)&RHS  -> cast address of RHS to LHS
-                    return ((1 << (8 * lhs["size"])) - 1) & rhs["address"]
-                else:
-                    left = _get_value_of(lhs)
-                    right = _get_value_of(rhs)
-                    match operator:
-                        case "&&":
-                            return int(left and right)
-                        case "||":
-                            return int(left or right)
-                        case _:
-                            return eval("int(%d %s %d)" % (left, operator, right))
-            case "update_expression":
-                # x ++
-                # x --
-                lhs = _walk_syntax_node(childs[0])
-                base_value = _get_value_of(lhs)
-                operator = childs[1].type
-                match operator:
-                    case "--":
-                        if isinstance(lhs, dict) and lhs["is_pointer"]:
-                            deref_struct = deref_pointer(p, io_stream, lhs, None, childs[0].text, allow_null_pointer)
-                            lhs["address"] = _get_value_of(lhs) - deref_struct["size"]
-                            return lhs
-                        else:
-                            return base_value - 1
-                    case "++":
-                        if isinstance(lhs, dict) and lhs["is_pointer"]:
-                            deref_struct = deref_pointer(p, io_stream, lhs, None, childs[0].text, allow_null_pointer)
-                            lhs["address"] = _get_value_of(lhs) + deref_struct["size"]
-                            return lhs
-                        else:
-                            return base_value + 1
-                    case _:
-                        raise InvalidExpression("Not support update expression: %r" % operator)
-            case "conditional_expression":
-                # x ? 1 : 2
-                assert childs[1].type == "?" and childs[3].type == ":", "Invalid syntax: " % node.text
-                cond = _get_value_of(_walk_syntax_node(childs[0]))
-                if bool(cond):
-                    return _walk_syntax_node(childs[2])
+    def form_structs(self, lf, addr: int, recursive=True) -> pdb.StructRecord:
+        if self.profile is not None:
+            self.profile.form_structs += 1
+        if recursive:
+            return self.p.tpi_stream.form_structs(lf, addr, recursive=True)
+        return _layouts(self.p).form(lf, addr)
+
+    def deref(self, struct: pdb.StructRecord, index: int | None, ref_expr: bytes) -> pdb.StructRecord:
+        if self.profile is not None:
+            self.profile.form_structs += 1
+        return deref_pointer(self.p, self.io_stream, struct, index, ref_expr, self.allow_null_pointer)
+
+
+@dataclass(slots=True)
+class _Node:
+    text: bytes
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord | int:
+        raise NotImplementedError(self.text)
+
+
+@dataclass(slots=True)
+class _Raise(_Node):
+    """error found while compiling, raised when the node is evaluated"""
+    error: Exception
+
+    def evaluate(self, ctx: _EvalContext) -> NoReturn:
+        raise self.error.with_traceback(None)
+
+
+@dataclass(slots=True)
+class _Number(_Node):
+    value: int
+    unsigned: bool = False
+
+    def evaluate(self, ctx: _EvalContext) -> int:
+        return self.value
+
+
+@dataclass(slots=True)
+class _Static(_Node):
+    """struct at a fixed offset, from the virtual base if `relative`, otherwise absolute"""
+    lf: Any
+    offset: int
+    relative: bool
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        base = ctx.virt_base if self.relative else 0
+        return ctx.form_structs(self.lf, base + self.offset, recursive=False)
+
+
+@dataclass(slots=True)
+class _Indirect(_Node):
+    """struct at a fixed offset from the address stored in `pointer`"""
+    pointer: _Node
+    ref_expr: bytes
+    lf: Any
+    offset: int
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        struct = ctx.evaluate(self.pointer)
+        assert isinstance(struct, dict), "Not a struct: %r" % self.ref_expr
+        addr = _pointer_address(ctx.io_stream, struct, self.ref_expr, ctx.allow_null_pointer)
+        return ctx.form_structs(self.lf, addr + self.offset, recursive=False)
+
+
+@dataclass(slots=True)
+class _This(_Node):
+    """struct at a fixed offset from `this`, the address a plan of `compile_this_expr` is evaluated at"""
+    lf: Any
+    offset: int
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        return ctx.form_structs(self.lf, ctx.this + self.offset, recursive=False)
+
+
+@dataclass(slots=True)
+class _Cast(_Node):
+    structname: str
+    lf: Any
+    pointer_literal: bool
+    operand: _Node
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        address = ctx.value_of(ctx.evaluate(self.operand))
+        struct = pdb.new_struct(
+            type=self.structname,
+            value=address,
+            address=None,
+            size=ctx.p.tpi_stream.ARCH_PTR_SIZE,
+            is_pointer=True,
+            lf=self.lf,
+        )
+        struct["pointer_literal"] = self.pointer_literal
+        return struct
+
+
+@dataclass(slots=True)
+class _AddressOf(_Node):
+    operand: _Node
+
+    def evaluate(self, ctx: _EvalContext) -> int:
+        struct = ctx.evaluate(self.operand)
+        if isinstance(struct, dict):
+            return struct["address"]
+        elif isinstance(struct, int):
+            return struct
+        else:
+            assert False, repr(self.text)
+
+
+@dataclass(slots=True)
+class _Deref(_Node):
+    operand: _Node
+    ref_expr: bytes
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        struct = ctx.evaluate(self.operand)
+        return ctx.deref(struct, None, self.ref_expr)
+
+
+@dataclass(slots=True)
+class _Field(_Node):
+    operand: _Node
+    ref_expr: bytes
+    notation: str
+    field: str
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        struct = ctx.evaluate(self.operand)
+        assert isinstance(struct, dict), "Not a struct: %r" % self.ref_expr
+        notation = self.notation
+        field = self.field
+        if notation == ".":
+            assert struct["fields"] is not None, "Notation error for pointer: b'%s%s'" % (notation, field)
+            assert not isinstance(struct["fields"], list), "Notation error for array: b'%s%s'" % (notation, field)
+            sub_struct = struct["fields"][field]
+        elif notation == "->":
+            struct = ctx.deref(struct, None, self.ref_expr)
+            assert isinstance(struct["fields"], dict), "Member not exists: b%r" % field
+            sub_struct = struct["fields"][field]
+        else:
+            raise NotImplementedError(self.text)
+        return ctx.form_structs(sub_struct["lf"], sub_struct["address"], recursive=False)
+
+
+@dataclass(slots=True)
+class _Subscript(_Node):
+    operand: _Node
+    ref_expr: bytes
+    index: _Node
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord:
+        struct = ctx.evaluate(self.operand)
+        assert isinstance(struct, dict), "Fail to get index from: %r" % self.ref_expr
+        index = ctx.value_of(ctx.evaluate(self.index))
+        if struct["fields"] is None:
+            struct = ctx.deref(struct, index, self.ref_expr)
+        assert isinstance(struct["fields"], list), "Shall be an array or pointer: %r" % self.ref_expr
+        try:
+            sub_struct = struct["fields"][index]
+        except IndexError:
+            raise InvalidExpression("Index out of range: b'[%d]'" % index)
+        return ctx.form_structs(sub_struct["lf"], sub_struct["address"], recursive=False)
+
+
+@dataclass(slots=True)
+class _SizeOf(_Node):
+    operand: _Node
+
+    def evaluate(self, ctx: _EvalContext) -> int:
+        struct = ctx.evaluate(self.operand)
+        if isinstance(struct, int):
+            return ctx.p.tpi_stream.ARCH_PTR_SIZE
+        elif isinstance(struct, dict):
+            return struct["size"]
+        else:
+            raise InvalidExpression("Fail to calculate: %r" % self.text)
+
+
+@dataclass(slots=True)
+class _Binary(_Node):
+    lhs: _Node
+    ref_expr: bytes
+    operator: str
+    rhs: _Node
+    unsigned: bool
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord | int:
+        lhs = ctx.evaluate(self.lhs)
+        operator = self.operator
+        rhs = ctx.evaluate(self.rhs)
+        if isinstance(lhs, dict) and lhs["is_pointer"] and isinstance(rhs, int):
+            # shift pointer by count
+            if operator not in "+-":
+                raise InvalidExpression("Invalid pointer movement: %r" % self.text)
+            deref_struct = ctx.deref(lhs, None, self.ref_expr)
+            return lhs | {"address": ctx.value_of(lhs) + deref_struct["size"] * rhs * (-1 if operator == "-" else 1)}
+        elif isinstance(lhs, dict) and isinstance(lhs["fields"], list) and isinstance(rhs, int):
+            # shift array head by count
+            if operator not in "+-":
+                raise InvalidExpression("Invalid array movement: %r" % self.text)
+            lhs = lhs["fields"][0]
+            return lhs | {
+                "address": lhs["address"] + lhs["size"] * rhs * (-1 if operator == "-" else 1),
+                "levelname": "[%d]" % rhs,
+            }
+        elif isinstance(lhs, dict) and operator == "&" and isinstance(rhs, dict):
+            # (LHS)&RHS  -> cast address of RHS to LHS
+            return ((1 << (8 * lhs["size"])) - 1) & rhs["address"]
+        else:
+            left = ctx.value_of(lhs)
+            right = ctx.value_of(rhs)
+            unsigned = self.unsigned or _is_unsigned_value(lhs) or _is_unsigned_value(rhs)
+            try:
+                return c_binary_op(operator, left, right, ctx.bits, unsigned)
+            except (ValueError, ZeroDivisionError) as e:
+                raise InvalidExpression(e)
+
+
+@dataclass(slots=True)
+class _Unary(_Node):
+    operator: str
+    operand: _Node
+    unsigned: bool
+
+    def evaluate(self, ctx: _EvalContext) -> int:
+        operand = ctx.evaluate(self.operand)
+        unsigned = self.unsigned or _is_unsigned_value(operand)
+        return c_unary_op(self.operator, ctx.value_of(operand), ctx.bits, unsigned)
+
+
+def _is_unsigned_value(x: pdb.StructRecord | int) -> bool:
+    return isinstance(x, dict) and not x.get("has_sign", False)
+
+
+def _is_unsigned_node(node: _Node) -> bool:
+    match node:
+        case _Number():
+            return node.unsigned
+        case _Binary():
+            return node.unsigned and node.operator not in _CMP_OPS
+        case _Unary():
+            return node.unsigned and node.operator != "!"
+        case _:
+            return False
+
+
+def _arch_bits(p: pdb.PDB7 | None) -> int:
+    if p is None:
+        return 64
+    return p.tpi_stream.ARCH_PTR_SIZE * 8
+
+
+def _binary_node(p: pdb.PDB7 | None, text: bytes, lhs: _Node, ref_expr: bytes, operator: str, rhs: _Node) -> _Node:
+    unsigned = _is_unsigned_node(lhs) or _is_unsigned_node(rhs)
+    if isinstance(lhs, _Number) and isinstance(rhs, _Number):
+        # constant folding
+        try:
+            val = c_binary_op(operator, lhs.value, rhs.value, _arch_bits(p), unsigned)
+        except (ValueError, ZeroDivisionError) as e:
+            return _Raise(text, InvalidExpression(e))
+        return _Number(text, val, unsigned and operator not in _CMP_OPS)
+    return _Binary(text, lhs, ref_expr, operator, rhs, unsigned)
+
+
+def _unary_node(p: pdb.PDB7 | None, text: bytes, operator: str, operand: _Node) -> _Node:
+    unsigned = _is_unsigned_node(operand)
+    if isinstance(operand, _Number):
+        # constant folding
+        try:
+            val = c_unary_op(operator, operand.value, _arch_bits(p), unsigned)
+        except (ValueError, ZeroDivisionError) as e:
+            return _Raise(text, InvalidExpression(e))
+        return _Number(text, val, unsigned and operator != "!")
+    return _Unary(text, operator, operand, unsigned)
+
+
+def _number_node(p: pdb.PDB7 | None, text: bytes) -> _Node:
+    try:
+        val, unsigned = parse_int_literal(text.decode(), _arch_bits(p))
+    except ValueError as e:
+        raise InvalidExpression(e)
+    return _Number(text, val, unsigned)
+
+
+@dataclass(slots=True)
+class _Update(_Node):
+    operand: _Node
+    ref_expr: bytes
+    operator: str
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord | int:
+        # x ++
+        # x --
+        lhs = ctx.evaluate(self.operand)
+        base_value = ctx.value_of(lhs)
+        match self.operator:
+            case "--":
+                if isinstance(lhs, dict) and lhs["is_pointer"]:
+                    deref_struct = ctx.deref(lhs, None, self.ref_expr)
+                    return lhs | {"address": ctx.value_of(lhs) - deref_struct["size"]}
                 else:
-                    return _walk_syntax_node(childs[4])
-            case "offsetof_expression":
-                # offset( type_descriptor, field_identifier )
-                structname = childs[2].text.decode()
-                member = childs[4].text.decode()
-                match = REG_STRUCT.match(structname)
-                assert match is not None, "Bad struct descriptor: b%r" % structname
-
-                lf, _ = p.get_lf_from_name(match.group("STRUCT"))
-                assert lf is not None, "Bad struct: b%r" % structname
-
-                struct = p.tpi_stream.form_structs(lf, 0, recursive=False)
-                if isinstance(struct, dict):
-                    assert struct["fields"] is not None, "Struct b%r has no member" % (structname)
-                    assert member in struct["fields"], "Member b%r not found in b%r" % (member, structname)
-                    if isinstance(struct["fields"], dict):
-                        return struct["fields"][member]["address"]
-                    else:
-                        raise NotImplementedError(struct["fields"])
+                    return base_value - 1
+            case "++":
+                if isinstance(lhs, dict) and lhs["is_pointer"]:
+                    deref_struct = ctx.deref(lhs, None, self.ref_expr)
+                    return lhs | {"address": ctx.value_of(lhs) + deref_struct["size"]}
                 else:
-                    raise NotImplementedError(struct)
-
-            case "macro_type_specifier":
-                raise InvalidExpression("Not support macro yet: %r" % node.text)
-            case "call_expression":
-                raise InvalidExpression("Not support function call yet: %r" % node.text)
-            case "assignment_expression":
-                raise InvalidExpression("Not support assignment yet: %r" % node.text)
+                    return base_value + 1
             case _:
-                raise InvalidExpression("Syntax not support: %r" % node)
+                raise InvalidExpression("Not support update expression: %r" % self.operator)
+
+
+@dataclass(slots=True)
+class _Conditional(_Node):
+    cond: _Node
+    consequence: _Node
+    alternative: _Node
+
+    def evaluate(self, ctx: _EvalContext) -> pdb.StructRecord | int:
+        # x ? 1 : 2
+        cond = ctx.value_of(ctx.evaluate(self.cond))
+        if bool(cond):
+            return ctx.evaluate(self.consequence)
+        else:
+            return ctx.evaluate(self.alternative)
+
+
+@dataclass(slots=True)
+class ExprPlan:
+    """
+    compiled expression, reusable as long as the PDB is the same
+
+    names and offsets are resolved once in `compile_expr`,
+    so an evaluation only walks the nodes and reads the memory.
+    """
+    expr: str
+    root: _Node
+    parse_time: float = 0.0
+    nodes: int = 0
+
+
+def _count_nodes(node: _Node) -> int:
+    cnt = 1
+    for f in fields(node):
+        child = getattr(node, f.name)
+        if isinstance(child, _Node):
+            cnt += _count_nodes(child)
+    return cnt
+
+
+def _layouts(p: pdb.PDB7) -> LayoutCache:
+    return get_layout_cache(p.p if isinstance(p, _ThisScope) else p)
+
+
+def _static_layout(p: pdb.PDB7, lf) -> pdb.StructRecord:
+    """layout at address 0, shared, shall not be modified"""
+    return _layouts(p).layout(lf)
+
+
+def _pointee_layout(p: pdb.PDB7, lf) -> pdb.StructRecord | None:
+    try:
+        target = _layouts(p).pointee(lf)
+    except Exception:
+        return None
+    return _static_layout(p, target)
+
+
+def _fold_member(p: pdb.PDB7, text: bytes, base: _Node, ref_expr: bytes, notation: str, field: str) -> _Node | None:
+    # gA.s.dwLen          -> static offset from the virtual base
+    # ((T *)0x1234)->attr -> static absolute address
+    # gB.s->dwLen         -> static offset from the pointer value
+    if notation == "." and isinstance(base, (_Static, _Indirect, _This)):
+        layout = _static_layout(p, base.lf)
+        folded = base
+    elif notation == "->" and isinstance(base, _Cast):
+        if not base.pointer_literal or not isinstance(base.operand, _Number) or base.operand.value == 0:
+            return None
+        layout = _static_layout(p, base.lf)
+        folded = _Static(text, base.lf, base.operand.value, False)
+    elif notation == "->" and isinstance(base, (_Static, _Indirect, _This)):
+        layout = _pointee_layout(p, base.lf)
+        if layout is None or layout["fields"] is None:
+            return None
+        folded = _Indirect(text, base, ref_expr, layout["lf"], 0)
+    else:
+        return None
+    fields = layout["fields"]
+    if not isinstance(fields, dict) or field not in fields:
+        return None
+    sub_struct = fields[field]
+    if sub_struct.get("lf", None) is None:
+        return None
+    return replace(folded, text=text, lf=sub_struct["lf"], offset=folded.offset + sub_struct["address"])
+
+
+def _fold_index(p: pdb.PDB7, text: bytes, base: _Node, ref_expr: bytes, index: _Node) -> _Node | None:
+    # gA.s.szBuffer[3] -> static offset
+    # gB.s[3]          -> static offset from the pointer value
+    if not isinstance(base, (_Static, _Indirect, _This)) or not isinstance(index, _Number) or index.value < 0:
+        return None
+    layout = _static_layout(p, base.lf)
+    fields = layout["fields"]
+    if fields is None:
+        pointee = _pointee_layout(p, base.lf)
+        if pointee is None:
+            return None
+        return _Indirect(text, base, ref_expr, pointee["lf"], pointee["size"] * index.value)
+    if not isinstance(fields, list) or index.value >= len(fields):
+        return None
+    sub_struct = fields[index.value]
+    if sub_struct.get("lf", None) is None:
+        return None
+    return replace(base, text=text, lf=sub_struct["lf"], offset=base.offset + sub_struct["address"])
+
+
+def _symbol_node(p: pdb.PDB7, text: bytes) -> _Node:
+    if text == b"this" and isinstance(p, _ThisScope):
+        return _This(text, p.this_lf, 0)
+    structname = text.decode()
+    lf, offset = _layouts(p).lookup(structname)
+    assert lf is not None, "Identifier not found: %r" % structname
+    return _Static(text, lf, offset, True)
+
+
+def _cast_node(p: pdb.PDB7, text: bytes, structname: str, operand: _Node) -> _Node:
+    match = REG_STRUCT.match(structname)
+    if match is None:
+        raise InvalidExpression("Bad struct casting: b%r" % structname)
+    if match["STAR"] is not None:
+        # ie: xxx_def *
+        lf, _ = _layouts(p).lookup(match.group("STRUCT"))
+        pointer_literal = True
+    else:
+        # ie: xxx_def_ptr
+        lf, _ = _layouts(p).lookup(structname)
+        pointer_literal = False
+    if lf is None:
+        raise InvalidExpression("Bad struct casting: b%r" % structname)
+    return _Cast(text, structname, lf, pointer_literal, operand)
+
+
+def _sizeof_type(p: pdb.PDB7, structname: str) -> int:
+    match = REG_STRUCT.match(structname)
+    if match is None:
+        raise InvalidExpression("Bad struct descriptor: b%r" % structname)
+    if match["STAR"] is not None:
+        return p.tpi_stream.ARCH_PTR_SIZE
+    lf, _ = _layouts(p).lookup(match.group("STRUCT"))
+    if lf is None:
+        raise InvalidExpression("Bad struct: b%r" % structname)
+    return _layouts(p).sizeof(lf)
+
+
+def _member_node(p: pdb.PDB7, text: bytes, operand: _Node, ref_expr: bytes, notation: str, field: str) -> _Node:
+    return (
+        _fold_member(p, text, operand, ref_expr, notation, field)
+        or _Field(text, operand, ref_expr, notation, field)
+    )
+
+
+def _index_node(p: pdb.PDB7, text: bytes, operand: _Node, ref_expr: bytes, index: _Node) -> _Node:
+    return (
+        _fold_index(p, text, operand, ref_expr, index)
+        or _Subscript(text, operand, ref_expr, index)
+    )
+
+
+_SIMPLE_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<NUM>(?:0[xX][0-9a-fA-F]+|0[bB][01]+|[0-9]+)[uUlL]*\b)"
+    r"|(?P<ID>[A-Za-z_]\w*)"
+    r"|(?P<OP>->|[.\[\]()*&])"
+    r")"
+)
+
+_C_KEYWORDS = {
+    "sizeof", "offsetof", "struct", "union", "enum", "const", "volatile",
+    "void", "char", "short", "int", "long", "float", "double", "signed", "unsigned",
+}
+
+
+class _Unsupported(Exception):
+    """expression is out of the simple grammar, use tree-sitter instead"""
+
+
+class _SimpleParser:
+    """
+    recursive-descent parser for the most common expressions:
+
+        expr    := '*' expr | '&' expr | '(' type ')' expr | postfix
+        postfix := primary ( '.' ID | '->' ID | '[' expr ']' )*
+        primary := ID | NUM | '(' expr ')'
+        type    := ['struct'] ID ['*']
+
+    anything else raises `_Unsupported`,
+    each node has the same text as the tree-sitter node would have,
+    so both paths give the same results and error messages.
+    """
+
+    def __init__(self, p: pdb.PDB7, src: str):
+        self.p = p
+        self.src = src
+        self.tokens = self._tokenize(src)
+        self.pos = 0
+
+    @staticmethod
+    def _tokenize(src: str) -> list[tuple[str, str, int, int]]:
+        tokens = []
+        pos = 0
+        end = len(src.rstrip())
+        while pos < end:
+            m = _SIMPLE_TOKEN.match(src, pos)
+            if m is None:
+                raise _Unsupported(src[pos:])
+            kind = m.lastgroup
+            tokens.append((kind, m.group(kind), m.start(kind), m.end(kind)))
+            pos = m.end()
+        return tokens
+
+    def _peek(self, offset=0) -> tuple[str, str, int, int] | None:
+        try:
+            return self.tokens[self.pos + offset]
+        except IndexError:
+            return None
+
+    def _take(self, text: str | None = None, kind: str | None = None) -> tuple[str, str, int, int]:
+        tok = self._peek()
+        if tok is None:
+            raise _Unsupported("unexpected end")
+        if text is not None and tok[1] != text:
+            raise _Unsupported(tok[1])
+        if kind is not None and tok[0] != kind:
+            raise _Unsupported(tok[1])
+        if tok[0] == "ID" and tok[1] in _C_KEYWORDS:
+            raise _Unsupported(tok[1])
+        self.pos += 1
+        return tok
+
+    def _text(self, start: int, end: int) -> bytes:
+        return self.src[start:end].encode()
+
+    def _deferred(self, start: int, end: int, fn, *args) -> _Node:
+        try:
+            return fn(self.p, self._text(start, end), *args)
+        except Exception as e:
+            return _Raise(self._text(start, end), e)
+
+    def parse(self) -> _Node:
+        node, _, _ = self._expr()
+        if self._peek() is not None:
+            raise _Unsupported(self._peek()[1])
+        return node
+
+    def _cast_length(self) -> int:
+        # length of tokens in `( [struct] ID [*] )`, or 0 if not a type casting
+        n = 1
+        is_type = False
+        tok = self._peek(n)
+        if tok is not None and tok[1] == "struct":
+            is_type = True
+            n += 1
+        tok = self._peek(n)
+        if tok is None or tok[0] != "ID" or tok[1] in _C_KEYWORDS:
+            return 0
+        n += 1
+        tok = self._peek(n)
+        if tok is not None and tok[1] == "*":
+            is_type = True
+            n += 1
+        tok = self._peek(n)
+        if tok is None or tok[1] != ")":
+            return 0
+        n += 1
+        after = self._peek(n)
+        if not is_type:
+            # `(x)` is a type casting only if followed by something that can not follow an expression
+            if after is None or after[0] not in {"ID", "NUM"}:
+                return 0
+        return n
+
+    def _expr(self) -> tuple[_Node, int, int]:
+        tok = self._peek()
+        if tok is None:
+            raise _Unsupported("empty")
+        if tok[1] in {"*", "&"}:
+            self._take()
+            if (nxt := self._peek()) is not None and nxt[1] in {"*", "&"}:
+                # tree-sitter does not read `**x` as an expression at top level
+                raise _Unsupported(nxt[1])
+            operand, ostart, oend = self._expr()
+            text = self._text(tok[2], oend)
+            if tok[1] == "*":
+                return _Deref(text, operand, self._text(ostart, oend)), tok[2], oend
+            else:
+                return _AddressOf(text, operand), tok[2], oend
+        if tok[1] == "(" and (n := self._cast_length()):
+            type_start = self._peek(1)[2]
+            type_end = self._peek(n - 2)[3]
+            self.pos += n
+            operand, _, oend = self._expr()
+            structname = self.src[type_start:type_end]
+            return self._deferred(tok[2], oend, _cast_node, structname, operand), tok[2], oend
+        return self._postfix()
+
+    def _postfix(self) -> tuple[_Node, int, int]:
+        node, start, end = self._primary()
+        while (tok := self._peek()) is not None:
+            if tok[1] in {".", "->"}:
+                self._take()
+                _, field, _, fend = self._take(kind="ID")
+                node = self._deferred(start, fend, _member_node, node, self._text(start, end), tok[1], field)
+                end = fend
+            elif tok[1] == "[":
+                self._take()
+                index, _, _ = self._expr()
+                _, _, _, bend = self._take("]")
+                node = self._deferred(start, bend, _index_node, node, self._text(start, end), index)
+                end = bend
+            else:
+                break
+        return node, start, end
+
+    def _primary(self) -> tuple[_Node, int, int]:
+        tok = self._take()
+        kind, text, start, end = tok
+        if kind == "ID":
+            return self._deferred(start, end, _symbol_node), start, end
+        if kind == "NUM":
+            return self._deferred(start, end, _number_node), start, end
+        if text == "(":
+            node, _, _ = self._expr()
+            _, _, _, end = self._take(")")
+            return node, start, end
+        raise _Unsupported(text)
+
+
+def _compile_simple_expr(p: pdb.PDB7, expr: str) -> _Node | None:
+    try:
+        return _SimpleParser(p, expr).parse()
+    except _Unsupported:
+        return None
+
+
+def _compile_node(p: pdb.PDB7, node: Node) -> _Node:
+    # errors are deferred to the evaluation, so they raise in the same order as walking the syntax tree
+    try:
+        return _compile_syntax_node(p, node)
+    except Exception as e:
+        return _Raise(node.text, e)
+
 
+def _compile_syntax_node(p: pdb.PDB7, node: Node) -> _Node:
+    childs = node.children
+    match node.type:
+        case "translation_unit":
+            assert childs != [], "Translation Unit is empty."
+            assert len(childs) == 1 or childs[1].type == ";", "Translation Unit not support: %r" % node.text
+            return _compile_node(p, childs[0])
+        case "expression_statement":
+            assert len(childs) < 2 or childs[1].type == ";", "Expression/Statement not support: %r" % node.text
+            return _compile_node(p, childs[0])
+        case "ERROR":
+            assert len(childs) == 1, "Invalid syntax: %r" % node.text
+            return _compile_node(p, childs[0])
+        case "parenthesized_expression":
+            # assert childs[0].type == '(' and childs[2].type == ')', "Invalid syntax: %r" % node.text
+            assert len(childs) == 3, "Invalid syntax: %r" % node.text
+            return _compile_node(p, childs[1])
+        case "cast_expression":
+            # assert childs[0].type == '(' and childs[2].type == ')'
+            return _cast_node(p, node.text, childs[1].text.decode(), _compile_node(p, childs[3]))
+        case "pointer_expression":
+            # assert childs[0].type in {"&", "*"}
+            operand = _compile_node(p, childs[1])
+            if childs[0].type == "&":
+                return _AddressOf(node.text, operand)
+            elif childs[0].type == "*":
+                return _Deref(node.text, operand, childs[1].text)
+            else:
+                assert False, repr(node)
+        case "field_expression":
+            # foo.bar
+            # foo->bar
+            operand = _compile_node(p, childs[0])
+            notation = childs[1].type
+            field = childs[2].text.decode()
+            return _member_node(p, node.text, operand, childs[0].text, notation, field)
+        case "subscript_expression":
+            # foo[0]
+            # assert childs[1].type == '[' and childs[3].type == ']'
+            operand = _compile_node(p, childs[0])
+            index = _compile_node(p, childs[2])
+            return _index_node(p, node.text, operand, childs[0].text, index)
+        case "identifier" | "type_identifier":
+            return _symbol_node(p, node.text)
+        case "number_literal":
+            return _number_node(p, node.text)
+        case "sizeof_expression":
+            if (type_node := node.child_by_field_name("type")) is not None:
+                # sizeof(struct xxx *), from the layout without any evaluation
+                return _Number(node.text, _sizeof_type(p, type_node.text.decode()))
+            return _SizeOf(node.text, _compile_node(p, childs[1]))
+        case "binary_expression":
+            return _binary_node(
+                p,
+                node.text,
+                _compile_node(p, childs[0]),
+                childs[0].text,
+                childs[1].type,
+                _compile_node(p, childs[2]),
+            )
+        case "unary_expression":
+            # -x, +x, ~x, !x
+            return _unary_node(p, node.text, childs[0].type, _compile_node(p, childs[1]))
+        case "update_expression":
+            return _Update(node.text, _compile_node(p, childs[0]), childs[0].text, childs[1].type)
+        case "conditional_expression":
+            # x ? 1 : 2
+            assert childs[1].type == "?" and childs[3].type == ":", "Invalid syntax: " % node.text
+            cond = _compile_node(p, childs[0])
+            if isinstance(cond, _Number):
+                # constant folding
+                return _compile_node(p, childs[2] if cond.value else childs[4])
+            return _Conditional(
+                node.text,
+                cond,
+                _compile_node(p, childs[2]),
+                _compile_node(p, childs[4]),
+            )
+        case "offsetof_expression":
+            # offset( type_descriptor, field_identifier )
+            structname = childs[2].text.decode()
+            member = childs[4].text.decode()
+            match = REG_STRUCT.match(structname)
+            assert match is not None, "Bad struct descriptor: b%r" % structname
+
+            lf, _ = _layouts(p).lookup(match.group("STRUCT"))
+            assert lf is not None, "Bad struct: b%r" % structname
+
+            struct = _static_layout(p, lf)
+            if isinstance(struct, dict):
+                assert struct["fields"] is not None, "Struct b%r has no member" % (structname)
+                assert member in struct["fields"], "Member b%r not found in b%r" % (member, structname)
+                if isinstance(struct["fields"], dict):
+                    return _Number(node.text, struct["fields"][member]["address"])
+                else:
+                    raise NotImplementedError(struct["fields"])
+            else:
+                raise NotImplementedError(struct)
+
+        case "macro_type_specifier":
+            raise InvalidExpression("Not support macro yet: %r" % node.text)
+        case "call_expression":
+            raise InvalidExpression("Not support function call yet: %r" % node.text)
+        case "assignment_expression":
+            raise InvalidExpression("Not support assignment yet: %r" % node.text)
+        case _:
+            raise InvalidExpression("Syntax not support: %r" % node)
+
+
+class _PlanCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._plans: OrderedDict[str, ExprPlan] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, expr: str) -> ExprPlan | None:
+        with self._lock:
+            plan = self._plans.get(expr, None)
+            if plan is not None:
+                self._plans.move_to_end(expr)
+            return plan
+
+    def put(self, plan: ExprPlan):
+        with self._lock:
+            self._plans[plan.expr] = plan
+            self._plans.move_to_end(plan.expr)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+
+PLAN_CACHE_SIZE = 4096
+
+
+@per_pdb
+def _get_plan_cache(p: pdb.PDB7) -> _PlanCache:
+    return _PlanCache(PLAN_CACHE_SIZE)
+
+
+def compile_expr(p: pdb.PDB7, expr: str) -> ExprPlan:
+    cache = _get_plan_cache(p)
+    plan = cache.get(expr)
+    if plan is None:
+        start = time.perf_counter()
+        root = _compile_simple_expr(p, expr)
+        if root is None:
+            root = _compile_aggregate(expr)
+        if root is None and ":" in expr and split_slice_expr(expr) is not None:
+            root = _Raise(expr.encode(), InvalidExpression("Slice evaluates to a column, not a struct: %r" % expr))
+        if root is None:
+            tree = get_syntax_tree(expr)
+            root = _compile_node(p, tree.root_node)
+        plan = ExprPlan(expr, root, time.perf_counter() - start, _count_nodes(root))
+        cache.put(plan)
+    return plan
+
+
+class _ThisScope:
+    """PDB seen by the compiler, with `this` bound to a struct type"""
+
+    def __init__(self, p: pdb.PDB7, this_lf) -> None:
+        self.p = p
+        self.this_lf = this_lf
+
+    def __getattr__(self, name: str):
+        return getattr(self.p, name)
+
+
+# `.member` not following an identifier, `]` or `)`, i.e. a member of `this`
+_THIS_MEMBER = re.compile(r"(?<![\w\])])\.(?=\s*[A-Za-z_])")
+
+
+def compile_this_expr(p: pdb.PDB7, this_lf, expr: str) -> ExprPlan:
+    """
+    compile `expr` relative to a struct of type `this_lf`, i.e. `.size * 2`
+    or `this.size * 2`, evaluate it with `this` set to the struct address.
+    the plan is not cached, keep it as long as the PDB is the same.
+    """
+    start = time.perf_counter()
+    text = _THIS_MEMBER.sub("this.", expr)
+    scope = _ThisScope(p, this_lf)
+    root = _compile_simple_expr(scope, text)
+    if root is None:
+        tree = get_syntax_tree(text)
+        root = _compile_node(scope, tree.root_node)
+    return ExprPlan(expr, root, time.perf_counter() - start, _count_nodes(root))
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def evaluate_int_expr(expr: str, bits=64) -> int:
+    """evaluate a constant integer expression without any PDB"""
+    root = _compile_simple_expr(None, expr)
+    if root is None:
+        tree = get_syntax_tree(expr)
+        root = _compile_node(None, tree.root_node)
+    if isinstance(root, _Raise) and isinstance(root.error, InvalidExpression):
+        raise root.error.with_traceback(None)
+    if not isinstance(root, _Number):
+        raise InvalidExpression("Not a constant expression: %r" % expr)
+    return wrap_int(root.value, bits, root.unsigned)
+
+
+@contextmanager
+def _expr_errors(expr: str):
     try:
-        struct = _walk_syntax_node(tree.root_node)
+        yield
     except AssertionError as e:
         raise InvalidExpression(e)
     except KeyError as e:
@@ -335,21 +1091,706 @@ def query_struct_from_expr(p: pdb.PDB7, expr: str, virt_base=0, io_stream=None,
     except ArgumentError as e:
         raise InvalidExpression("You shall provide a io_stream for the expression: %r" % expr)
 
+
+def _form_members(p: pdb.PDB7, record: pdb.StructRecord) -> dict | list | None:
+    fields = _layouts(p).form(record["lf"], record["address"])["fields"]
+    return _lazy_fields(fields, partial(_form_members, p))
+
+
+def _form_sent_members(p: pdb.PDB7, record: pdb.StructRecord) -> dict | list | None:
+    if record["lf"] is None:
+        # sent by a worker process without the lf, found by the type name
+        record["lf"] = _layouts(p).lookup(record["type"])[0]
+    return _form_members(p, record)
+
+
+def members_former(p: pdb.PDB7) -> Callable:
+    """former of the members of `p` left unformed by another process"""
+    return partial(_form_sent_members, p)
+
+
+def _lazy_fields(fields: dict | list | None, former: Callable) -> dict | list | None:
+    """members as compact records, the ones not formed by the parser are left to `former` until accessed"""
+
+    def _lazy(c: pdb.StructRecord) -> Record:
+        if c["fields"] is None and not c["is_pointer"] and c.get("lf", None) is not None:
+            return LazyRecord(c, former)
+        rec = Record(c)
+        rec["fields"] = _lazy_fields(c["fields"], former)
+        return rec
+
+    if isinstance(fields, ElementArray):
+        # the elements are still formed once accessed, copied from a lazy template
+        fields.template = _lazy(fields.template)
+        return fields
+    if isinstance(fields, dict):
+        return {k: _lazy(c) for k, c in fields.items()}
+    if isinstance(fields, list):
+        return [_lazy(c) for c in fields]
+    return fields
+
+
+def _run_plan(ctx: _EvalContext, plan: ExprPlan, profile=False) -> pdb.StructRecord:
+    start = len(ctx.reads)
+    recorder = ctx.io_stream if isinstance(ctx.io_stream, _ReadRecorder) else None
+    if profile:
+        ctx.profile = ExprProfile(plan.expr, plan.parse_time, plan.nodes)
+        read_count = recorder.read_count if recorder else 0
+        read_bytes = recorder.read_bytes if recorder else 0
+        start_time = time.perf_counter()
+    else:
+        ctx.profile = None
+
+    with _expr_errors(plan.expr):
+        struct = ctx.evaluate(plan.root)
+
     if isinstance(struct, dict):
         # struct result
         if not struct.get("pointer_literal", False) and not struct.get("_do_not_parse_again", False):
-            out_struct = p.tpi_stream.form_structs(struct["lf"], addr=struct["address"])
-            out_struct["value"] = struct["value"]
+            # one level, deeper members are formed once accessed
+            out_struct = ctx.form_structs(struct["lf"], addr=struct["address"], recursive=False)
+            out_struct["fields"] = _lazy_fields(out_struct["fields"], partial(_form_members, ctx.p))
+            if not ctx.shared or plan.root.text not in ctx.shared:
+                # value of a shared one may be cached by others, leave it to be read
+                out_struct["value"] = struct["value"]
+        elif ctx.shared:
+            # may be shared with other expressions in the batch
+            out_struct = struct.copy()
         else:
             out_struct = struct
     elif isinstance(struct, int):
         # numeric result
         out_struct = pdb.new_struct(value=struct)
+    elif isinstance(struct, float):
+        # ie: sum of real numbers, kept as the bits of a double as real members are
+        out_struct = pdb.new_struct(type="T_REAL64", value=int_from_float(struct, 64), size=8, is_real=True)
     else:
-        raise NotImplementedError(expr)
+        raise NotImplementedError(plan.expr)
 
+    if isinstance(plan.root, _Aggregate):
+        # depends on every element, always evaluate again
+        out_struct["_depends"] = None
+    else:
+        # pointer words, indexes... which the result address is resolved from
+        out_struct["_depends"] = tuple(dict.fromkeys(ctx.reads[start:]))
+    out_struct["_virt_base"] = ctx.virt_base
+    if ctx.profile is not None:
+        ctx.profile.wall_time = time.perf_counter() - start_time
+        if recorder is not None:
+            ctx.profile.reads = recorder.read_count - read_count
+            ctx.profile.read_bytes = recorder.read_bytes - read_bytes
+        out_struct["_profile"] = ctx.profile
     return out_struct
 
 
+def _recording(io_stream: Stream | None) -> _ReadRecorder | None:
+    return None if io_stream is None else _ReadRecorder(io_stream)
+
+
+def evaluate_plan(p: pdb.PDB7, plan: ExprPlan, virt_base=0, io_stream=None, allow_null_pointer=False, profile=False, this=0) -> pdb.StructRecord:
+    ctx = _EvalContext(p, virt_base, _recording(io_stream), allow_null_pointer, _arch_bits(p), this=this)
+    return _run_plan(ctx, plan, profile)
+
+
+_SHARABLE_NODES = (_Static, _Indirect, _Deref, _Field, _Subscript)
+
+
+def _iter_prefixes(node: _Node):
+    """texts of `node` and all its operands, from the longest to the shortest prefix"""
+    while isinstance(node, _SHARABLE_NODES):
+        yield node.text
+        node = node.pointer if isinstance(node, _Indirect) else getattr(node, "operand", None)
+
+
+def shared_prefixes(plans: list[ExprPlan]) -> set[bytes]:
+    """sub-expressions appearing as the prefix of more than one plan"""
+    counter = Counter()
+    for plan in plans:
+        counter.update(set(_iter_prefixes(plan.root)))
+    return {text for text, cnt in counter.items() if cnt > 1}
+
+
+def evaluate_plans(p: pdb.PDB7, plans: list[ExprPlan], virt_base=0, io_stream=None, allow_null_pointer=False, profile=False) -> list[pdb.StructRecord | Exception]:
+    """
+    evaluate all the plans at once, every shared prefix is only evaluated once
+
+    failures do not stop the batch, the exception is placed in the result list.
+    """
+    ctx = _EvalContext(p, virt_base, _recording(io_stream), allow_null_pointer, _arch_bits(p), shared_prefixes(plans))
+    results = []
+    for plan in plans:
+        try:
+            results.append(_run_plan(ctx, plan, profile))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def depends_changed(struct: pdb.StructRecord, virt_base=0, io_stream=None) -> bool:
+    """
+    check if the memory `struct` was resolved from has changed since it was evaluated
+
+    a struct without any record, e.g. not from evaluation, is always treated as changed.
+    give a ReadPlanner with the depends of a batch prefetched to check them all in one pass.
+    """
+    depends = struct.get("_depends", None)
+    if depends is None or struct.get("_virt_base", None) != virt_base:
+        return True
+    if not depends:
+        return False
+    if io_stream is None:
+        return True
+    if isinstance(io_stream, ReadPlanner):
+        reader = io_stream
+    else:
+        reader = ReadPlanner(io_stream)
+        reader.prefetch((addr, len(data)) for addr, data in depends)
+    try:
+        for addr, data in depends:
+            reader.seek(addr)
+            if reader.read(len(data)) != data:
+                return True
+    except Exception:
+        return True
+    return False
+
+
+def _compile_profiled(p: pdb.PDB7, expr: str) -> tuple[ExprPlan, bool, float]:
+    """compile_expr, also returns if the plan was cached and the time spent"""
+    start = time.perf_counter()
+    cached = _get_plan_cache(p).get(expr) is not None
+    plan = compile_expr(p, expr)
+    return plan, cached, time.perf_counter() - start
+
+
+def _add_compile_cost(struct: pdb.StructRecord | Exception, cached: bool, elapsed: float):
+    if isinstance(struct, dict) and "_profile" in struct:
+        struct["_profile"].cached = cached
+        struct["_profile"].wall_time += elapsed
+
+
+def query_structs_from_exprs(p: pdb.PDB7, exprs: list[str], virt_base=0, io_stream=None, allow_null_pointer=False, profile=False) -> list[pdb.StructRecord | Exception]:
+    if p is None:
+        return [query_struct_from_expr(p, expr) for expr in exprs]
+    if not profile:
+        plans = [compile_expr(p, expr) for expr in exprs]
+        return evaluate_plans(p, plans, virt_base, io_stream, allow_null_pointer)
+    compiled = [_compile_profiled(p, expr) for expr in exprs]
+    results = evaluate_plans(p, [x[0] for x in compiled], virt_base, io_stream, allow_null_pointer, profile)
+    for struct, (_, cached, elapsed) in zip(results, compiled):
+        _add_compile_cost(struct, cached, elapsed)
+    return results
+
+
+def query_struct_from_expr(p: pdb.PDB7, expr: str, virt_base=0, io_stream=None, allow_null_pointer=False, profile=False) -> pdb.StructRecord:
+    """
+    profile:
+        True: attach an ExprProfile of the query as `_profile` to the result
+    """
+    if p is None:
+        with suppress(InvalidExpression):
+            return pdb.new_struct(value=evaluate_int_expr(expr))
+        return pdb.new_struct()
+    if not profile:
+        plan = compile_expr(p, expr)
+        return evaluate_plan(p, plan, virt_base, io_stream, allow_null_pointer)
+    plan, cached, elapsed = _compile_profiled(p, expr)
+    struct = evaluate_plan(p, plan, virt_base, io_stream, allow_null_pointer, profile)
+    _add_compile_cost(struct, cached, elapsed)
+    return struct
+
+
+class _ZeroStream:
+    """memory of all zeros, a layout is resolved through it with every pointer as NULL"""
+
+    def seek(self, offset: int, pos=os.SEEK_SET) -> int:
+        return offset
+
+    def read(self, size: int) -> bytes:
+        return bytes(size)
+
+
+def expr_members(p: pdb.PDB7, expr: str, notation: str) -> list[str]:
+    """member names for `expr.` or `expr->`, the type is resolved without reading any memory"""
+    plan = compile_expr(p, expr)
+    ctx = _EvalContext(p, 0, _recording(_ZeroStream()), True, _arch_bits(p))
+    with _expr_errors(expr):
+        struct = ctx.evaluate(plan.root)
+        if not isinstance(struct, dict):
+            return []
+        if notation == "->":
+            struct = ctx.deref(struct, None, expr.encode())
+    fields = struct["fields"]
+    return list(fields) if isinstance(fields, dict) else []
+
+
+# members of an array element up to this length are also split into columns
+MAX_COLUMN_ARRAY = 16
+
+_SLICE_SUFFIX = re.compile(r"\s*(?:\.\s*(?P<FIELD>[A-Za-z_]\w*)|\[(?P<INDEX>[^\[\]:]+)\])")
+
+
+def split_slice_expr(expr: str) -> tuple[str, tuple[str, ...], str] | None:
+    """
+    split `a.b[start:stop:step].c` into ("a.b", ("start", "stop", "step"), ".c"),
+    `[*]` is the same as `[:]`. None if there is no slice in `expr`
+    """
+    brackets = []
+    for pos, ch in enumerate(expr):
+        if ch in "([":
+            # [position, opening, positions of ':' or None for a conditional]
+            brackets.append([pos, ch, []])
+        elif ch in ")]" and brackets:
+            start, opening, colons = brackets.pop()
+            if ch == "]" and opening == "[" and expr[start + 1: pos].strip() == "*":
+                return expr[:start], ("", ""), expr[pos + 1:]
+            if ch == "]" and opening == "[" and colons:
+                bounds = [start, *colons, pos]
+                parts = tuple(expr[a + 1: b] for a, b in zip(bounds, bounds[1:]))
+                return expr[:start], parts, expr[pos + 1:]
+        elif ch == "?" and brackets:
+            brackets[-1][2] = None
+        elif ch == ":" and brackets and brackets[-1][2] is not None:
+            brackets[-1][2].append(pos)
+    return None
+
+
+def _slice_bound(ctx: _EvalContext, text: str) -> int | None:
+    if text.strip() == "":
+        return None
+    return ctx.value_of(ctx.evaluate(compile_expr(ctx.p, text).root))
+
+
+def _slice_member(p: pdb.PDB7, layout: pdb.StructRecord, suffix: str) -> pdb.StructRecord:
+    # only static members, which are at the same offset in every element
+    pos = 0
+    while suffix[pos:].strip():
+        m = _SLICE_SUFFIX.match(suffix, pos)
+        if m is None:
+            raise InvalidExpression("Only members and constant indexes are allowed after a slice: %r" % suffix[pos:])
+        pos = m.end()
+        fields = layout["fields"]
+        if m["FIELD"] is not None:
+            if not isinstance(fields, dict) or m["FIELD"] not in fields:
+                raise InvalidExpression("Member %r not found in %r" % (m["FIELD"], layout["type"]))
+            sub_struct = fields[m["FIELD"]]
+        else:
+            index = evaluate_int_expr(m["INDEX"])
+            if not isinstance(fields, list):
+                raise InvalidExpression("Shall be an array: %r" % layout["type"])
+            if not 0 <= index < len(fields):
+                raise InvalidExpression("Index out of range: b'[%d]'" % index)
+            sub_struct = fields[index]
+        layout = _member_layout(p, sub_struct)
+    return layout
+
+
+def _member_layout(p: pdb.PDB7, sub_struct: pdb.StructRecord) -> pdb.StructRecord:
+    if sub_struct.get("lf", None) is None:
+        return sub_struct
+    return _layouts(p).form(sub_struct["lf"], sub_struct["address"])
+
+
+def _slice_column(p: pdb.PDB7, expr: str, layout: pdb.StructRecord, data: bytes, span_addr: int, first: int, stride: int, index: range, recursive=True) -> ArrayColumn:
+    fields = layout["fields"]
+    column = ArrayColumn(
+        expr=expr,
+        type=layout["type"],
+        address=span_addr + first + layout["address"],
+        data=data,
+        offset=first + layout["address"],
+        stride=stride,
+        count=len(index),
+        size=layout["size"],
+        bitoff=layout["bitoff"],
+        bitsize=layout["bitsize"],
+        has_sign=layout.get("has_sign", False),
+        is_real=layout.get("is_real", False),
+        is_pointer=layout.get("is_pointer", False),
+        index=index,
+    )
+    if recursive and isinstance(fields, dict):
+        column.fields = {
+            name: _slice_column(p, "%s.%s" % (expr, name), _member_layout(p, x), data, span_addr, first, stride, index)
+            for name, x in fields.items()
+        }
+    elif recursive and isinstance(fields, list) and len(fields) <= MAX_COLUMN_ARRAY:
+        column.fields = [
+            _slice_column(p, "%s[%d]" % (expr, n), _member_layout(p, x), data, span_addr, first, stride, index)
+            for n, x in enumerate(fields)
+        ]
+    return column
+
+
+@dataclass(slots=True)
+class _SliceSource:
+    """elements selected by a slice, resolved but not read yet"""
+    expr: str
+    base: int
+    elem: pdb.StructRecord
+    layout: pdb.StructRecord
+    index: range
+
+
+def _resolve_slice(ctx: _EvalContext, expr: str) -> _SliceSource:
+    parts = split_slice_expr(expr)
+    if parts is None:
+        raise InvalidExpression("Not a slice expression: %r" % expr)
+    prefix, bounds, suffix = parts
+    if len(bounds) > 3:
+        raise InvalidExpression("Invalid slice: %r" % expr)
+    p = ctx.p
+    struct = ctx.evaluate(compile_expr(p, prefix).root)
+    start, stop, step = (_slice_bound(ctx, b) for b in (bounds + ("", ""))[:3])
+    if step == 0:
+        raise InvalidExpression("Slice step cannot be zero: %r" % expr)
+
+    if isinstance(struct, dict) and isinstance(struct["fields"], list):
+        if not struct["fields"]:
+            raise InvalidExpression("Empty array: %r" % prefix)
+        elem_lf = struct["fields"][0]["lf"]
+        base = struct["address"]
+        index = range(len(struct["fields"]))[start:stop:step]
+    elif isinstance(struct, dict) and struct["is_pointer"]:
+        # no length for a pointer, stop shall be given
+        if stop is None or stop < 0 or (start or 0) < 0:
+            raise InvalidExpression("Slice of a pointer needs non-negative start and stop: %r" % expr)
+        base = _pointer_address(ctx.io_stream, struct, prefix.encode(), ctx.allow_null_pointer)
+        if struct.get("pointer_literal", False):
+            elem_lf = struct["lf"]
+        else:
+            try:
+                elem_lf = _layouts(p).pointee(struct["lf"])
+            except ValueError as e:
+                raise InvalidExpression("%s at %r" % (e, prefix))
+            except NotImplementedError as e:
+                raise InvalidExpression("Fail to deref: %r" % prefix)
+        index = range(start or 0, stop, step or 1)
+    else:
+        raise InvalidExpression("Shall be an array or pointer: %r" % prefix)
+
+    elem = _static_layout(p, elem_lf)
+    return _SliceSource(expr, base, elem, _slice_member(p, elem, suffix), index)
+
+
+def _read_span(ctx: _EvalContext, src: _SliceSource, index: range) -> tuple[bytes, int, int]:
+    """read the elements of `index` at once, returns (data, address of data, offset of the first element)"""
+    if not index:
+        return bytes(), src.base, 0
+    size = src.elem["size"]
+    lo = min(index[0], index[-1])
+    span_addr = src.base + lo * size
+    span_size = (abs(index[-1] - index[0]) + 1) * size
+    if ctx.io_stream is None:
+        raise ArgumentError("You shall provide a io_stream")
+    # element data is not kept as a dependency, the span can be huge
+    ctx.io_stream.seek(span_addr)
+    if isinstance(ctx.io_stream, _ReadRecorder):
+        data = ctx.io_stream.read(span_size, record=False)
+    else:
+        data = ctx.io_stream.read(span_size)
+    if len(data) < span_size:
+        raise InvalidExpression("Fail to read %d bytes at 0x%x for %r" % (span_size, span_addr, src.expr))
+    return data, span_addr, (index[0] - lo) * size
+
+
+def _query_column(ctx: _EvalContext, expr: str) -> ArrayColumn:
+    src = _resolve_slice(ctx, expr)
+    # the whole span in one read, columns are decoded from it
+    data, span_addr, first = _read_span(ctx, src, src.index)
+    stride = src.index.step * src.elem["size"]
+    return _slice_column(ctx.p, expr, src.layout, data, span_addr, first, stride, src.index)
+
+
+def query_column_from_expr(p: pdb.PDB7, expr: str, virt_base=0, io_stream=None, allow_null_pointer=False) -> ArrayColumn:
+    """evaluate a slice expression, ie: `g_table.entries[0:100:2].refcnt`"""
+    ctx = _EvalContext(p, virt_base, io_stream, allow_null_pointer, _arch_bits(p))
+    with _expr_errors(expr):
+        return _query_column(ctx, expr)
+
+
+# elements are read in blocks about this size for aggregates
+AGGREGATE_BLOCK_SIZE = 0x100000
+
+_AGGREGATE_FUNC = re.compile(r"\s*(?P<FUNC>sum|min|max|count|any|all)\s*\(")
+_WHERE = re.compile(r"\bwhere\b")
+_WHERE_MEMBER = re.compile(r"(?<![\w\])])\.\s*[A-Za-z_]\w*(?:\s*\.\s*[A-Za-z_]\w*|\s*\[[^\[\]:]+\])*")
+_WHERE_PLACEHOLDER = re.compile(r"_m(?P<N>\d+)")
+
+
+def split_aggregate_expr(expr: str) -> tuple[str, str, str | None] | None:
+    """
+    split `count(a.b[*] where .c == 3)` into ("count", "a.b[*]", ".c == 3"),
+    None if `expr` is not an aggregate
+    """
+    m = _AGGREGATE_FUNC.match(expr)
+    if m is None:
+        return None
+    depth = 0
+    for pos in range(m.end() - 1, len(expr)):
+        if expr[pos] in "([":
+            depth += 1
+        elif expr[pos] in ")]":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+    if expr[pos + 1:].strip():
+        # ie: count(a[*]) + 1
+        return None
+    args = expr[m.end(): pos]
+    where = _WHERE.search(args)
+    if where is None:
+        return m["FUNC"], args.strip(), None
+    return m["FUNC"], args[:where.start()].strip(), args[where.end():].strip()
+
+
+def _c_div(lhs, rhs):
+    if np.issubdtype(np.result_type(lhs, rhs), np.integer):
+        # truncate toward zero as C does
+        return (lhs - np.fmod(lhs, rhs)) // rhs
+    return np.divide(lhs, rhs)
+
+
+_VECTOR_BINARY_OPS = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": _c_div,
+    "%": np.fmod,
+    "<<": np.left_shift,
+    ">>": np.right_shift,
+    "&": np.bitwise_and,
+    "|": np.bitwise_or,
+    "^": np.bitwise_xor,
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    ">": np.greater,
+    "<=": np.less_equal,
+    ">=": np.greater_equal,
+    "&&": np.logical_and,
+    "||": np.logical_or,
+}
+
+_VECTOR_UNARY_OPS = {
+    "-": np.negative,
+    "+": np.positive,
+    "~": np.invert,
+    "!": np.logical_not,
+}
+
+
+def _compile_vector(node: Node) -> Callable[[list[np.ndarray]], Any]:
+    # a predicate over member columns, evaluated on whole arrays at once
+    childs = node.children
+    match node.type:
+        case "translation_unit" | "expression_statement":
+            assert childs != [], "Empty predicate"
+            return _compile_vector(childs[0])
+        case "parenthesized_expression":
+            return _compile_vector(childs[1])
+        case "identifier":
+            m = _WHERE_PLACEHOLDER.fullmatch(node.text.decode())
+            if m is None:
+                raise InvalidExpression("Member shall start with '.' in where: %r" % node.text)
+            n = int(m["N"])
+            return lambda columns: columns[n]
+        case "number_literal":
+            text = node.text.decode()
+            try:
+                val, _ = parse_int_literal(text)
+            except ValueError:
+                try:
+                    val = float(text.rstrip("fFlL"))
+                except ValueError:
+                    raise InvalidExpression("Invalid number: %r" % node.text)
+            return lambda columns: val
+        case "binary_expression":
+            op = _VECTOR_BINARY_OPS.get(childs[1].type, None)
+            if op is None:
+                raise InvalidExpression("Operator not support in where: %r" % childs[1].text)
+            lhs = _compile_vector(childs[0])
+            rhs = _compile_vector(childs[2])
+            return lambda columns: op(lhs(columns), rhs(columns))
+        case "unary_expression":
+            op = _VECTOR_UNARY_OPS[childs[0].type]
+            operand = _compile_vector(childs[1])
+            return lambda columns: op(operand(columns))
+        case _:
+            raise InvalidExpression("Syntax not support in where: %r" % node.text)
+
+
+def _compile_where(predicate: str) -> tuple[tuple[str, ...], Callable[[list[np.ndarray]], Any]]:
+    """compile `.state == 3 && .a.b > 0` into the member paths and a vectorized function of their columns"""
+    members = []
+
+    def _placeholder(m: re.Match) -> str:
+        path = re.sub(r"\s+", "", m.group())
+        if path not in members:
+            members.append(path)
+        return " _m%d " % members.index(path)
+
+    # parenthesized, so it is never taken as a declaration
+    tree = get_syntax_tree("(%s);" % _WHERE_MEMBER.sub(_placeholder, predicate))
+    if tree.root_node.has_error:
+        raise InvalidExpression("Invalid syntax: %r" % predicate)
+    return tuple(members), _compile_vector(tree.root_node)
+
+
+@dataclass(slots=True)
+class _Aggregate(_Node):
+    """sum/min/max/count/any/all of a slice, ie: count(g_pool.items[*] where .state == 3)"""
+    func: str
+    column_expr: str
+    members: tuple[str, ...]
+    where: Callable[[list[np.ndarray]], Any] | None
+
+    def evaluate(self, ctx: _EvalContext) -> int | float:
+        src = _resolve_slice(ctx, self.column_expr)
+        members = [_slice_member(ctx.p, src.elem, path) for path in self.members]
+        is_number = src.layout["fields"] is None and column_dtype(src.layout["size"]).kind != "V"
+        if self.func in {"sum", "min", "max"} and not is_number:
+            raise InvalidExpression("Shall be a number to %s: %r" % (self.func, self.column_expr))
+
+        try:
+            with np.errstate(divide="raise", invalid="raise"):
+                result = self._reduce(ctx, src, members, is_number)
+        except FloatingPointError as e:
+            raise InvalidExpression("%s in %r" % (e, self.text))
+        if result is None:
+            if self.func in {"min", "max"}:
+                raise InvalidExpression("Nothing selected to %s: %r" % (self.func, self.text))
+            result = {"count": 0, "sum": 0, "any": 0, "all": 1}[self.func]
+        return result
+
+    def _reduce(self, ctx: _EvalContext, src: _SliceSource, members: list[pdb.StructRecord], is_number: bool) -> int | float | None:
+        # one block of elements at a time, combined into the result
+        size = src.elem["size"]
+        result = None
+        for index in _iter_blocks(src.index, size):
+            data, span_addr, first = _read_span(ctx, src, index)
+
+            def _values(layout: pdb.StructRecord) -> np.ndarray:
+                return _slice_column(ctx.p, self.column_expr, layout, data, span_addr, first, index.step * size, index, recursive=False).values
+
+            mask = None
+            if self.where is not None:
+                mask = np.broadcast_to(np.asarray(self.where([_values(x) for x in members])) != 0, (len(index),))
+            if is_number:
+                selected = _values(src.layout)
+                if mask is not None:
+                    selected = selected[mask]
+            else:
+                # a struct has no value, the predicate decides
+                selected = mask if mask is not None else np.ones(len(index), dtype=bool)
+
+            match self.func:
+                case "count":
+                    cnt = len(index) if mask is None else int(np.count_nonzero(mask))
+                    result = (result or 0) + cnt
+                case "sum":
+                    result = (result or 0) + selected.sum().item()
+                case "min" | "max" if selected.size:
+                    val = getattr(selected, self.func)().item()
+                    result = val if result is None else (min if self.func == "min" else max)(result, val)
+                case "any":
+                    result = int(bool(result) or bool(np.any(selected)))
+                    if result:
+                        break
+                case "all":
+                    result = int((result is None or bool(result)) and bool(np.all(selected)))
+                    if not result:
+                        break
+        return result
+
+
+def _iter_blocks(index: range, elem_size: int):
+    n = max(1, AGGREGATE_BLOCK_SIZE // max(1, abs(index.step) * elem_size))
+    for i in range(0, len(index), n):
+        yield index[i: i + n]
+
+
+def _compile_aggregate(expr: str) -> _Node | None:
+    parts = split_aggregate_expr(expr)
+    if parts is None:
+        return None
+    func, column_expr, predicate = parts
+    try:
+        if split_slice_expr(column_expr) is None:
+            raise InvalidExpression("Shall be a slice to %s, ie: a[*]: %r" % (func, column_expr))
+        members, where = _compile_where(predicate) if predicate is not None else ((), None)
+    except Exception as e:
+        return _Raise(expr.encode(), e)
+    return _Aggregate(expr.encode(), func, column_expr, members, where)
+
+
+def query_aggregate_from_expr(p: pdb.PDB7, expr: str, virt_base=0, io_stream=None, allow_null_pointer=False) -> int | float:
+    """evaluate an aggregate expression, ie: `max(g_pool.items[*].latency where .state == 3)`"""
+    root = compile_expr(p, expr).root
+    if not isinstance(root, (_Aggregate, _Raise)):
+        raise InvalidExpression("Not an aggregate expression: %r" % expr)
+    ctx = _EvalContext(p, virt_base, io_stream, allow_null_pointer, _arch_bits(p))
+    with _expr_errors(expr):
+        return ctx.evaluate(root)
+
+
+_LIST_FUNC = re.compile(r"\s*(?P<FUNC>list|list_entry)\s*\(")
+
+
+def split_list_expr(expr: str) -> tuple[str, tuple[str, ...]] | None:
+    """
+    split `list_entry(g_mgr.jobs, JOB, link, 100)` into ("list_entry", ("g_mgr.jobs", "JOB", "link", "100")),
+    None if `expr` is not a linked list
+    """
+    m = _LIST_FUNC.match(expr)
+    if m is None:
+        return None
+    depth = 0
+    commas = [m.end() - 1]
+    for pos in range(m.end() - 1, len(expr)):
+        if expr[pos] in "([":
+            depth += 1
+        elif expr[pos] in ")]":
+            depth -= 1
+            if depth == 0:
+                break
+        elif expr[pos] == "," and depth == 1:
+            commas.append(pos)
+    else:
+        return None
+    if expr[pos + 1:].strip():
+        return None
+    bounds = commas + [pos]
+    return m["FUNC"], tuple(expr[a + 1: b].strip() for a, b in zip(bounds, bounds[1:]))
+
+
+# `app!` in front of an identifier, not `!=` nor a logical not
+_MODULE_QUALIFIER = re.compile(r"(?<![\w.>$])(?P<MODULE>[A-Za-z_][\w.]*)!(?=\s*[A-Za-z_])")
+# an identifier, with the `.` or `->` if it is a member
+_IDENTIFIER = re.compile(r"(?P<MEMBER>(?:->|\.)\s*)?(?<![\w$])(?P<ID>[A-Za-z_]\w*)")
+
+
+def split_module_expr(expr: str) -> tuple[str, str] | None:
+    """
+    split `app!gA.s->p` into ("app", "gA.s->p"), named as `module_name` does,
+    None if `expr` names no module. all the qualifiers shall name the same one.
+    """
+    modules = {module_name(m["MODULE"]) for m in _MODULE_QUALIFIER.finditer(expr)}
+    if not modules:
+        return None
+    if len(modules) > 1:
+        raise InvalidExpression("Shall be of one module, got: %s" % ", ".join(sorted(modules)))
+    return modules.pop(), _MODULE_QUALIFIER.sub("", expr)
+
+
+def global_names(expr: str):
+    """generator of the identifiers in `expr` not being a member nor a keyword, in order"""
+    for m in _IDENTIFIER.finditer(expr):
+        if not m["MEMBER"] and m["ID"] not in _C_KEYWORDS:
+            yield m["ID"]
+
+
 if __name__ == "__main__":
     get_syntax_tree("A.a[1][2]")
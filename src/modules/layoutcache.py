@@ -0,0 +1,196 @@
+"""
+layouts of the types formed from the TPI stream once per LF record
+
+a layout is formed one level deep at address 0 and kept, the struct of the
+type at an address is a copy of it moved there. elements of an array are
+formed from the layout of the first one. names looked up and the targets of
+pointers are kept as well, the TPI stream is only read the first time a type
+is seen.
+"""
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any
+
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyarray import copy_shifted
+from modules.utils.perpdb import per_pdb
+
+_MEMBER_PATH = re.compile(r"\s*(?:\.\s*(?P<FIELD>[A-Za-z_]\w*)|\[\s*(?P<INDEX>\d+)\s*\])")
+
+
+@dataclass(frozen=True, slots=True)
+class FieldLayout:
+    """member of a type, the offset is from the start of the type"""
+    path: str
+    offset: int
+    size: int
+    bitoff: int | None
+    bitsize: int | None
+    has_sign: bool
+    is_real: bool
+    is_pointer: bool
+    lf: Any
+    target: Any = None
+
+
+def _compact(record: dict) -> dict:
+    """elements of an array formed from the first one once accessed"""
+    fields = record["fields"]
+    if isinstance(fields, list) and len(fields) > 1 and all(x is not None for x in fields[:2]):
+        stride = fields[1]["address"] - fields[0]["address"]
+        record["fields"] = ElementArray(fields[0], len(fields), stride)
+    return record
+
+
+class LayoutCache:
+    """
+    layouts of one PDB, keep the layouts as they are, `form` gives a copy to
+    fill values in. thread-safe, a type formed twice at once is kept once.
+    """
+
+    def __init__(self, p) -> None:
+        # no reference to the PDB, the cache is dropped once the PDB is
+        self.tpi = p.tpi_stream
+        self._pdb = weakref.ref(p)
+        self._lock = threading.Lock()
+        # id(lf): (lf, layout), the lf is kept so that its id is not reused
+        self._layouts: dict[int, tuple[Any, dict]] = {}
+        # id(lf): (lf, layout of the target or the error of deref)
+        self._targets: dict[int, tuple[Any, dict | Exception]] = {}
+        self._names: dict[str, tuple[Any, int]] = {}
+        self._members: dict[int, tuple[Any, dict[str, FieldLayout]]] = {}
+
+    def layout(self, lf) -> dict:
+        """layout of `lf` at address 0, shall not be modified"""
+        entry = self._layouts.get(id(lf), None)
+        if entry is None:
+            record = _compact(self.tpi.form_structs(lf, 0, recursive=False))
+            with self._lock:
+                entry = self._layouts.setdefault(id(lf), (lf, record))
+        return entry[1]
+
+    def form(self, lf, addr: int) -> dict:
+        """struct of type `lf` at `addr`, as `tpi_stream.form_structs(lf, addr, recursive=False)`"""
+        if addr is None:
+            # i.e. a pointer type casted from a value, not in memory
+            return self.tpi.form_structs(lf, None, recursive=False)
+        return copy_shifted(self.layout(lf), addr)
+
+    def _target(self, lf) -> dict:
+        entry = self._targets.get(id(lf), None)
+        if entry is None:
+            try:
+                target = _compact(self.tpi.deref_pointer(lf, 0, recursive=False))
+            except (ValueError, NotImplementedError) as e:
+                target = e
+            with self._lock:
+                entry = self._targets.setdefault(id(lf), (lf, target))
+        if isinstance(entry[1], Exception):
+            raise entry[1].with_traceback(None)
+        return entry[1]
+
+    def deref(self, lf, addr: int) -> dict:
+        """struct pointed to by a pointer of type `lf`, as `tpi_stream.deref_pointer(lf, addr, recursive=False)`"""
+        return copy_shifted(self._target(lf), addr)
+
+    def pointee(self, lf) -> Any:
+        """lf of the type pointed to, raises ValueError if `lf` is not a pointer"""
+        return self._target(lf)["lf"]
+
+    def lookup(self, name: str) -> tuple[Any, int]:
+        """(lf, offset) of a symbol or a type, as `get_lf_from_name`"""
+        found = self._names.get(name, None)
+        if found is None:
+            p = self._pdb()
+            assert p is not None, "PDB is gone"
+            found = p.get_lf_from_name(name)
+            with self._lock:
+                found = self._names.setdefault(name, found)
+        return found
+
+    def sizeof(self, lf) -> int:
+        return self.layout(lf)["size"]
+
+    def members(self, lf) -> dict[str, FieldLayout]:
+        """
+        flat table of all the members by path, i.e. "s.dwLen", through nested
+        structs and unions. an array or a pointer is a member itself, the elements
+        and the members pointed to are not in the table.
+        """
+        entry = self._members.get(id(lf), None)
+        if entry is None:
+            table: dict[str, FieldLayout] = {}
+            self._flatten(self.layout(lf), "", 0, table)
+            with self._lock:
+                entry = self._members.setdefault(id(lf), (lf, table))
+        return entry[1]
+
+    def _flatten(self, layout: dict, prefix: str, base: int, table: dict[str, FieldLayout]):
+        fields = layout["fields"]
+        if not isinstance(fields, dict):
+            return
+        for name, x in fields.items():
+            path = prefix + name
+            table[path] = self._field(path, x, base)
+            if x.get("lf", None) is not None and not x["is_pointer"]:
+                sub = self.layout(x["lf"])
+                if isinstance(sub["fields"], dict):
+                    self._flatten(sub, path + ".", base + x["address"], table)
+
+    def _field(self, path: str, x: dict, base: int) -> FieldLayout:
+        target = None
+        if x["is_pointer"] and x.get("lf", None) is not None:
+            try:
+                target = self.pointee(x["lf"])
+            except (ValueError, NotImplementedError):
+                pass
+        return FieldLayout(
+            path=path,
+            offset=base + x["address"],
+            size=x["size"],
+            bitoff=x["bitoff"],
+            bitsize=x["bitsize"],
+            has_sign=bool(x.get("has_sign", False)),
+            is_real=bool(x.get("is_real", False)),
+            is_pointer=bool(x["is_pointer"]),
+            lf=x.get("lf", None),
+            target=target,
+        )
+
+    def member(self, lf, path: str) -> FieldLayout:
+        """member `path` of `lf`, i.e. "s.dwLen" or "arr[1][2]", raises KeyError if not found"""
+        path = path.strip()
+        table = self.members(lf)
+        if path in table:
+            return table[path]
+        # through an array, resolved from the layouts
+        layout, base, pos = self.layout(lf), 0, 0
+        text = path if path.startswith((".", "[")) else "." + path
+        x = None
+        while pos < len(text):
+            m = _MEMBER_PATH.match(text, pos)
+            if m is None:
+                raise KeyError(path)
+            pos = m.end()
+            fields = layout["fields"]
+            if m["FIELD"] is not None:
+                if not isinstance(fields, dict) or m["FIELD"] not in fields:
+                    raise KeyError(path)
+                x = fields[m["FIELD"]]
+            else:
+                index = int(m["INDEX"])
+                if not isinstance(fields, list) or index >= len(fields):
+                    raise KeyError(path)
+                x = fields[index]
+            base += x["address"]
+            layout = self.layout(x["lf"]) if x.get("lf", None) is not None else {"fields": None}
+        if x is None:
+            raise KeyError(path)
+        return self._field(path, x, base - x["address"])
+
+
+@per_pdb
+def get_layout_cache(p) -> LayoutCache:
+    return LayoutCache(p)
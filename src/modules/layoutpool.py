@@ -0,0 +1,189 @@
+"""
+worker processes forming the struct layouts, the GUI process keeps the GIL for painting
+
+every worker loads the PDB once, a job is a module level function called with
+the worker PDB as the first argument. memory is not shared, a job reading the
+process memory gets a `SnapshotStream` of the pages copied so far. the pages
+not copied read as zeros and are all fetched at once after the run, the job is
+then run again, as many times as the pointers it follows are deep.
+
+members not formed in a worker are sent unformed, they are formed in the GUI
+process by the `former` of the pool once read.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from typing import Any
+from typing import Callable
+
+from modules.layoutcache import get_layout_cache
+from modules.pdbloader import load_pdb
+from modules.pdbparser.pdbparser import pdb
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyarray import ElementRows
+from modules.utils.lazyrecord import Former
+from modules.utils.lazyrecord import LazyRecord
+from modules.utils.readplan import PAGE_SIZE
+from modules.utils.readplan import ReadPlanner
+from modules.utils.record import Record
+from modules.utils.typ import Stream
+
+logger = logging.getLogger(__name__)
+
+_worker_pdb: pdb.PDB7 | None = None
+
+
+class SnapshotStream:
+    """
+    read-only stream over the memory pages copied from the process, None for an
+    unreadable page. a page not copied reads as zeros, its number kept in `missing`.
+    """
+
+    def __init__(self, pages: dict[int, bytes | None], page_size=PAGE_SIZE) -> None:
+        self.pages = pages
+        self.page_size = page_size
+        self.missing: set[int] = set()
+        self._offset = 0
+
+    def seek(self, offset: int, pos=os.SEEK_SET) -> int:
+        if pos == os.SEEK_CUR:
+            offset += self._offset
+        self._offset = offset
+        return self._offset
+
+    def tell(self) -> int:
+        return self._offset
+
+    def read(self, size: int) -> bytes:
+        if size <= 0:
+            return bytes()
+        psize = self.page_size
+        first, last = self._offset // psize, (self._offset + size - 1) // psize
+        chunks = []
+        for page in range(first, last + 1):
+            if page not in self.pages:
+                self.missing.add(page)
+                chunks.append(bytes(psize))
+                continue
+            data = self.pages[page]
+            if data is None:
+                raise OSError("Memory not readable: 0x%x" % (page * psize))
+            chunks.append(data)
+        off = self._offset - first * psize
+        data = b"".join(chunks)[off: off + size]
+        self._offset += len(data)
+        return data
+
+    def write(self, buf: bytes) -> int:
+        raise OSError("Snapshot is read-only")
+
+
+def _init_worker(filename: str):
+    global _worker_pdb
+    _worker_pdb = load_pdb(filename)
+
+
+def _drop_lf(obj: Any):
+    """
+    the type records are the most of a pickled layout, and the worker copies
+    are not the ones of the GUI process anyway, the type name is kept to look up.
+    """
+    if isinstance(obj, LazyRecord) and not obj.formed:
+        # left unformed, the lf is only sent if the type name does not find it
+        with suppress(Exception):
+            if get_layout_cache(_worker_pdb).lookup(obj["type"])[0] is obj["lf"]:
+                obj["lf"] = None
+    elif isinstance(obj, ElementArray):
+        # the elements are not formed yet
+        _drop_lf(obj.template)
+    elif isinstance(obj, ElementRows):
+        _drop_lf(obj.leaves)
+    elif isinstance(obj, list):
+        for x in obj:
+            _drop_lf(x)
+    elif isinstance(obj, dict | Record):
+        fields = obj.get("fields", None)
+        if "lf" in obj:
+            obj["lf"] = None
+        _drop_lf(list(fields.values()) if isinstance(fields, dict) else fields)
+
+
+def _bind_former(obj: Any, former: Former):
+    """`former` for the records sent unformed, as `_drop_lf` walks them"""
+    if isinstance(obj, LazyRecord) and not obj.formed:
+        obj.bind(former)
+    elif isinstance(obj, ElementArray):
+        _bind_former(obj.template, former)
+    elif isinstance(obj, ElementRows):
+        _bind_former(obj.leaves, former)
+    elif isinstance(obj, list):
+        for x in obj:
+            _bind_former(x, former)
+    elif isinstance(obj, dict | Record):
+        fields = obj.get("fields", None)
+        _bind_former(list(fields.values()) if isinstance(fields, dict) else fields, former)
+
+
+def _call(fn: Callable, args: tuple, kwargs: dict) -> Any:
+    result = fn(_worker_pdb, *args, **kwargs)
+    _drop_lf(result)
+    return result
+
+
+def _call_with_snapshot(fn: Callable, pages: dict[int, bytes | None], args: tuple, kwargs: dict) -> tuple[Any, list[int]]:
+    """(result, pages missing), the result is of no use if any page is missing"""
+    stream = SnapshotStream(pages)
+    try:
+        result = _call(fn, args, dict(kwargs, io_stream=stream))
+    except Exception:
+        if not stream.missing:
+            raise
+        # likely failed on the zeros
+        result = None
+    return result, sorted(stream.missing)
+
+
+class LayoutPool:
+    """
+    jobs run in parallel over all the cores, submit them from worker threads,
+    `run` blocks until the result is back.
+    """
+
+    def __init__(self, filename: str, max_workers: int | None=None, former: Former | None=None) -> None:
+        self.filename = filename
+        self.former = former
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            # no fork, the GUI process is multithreaded
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(filename,),
+        )
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        `fn(worker_pdb, *args, **kwargs)` in a worker, `fn` shall be a module level function.
+        the records returned have no "lf".
+        """
+        return self._received(self._executor.submit(_call, fn, args, kwargs).result())
+
+    def run_with_memory(self, fn: Callable, io_stream: Stream, *args, **kwargs) -> Any:
+        """as `run`, with `io_stream` passed as a snapshot of the pages the job reads"""
+        reader = ReadPlanner(io_stream)
+        while True:
+            result, missing = self._executor.submit(_call_with_snapshot, fn, reader.pages, args, kwargs).result()
+            if not missing:
+                return self._received(result)
+            # every round fetches at least one page more, it ends
+            logger.debug("snapshot: fetch %d pages", len(missing))
+            reader.prefetch((page * PAGE_SIZE, PAGE_SIZE) for page in missing)
+
+    def _received(self, result: Any) -> Any:
+        if self.former is not None:
+            _bind_former(result, self.former)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,185 @@
+"""
+pdbins of the .pdb files opened, kept in a cache directory
+
+a pdbin is named by the GUID and the age of its PDB, as on a symbol server,
+and by a hash of the content, since a PDB rebuilt incrementally may keep both.
+the hash of a file is remembered with its size and mtime, a PDB not modified
+since is not read again.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from modules.utils.pdbin import is_pdbin_v2
+
+MSF_MAGIC = b"Microsoft C/C++ MSF 7.00\r\n\x1aDS\x00\x00\x00"
+# magic, block size, free block map, number of blocks, directory bytes, unknown, block map address
+_SUPERBLOCK = struct.Struct("<32sIIIIII")
+# version, signature, age, GUID
+_PDB_INFO = struct.Struct("<III16s")
+PDB_INFO_STREAM = 1
+_NIL_STREAM = 0xFFFFFFFF
+
+MAX_ENTRIES = 16
+INDEX_FILE = "index.json"
+_HASH_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class PdbSignature:
+    guid: str
+    age: int
+    digest: str
+
+    @property
+    def key(self) -> str:
+        return "%s%X-%s" % (self.guid, self.age, self.digest)
+
+
+def _read_msf_stream(f, index: int) -> bytes:
+    f.seek(0)
+    head = f.read(_SUPERBLOCK.size)
+    if len(head) != _SUPERBLOCK.size or head[:len(MSF_MAGIC)] != MSF_MAGIC:
+        raise ValueError("Not a PDB 7.0 file: %r" % f.name)
+    _, block_size, _, num_blocks, dir_bytes, _, map_addr = _SUPERBLOCK.unpack(head)
+
+    def read_blocks(blocks, size: int) -> bytes:
+        data = bytearray()
+        for b in blocks:
+            if b >= num_blocks:
+                raise ValueError("Bad block %d in %r" % (b, f.name))
+            f.seek(b * block_size)
+            data += f.read(block_size)
+        return bytes(data[:size])
+
+    num_dir_blocks = -(-dir_bytes // block_size)
+    directory = read_blocks(struct.unpack("<%dI" % num_dir_blocks, read_blocks([map_addr], 4 * num_dir_blocks)), dir_bytes)
+    num_streams, = struct.unpack_from("<I", directory)
+    if index >= num_streams:
+        raise ValueError("No stream %d in %r" % (index, f.name))
+    sizes = struct.unpack_from("<%dI" % num_streams, directory, 4)
+    pos = 4 + 4 * num_streams
+    for i, size in enumerate(sizes):
+        size = 0 if size == _NIL_STREAM else size
+        count = -(-size // block_size)
+        if i == index:
+            return read_blocks(struct.unpack_from("<%dI" % count, directory, pos), size)
+        pos += 4 * count
+    raise AssertionError("unreachable")
+
+
+def read_guid_age(pdb_file: str | Path) -> tuple[str, int]:
+    """GUID and age from the PDB info stream, the GUID as on a symbol server"""
+    with open(pdb_file, "rb") as f:
+        info = _read_msf_stream(f, PDB_INFO_STREAM)
+    _, _, age, guid = _PDB_INFO.unpack_from(info)
+    d1, d2, d3 = struct.unpack_from("<IHH", guid)
+    return "%08X%04X%04X%s" % (d1, d2, d3, guid[8:].hex().upper()), age
+
+
+def file_digest(filename: str | Path) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    with open(filename, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_of(filename: str) -> list[int]:
+    st = os.stat(filename)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class PdbinCache:
+    """
+    pdbins in `cache_dir`, the least recently used ones are removed beyond
+    `max_entries`. thread-safe, a PDB may be hashed off the GUI thread.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_entries: int=MAX_ENTRIES) -> None:
+        self.dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # path of PDB: [size, mtime_ns, key]
+        self._index: dict[str, list] = {}
+        try:
+            with open(self.dir / INDEX_FILE) as fs:
+                self._index = json.load(fs)
+        except (OSError, ValueError):
+            pass
+
+    def _save_index(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / (INDEX_FILE + ".tmp")
+        with open(tmp, "w") as fs:
+            json.dump(self._index, fs)
+        os.replace(tmp, self.dir / INDEX_FILE)
+
+    def signature(self, pdb_file: str | Path) -> PdbSignature:
+        path = str(Path(pdb_file).resolve())
+        stat = _stat_of(path)
+        with self._lock:
+            entry = self._index.get(path, None)
+        if entry is not None and entry[:2] == stat:
+            guid, age, digest = entry[2]
+            return PdbSignature(guid, age, digest)
+        guid, age = read_guid_age(path)
+        sig = PdbSignature(guid, age, file_digest(path))
+        with self._lock:
+            self._index[path] = stat + [[sig.guid, sig.age, sig.digest]]
+            self._save_index()
+        return sig
+
+    def is_stale(self, pdb_file: str | Path) -> bool:
+        """modified since its signature is taken, or never taken"""
+        path = str(Path(pdb_file).resolve())
+        with self._lock:
+            entry = self._index.get(path, None)
+        try:
+            return entry is None or entry[:2] != _stat_of(path)
+        except OSError:
+            return True
+
+    def path_of(self, pdb_file: str | Path) -> Path:
+        return self.dir / ("%s-%s.pdbin" % (Path(pdb_file).stem, self.signature(pdb_file).key))
+
+    def lookup(self, pdb_file: str | Path) -> Path | None:
+        """the pdbin matching the PDB now, None if not converted yet"""
+        out = self.path_of(pdb_file)
+        if not out.exists() or not is_pdbin_v2(out):
+            return None
+        # as recently used
+        os.utime(out)
+        return out
+
+    def missing(self, pdb_files: list[str | Path]) -> list[str]:
+        """the files not in the cache, ones failed to read are left out"""
+        out = []
+        for f in pdb_files:
+            try:
+                if self.lookup(f) is None:
+                    out.append(str(f))
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def outputs(self, pdb_files: list[str | Path]) -> dict[str, Path]:
+        """where to convert the files to, as `outputs` of PdbConverter"""
+        return {str(f): self.path_of(f) for f in pdb_files}
+
+    def prune(self, keep: list[Path]=()):
+        """remove the least recently used pdbins beyond `max_entries`, except ones in `keep`"""
+        keep = {Path(x).resolve() for x in keep}
+        pdbins = sorted(self.dir.glob("*.pdbin"), key=lambda x: x.stat().st_mtime_ns, reverse=True)
+        for x in pdbins[self.max_entries:]:
+            if x.resolve() in keep:
+                continue
+            try:
+                x.unlink()
+            except OSError:
+                # still mapped
+                pass
@@ -0,0 +1,217 @@
+"""
+PDB files the debugger loads: a .pdb parsed at once, or a .pdbin converted from it
+
+a pdbin v2 is opened by mmap and its types are decoded once used, a pdbin of
+the former format is a pickled PDB object, unpickled as a whole.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from modules.pdbparser.pdbparser import pdb
+from modules.pdbparser.pdbparser import picklepdb
+from modules.utils.pdbin import MappedPdb
+from modules.utils.pdbin import is_pdbin_v2
+from modules.utils.pdbin import write_pdbin
+
+logger = logging.getLogger(__name__)
+
+# share of the progress of a file, parsing the PDB cannot be followed
+_STAGE_SPAN = {
+    "queued": (0.0, 0.0),
+    "parse": (0.0, 0.4),
+    "types": (0.4, 0.9),
+    "write": (0.9, 1.0),
+}
+_FINAL_STAGES = {"done", "failed", "cancelled"}
+
+
+def load_pdb(filename: str) -> pdb.PDB7 | MappedPdb:
+    if Path(filename).suffix == ".pdb":
+        return pdb.parse(filename)
+    if is_pdbin_v2(filename):
+        return MappedPdb(filename)
+    return picklepdb.load_pdbin(filename)
+
+
+class ConversionCancelled(Exception):
+    """conversion of a file cancelled before it was done"""
+
+
+@dataclass(slots=True)
+class ConvertEvent:
+    """
+    progress of one file, `done` of `total` in `stage`, which is one of
+    queued, parse (bytes), types, write (sections), done, failed or cancelled.
+    """
+    file: str
+    stage: str
+    done: int = 0
+    total: int = 0
+    error: str = ""
+
+    @property
+    def fraction(self) -> float:
+        if self.stage in _FINAL_STAGES:
+            return 1.0
+        lo, hi = _STAGE_SPAN[self.stage]
+        return lo + (hi - lo) * (self.done / self.total if self.total else 0.0)
+
+
+def _convert(pdb_file: str, out: str, conn):
+    def report(stage: str, done: int, total: int):
+        conn.send(ConvertEvent(pdb_file, stage, done, total))
+
+    try:
+        size = os.path.getsize(pdb_file)
+        report("parse", 0, size)
+        p = pdb.parse(pdb_file)
+        report("parse", size, size)
+        write_pdbin(p, out, progress=report)
+    except Exception as e:
+        conn.send(ConvertEvent(pdb_file, "failed", error="%s: %s" % (type(e).__name__, e)))
+    else:
+        conn.send(ConvertEvent(pdb_file, "done"))
+    finally:
+        conn.close()
+
+
+def output_of(pdb_file: str | Path, out_dir: Path) -> Path:
+    """
+    `out_dir / <hash of the folder> / <name>.pdbin`, the PDBs of a tree share
+    names (vc143.pdb of each intermediate folder, app.pdb of Debug and Release)
+    """
+    folder = os.path.normcase(os.path.abspath(Path(pdb_file).parent))
+    digest = hashlib.sha1(folder.encode("utf-8", "surrogatepass")).hexdigest()[:8]
+    return out_dir / digest / (Path(pdb_file).stem + ".pdbin")
+
+
+class PdbConverter:
+    """
+    .pdb files converted to pdbin v2 in worker processes, one process per file,
+    at most one running per core. `poll` from the GUI thread for the progress
+    and to start the queued files.
+    each is written under `out_dir` by `output_of`, unless given in `outputs`.
+    """
+
+    def __init__(self, pdb_files: list[Path], out_dir: Path, max_workers: int | None=None, outputs: dict[str, Path] | None=None) -> None:
+        self.files = list(dict.fromkeys(str(x) for x in pdb_files))
+        self.out_dir = out_dir
+        self.outputs = {f: output_of(f, out_dir) for f in self.files}
+        self.outputs.update({str(f): Path(out) for f, out in (outputs or {}).items()})
+        self.max_workers = max(1, min(len(self.files), max_workers or os.cpu_count() or 1))
+        self.progress = {f: ConvertEvent(f, "queued") for f in self.files}
+        self._queued: list[str] = []
+        # file -> (process, receiving end of its pipe), a pipe per process as
+        # a terminated writer leaves its pipe broken
+        self._running: dict[str, tuple] = {}
+        self._ctx = None
+
+    def start(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        # no fork, the GUI process is multithreaded
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queued = list(self.files)
+        self._start_queued()
+
+    def _start_queued(self):
+        while self._queued and len(self._running) < self.max_workers:
+            f = self._queued.pop(0)
+            self.outputs[f].parent.mkdir(parents=True, exist_ok=True)
+            recv, send = self._ctx.Pipe(duplex=False)
+            proc = self._ctx.Process(target=_convert, args=(f, str(self.outputs[f]), send), daemon=True)
+            proc.start()
+            send.close()
+            self._running[f] = (proc, recv)
+
+    def _update(self, ev: ConvertEvent, out: list[ConvertEvent]):
+        if self.progress[ev.file].stage not in _FINAL_STAGES:
+            self.progress[ev.file] = ev
+            out.append(ev)
+
+    def poll(self) -> list[ConvertEvent]:
+        """events since the last poll, the final one of a file once its worker is done"""
+        out = []
+        for f, (proc, recv) in list(self._running.items()):
+            # checked first, all a finished worker sent is in the pipe then
+            alive = proc.is_alive()
+            try:
+                while recv.poll():
+                    self._update(recv.recv(), out)
+            except (EOFError, OSError):
+                pass
+            if alive:
+                continue
+            proc.join()
+            recv.close()
+            del self._running[f]
+            # killed without a word, e.g. out of memory
+            self._update(ConvertEvent(f, "failed", error="worker exited with code %s" % proc.exitcode), out)
+        if self._ctx is not None:
+            self._start_queued()
+        return out
+
+    def cancel(self, file: str | Path):
+        """a queued file is dropped, a running one is terminated with its partial output"""
+        file = str(file)
+        if file in self._queued:
+            self._queued.remove(file)
+        elif file in self._running:
+            proc, recv = self._running.pop(file)
+            proc.terminate()
+            proc.join()
+            recv.close()
+            Path(str(self.outputs[file]) + ".tmp").unlink(missing_ok=True)
+        else:
+            return
+        self._update(ConvertEvent(file, "cancelled"), [])
+
+    def cancel_all(self):
+        for f in self.files:
+            self.cancel(f)
+
+    @property
+    def finished(self) -> bool:
+        return all(ev.stage in _FINAL_STAGES for ev in self.progress.values())
+
+    def fraction(self) -> float:
+        return sum(ev.fraction for ev in self.progress.values()) / max(1, len(self.progress))
+
+    def wait(self) -> dict[str, Path | Exception]:
+        """block until all are done, the output or the error of each file"""
+        while not self.finished:
+            self.poll()
+            time.sleep(0.05)
+        results = {}
+        for f, ev in self.progress.items():
+            if ev.stage == "done":
+                results[f] = self.outputs[f]
+            elif ev.stage == "cancelled":
+                results[f] = ConversionCancelled(f)
+            else:
+                results[f] = RuntimeError("%s: %s" % (f, ev.error))
+        return results
+
+    def shutdown(self):
+        self._queued.clear()
+        for f in list(self._running):
+            self.cancel(f)
+        self._ctx = None
+
+
+def convert_pdbs(pdb_files: list[Path], out_dir: Path) -> list[Path]:
+    """convert each .pdb to a .pdbin of `output_of` in the v2 format, in parallel"""
+    converter = PdbConverter(pdb_files, out_dir)
+    converter.start()
+    try:
+        results = converter.wait()
+    finally:
+        converter.shutdown()
+    for f, res in results.items():
+        if isinstance(res, Exception):
+            raise res
+    return list(results.values())
@@ -0,0 +1,82 @@
+"""
+PDBs of the modules of a process, i.e. an EXE and its DLLs
+
+a module is named by the stem of its file in lower case, the same for the PDB
+and the image, `app.pdb` is of `app.exe`. an unqualified name is resolved
+through one index merged from the symbols and types of all the modules, the
+main module first.
+"""
+import bisect
+from dataclasses import dataclass
+from pathlib import PureWindowsPath
+from typing import Any
+from typing import Iterable
+from typing import Mapping
+
+from modules.symtable import get_symbol_table
+
+
+def module_name(filename: str) -> str:
+    """`C:\\bin\\App.exe` and `app.pdb` are both `app`"""
+    return PureWindowsPath(filename).stem.lower()
+
+
+@dataclass
+class PdbModule:
+    name: str
+    # .pdb or .pdbin opened
+    source: str
+    # file loaded, the pdbin converted from `source` if any
+    filename: str
+    pdb: Any
+
+
+class ModuleIndex:
+    """module of each global symbol and type name, the first one having it"""
+
+    def __init__(self, modules: list[tuple[str, Any]]) -> None:
+        self.modules = [name for name, _ in modules]
+        owners: dict[str, str] = {}
+        for name, p in reversed(modules):
+            if p is None:
+                continue
+            owners.update(dict.fromkeys(get_symbol_table(p).names, name))
+            # struct names, if the parser keeps them by name
+            owners.update(dict.fromkeys(getattr(p.tpi_stream, "structs", {}), name))
+        self._owners = owners
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def owner(self, name: str) -> str | None:
+        return self._owners.get(name, None)
+
+    def resolve(self, names: Iterable[str]) -> str | None:
+        """module of the first one of `names` found, None if none is"""
+        for name in names:
+            if (module := self._owners.get(name, None)) is not None:
+                return module
+        return None
+
+
+class ModuleBases:
+    """base address of each module loaded in the process, by module name"""
+
+    def __init__(self, bases: Mapping[str, int]) -> None:
+        self.bases = {module_name(f): base for f, base in bases.items()}
+        ordered = sorted(self.bases.items(), key=lambda x: x[1])
+        self._names = [name for name, _ in ordered]
+        self._starts = [base for _, base in ordered]
+
+    def __contains__(self, name) -> bool:
+        return name in self.bases
+
+    def get(self, name: str) -> int | None:
+        return self.bases.get(name, None)
+
+    def locate(self, addr: int) -> tuple[str, int] | None:
+        """(name, base) of the module `addr` is in, the nearest one below it"""
+        i = bisect.bisect_right(self._starts, addr) - 1
+        if i < 0:
+            return None
+        return self._names[i], self._starts[i]
@@ -0,0 +1,174 @@
+"""
+global symbols of a PDB in parallel arrays, built once after load
+
+rows are sorted by name, a prefix is a slice found by bisect, an address range
+a slice of the rows sorted by offset. the type of a symbol is an index into the
+types of the table, named and sized only once a query needs them. results of
+a query are kept, the same query again is a lookup.
+"""
+import bisect
+import re
+import threading
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any
+from typing import Iterator
+from typing import Mapping
+
+import numpy as np
+
+from modules.layoutcache import get_layout_cache
+from modules.utils.pdbin import SYMBOL_GLOBAL
+from modules.utils.pdbin import MappedPdb
+from modules.utils.perpdb import per_pdb
+
+MAX_CACHED_QUERIES = 64
+
+
+def is_special_symbol(name: str) -> bool:
+    # built-in special symbols, i.e. "__imp_xxx" or "xxx$"
+    return name.startswith("_") or name.endswith("$")
+
+
+class SymbolTable:
+    """
+    `names`, `offsets` and `type_ids` of the global symbols by row, `sizes`
+    once asked for. `type_ids` is -1 for one of no type, i.e. a function.
+    """
+
+    def __init__(self, p, names: list[str], offsets: np.ndarray, type_ids: np.ndarray, types: list[Any]) -> None:
+        order = sorted(range(len(names)), key=names.__getitem__)
+        self.names = [names[i] for i in order]
+        self.offsets = np.asarray(offsets, dtype=np.uint64)[order]
+        self.type_ids = np.asarray(type_ids, dtype=np.int64)[order]
+        # lf of each type id
+        self.types = types
+        self._layouts = get_layout_cache(p)
+        self._rows = {name: i for i, name in enumerate(self.names)}
+        self._by_offset = np.argsort(self.offsets, kind="stable")
+        self._sorted_offsets = self.offsets[self._by_offset]
+        self._lock = threading.Lock()
+        self._queries: dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def from_pdb(cls, p) -> "SymbolTable":
+        if isinstance(p, MappedPdb):
+            # the names are decoded once here, the types are refs into the file
+            f = p.file
+            rows = np.flatnonzero(f.symbols["kind"] == SYMBOL_GLOBAL)
+            names, keep = [], []
+            for i in rows.tolist():
+                name = f.name(i)
+                if not is_special_symbol(name):
+                    names.append(name)
+                    keep.append(i)
+            keep = np.array(keep, dtype=np.int64)
+            tids = f.symbols["type"][keep]
+            # only the types of the symbols, numbered from 0
+            used, type_ids = np.unique(tids, return_inverse=True)
+            type_ids = np.where(tids < 0, -1, type_ids - np.count_nonzero(used < 0))
+            types = [f.ref(int(i)) for i in used[used >= 0]]
+            return cls(p, names, f.symbols["offset"][keep], type_ids, types)
+
+        names, offsets, type_ids = [], [], []
+        ids: dict[int, int] = {}
+        types = []
+        for name in p.glb_stream.symbols.keys():
+            if is_special_symbol(name):
+                continue
+            try:
+                lf, offset = p.get_lf_from_name(name)
+            except Exception:
+                continue
+            if lf is not None and id(lf) not in ids:
+                ids[id(lf)] = len(types)
+                types.append(lf)
+            names.append(name)
+            offsets.append(offset or 0)
+            type_ids.append(-1 if lf is None else ids[id(lf)])
+        return cls(p, names, offsets, type_ids, types)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._rows
+
+    def row(self, name: str) -> int:
+        """row of `name`, raises KeyError if not a global symbol"""
+        return self._rows[name]
+
+    def offset(self, name: str) -> int:
+        return int(self.offsets[self._rows[name]])
+
+    def type_name(self, type_id: int) -> str:
+        if type_id < 0:
+            return ""
+        return self._layouts.layout(self.types[type_id])["type"]
+
+    def size(self, row: int) -> int:
+        """size of the type of the symbol at `row`, as `sizes[row]` without sizing all"""
+        type_id = int(self.type_ids[row])
+        return 0 if type_id < 0 else self._layouts.sizeof(self.types[type_id])
+
+    @cached_property
+    def type_names(self) -> list[str]:
+        return [self.type_name(i) for i in range(len(self.types))]
+
+    @cached_property
+    def sizes(self) -> np.ndarray:
+        """size of the type of each symbol, 0 for one of no type"""
+        used = np.unique(self.type_ids[self.type_ids >= 0])
+        type_sizes = np.zeros(len(self.types) + 1, dtype=np.uint64)
+        for i in used.tolist():
+            type_sizes[i] = self._layouts.sizeof(self.types[i])
+        # -1 takes the last one, always 0
+        return type_sizes[self.type_ids]
+
+    @cached_property
+    def symbols(self) -> Mapping[str, int]:
+        """offset by name, shared by all the callers"""
+        return MappingProxyType(dict(zip(self.names, self.offsets.tolist())))
+
+    def select(self, prefix="", pattern="", type_name="", start: int | None=None, end: int | None=None) -> np.ndarray:
+        """
+        rows of the symbols starting with `prefix`, matching the regex `pattern`,
+        of the type named `type_name`, and at an offset in [`start`, `end`), in
+        order of the names.
+        """
+        key = (prefix, pattern, type_name, start, end)
+        found = self._queries.get(key, None)
+        if found is not None:
+            return found
+        rows = np.arange(len(self.names))
+        if prefix:
+            lo = bisect.bisect_left(self.names, prefix)
+            hi = bisect.bisect_left(self.names, prefix + "\U0010ffff", lo)
+            rows = rows[lo:hi]
+        if start is not None or end is not None:
+            lo = 0 if start is None else int(np.searchsorted(self._sorted_offsets, np.uint64(max(start, 0))))
+            hi = len(self.names) if end is None else int(np.searchsorted(self._sorted_offsets, np.uint64(max(end, 0))))
+            rows = np.intersect1d(rows, self._by_offset[lo:hi], assume_unique=True)
+        if type_name:
+            ids = [i for i, name in enumerate(self.type_names) if name == type_name]
+            rows = rows[np.isin(self.type_ids[rows], ids)]
+        if pattern:
+            reg = re.compile(pattern)
+            rows = np.array([i for i in rows.tolist() if reg.search(self.names[i])], dtype=np.int64)
+        rows.flags.writeable = False
+        with self._lock:
+            if len(self._queries) >= MAX_CACHED_QUERIES:
+                self._queries.pop(next(iter(self._queries)))
+            self._queries[key] = rows
+        return rows
+
+    def items(self, rows: np.ndarray | None=None) -> Iterator[tuple[str, int]]:
+        """(name, offset) of the `rows`, all if None"""
+        rows = np.arange(len(self.names)) if rows is None else np.asarray(rows)
+        for i, offset in zip(rows.tolist(), self.offsets[rows].tolist()):
+            yield self.names[i], offset
+
+
+@per_pdb
+def get_symbol_table(p) -> SymbolTable:
+    return SymbolTable.from_pdb(p)
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator
+from typing import Self
+
+import numpy as np
+
+from modules.utils.typ import Stream
+
+
+def column_dtype(size: int, is_real=False, signed=False) -> np.dtype:
+    if is_real and size in {2, 4, 8}:
+        return np.dtype("<f%d" % size)
+    if size in {1, 2, 4, 8}:
+        return np.dtype("<%s%d" % ("i" if signed else "u", size))
+    # not a number, ie: a struct or an array
+    return np.dtype("V%d" % size)
+
+
+@dataclass(eq=False)
+class ArrayColumn:
+    """
+    one member across the elements of an array, decoded from a single block read
+
+    `data` holds the whole array span, the member of the n-th element starts
+    at `data[offset + n * stride]`. sub columns of a struct member share the
+    same `data`, so no more read is needed to go deeper.
+    """
+    expr: str
+    type: str
+    address: int
+    data: bytes
+    offset: int
+    stride: int
+    count: int
+    size: int
+    bitoff: int | None = None
+    bitsize: int | None = None
+    has_sign: bool = False
+    is_real: bool = False
+    is_pointer: bool = False
+    index: range | None = None
+    fields: dict[str, Self] | list[Self] | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        return iter(self.values.tolist())
+
+    def __getattr__(self, name: str):
+        # member columns by attribute as CStruct does, ie: column.refcnt
+        fields = self.__dict__.get("fields", None)
+        if name.startswith("_") or not isinstance(fields, dict) or name not in fields:
+            raise AttributeError(name)
+        return fields[name]
+
+    def __getitem__(self, key: int | slice | str):
+        if isinstance(key, str):
+            return self.field(key)
+        val = self.values[key]
+        return val.item() if isinstance(val, np.generic) else val
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def __repr__(self) -> str:
+        return "<ArrayColumn %r %s x %d>" % (self.expr, self.type, self.count)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return column_dtype(self.size, self.is_real, self.has_sign and self.bitsize is None)
+
+    @cached_property
+    def values(self) -> np.ndarray:
+        if self.count == 0:
+            return np.empty(0, self.dtype)
+        arr = np.ndarray(
+            shape=(self.count,),
+            dtype=self.dtype,
+            buffer=self.data,
+            offset=self.offset,
+            strides=(self.stride,),
+        )
+        if self.bitoff is not None and self.bitsize is not None:
+            arr = (arr >> self.bitoff) & ((1 << self.bitsize) - 1)
+        return arr
+
+    @property
+    def addresses(self) -> np.ndarray:
+        return self.address + self.stride * np.arange(self.count, dtype=np.int64)
+
+    def field(self, key: str | int) -> Self:
+        if self.fields is None:
+            raise KeyError("%r has no member: %r" % (self.expr, key))
+        return self.fields[key]
+
+    def iter_columns(self) -> Iterator[Self]:
+        yield self
+        children = self.fields.values() if isinstance(self.fields, dict) else self.fields or []
+        for c in children:
+            yield from c.iter_columns()
+
+    def leaves(self) -> list[Self]:
+        """columns with no more member, i.e. columns of a table"""
+        return [c for c in self.iter_columns() if c.fields is None]
+
+    def reload(self, stream: Stream):
+        """read the array span again, sub columns are updated as well"""
+        stream.seek(self.address - self.offset)
+        data = stream.read(len(self.data))
+        if len(data) != len(self.data):
+            raise OSError("Fail to read %d bytes at 0x%x" % (len(self.data), self.address - self.offset))
+        for c in self.iter_columns():
+            c.data = data
+            c.__dict__.pop("values", None)
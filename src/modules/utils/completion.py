@@ -0,0 +1,126 @@
+import re
+from bisect import bisect_left
+from bisect import bisect_right
+from typing import Iterable
+
+import numpy as np
+
+# a fuzzy query scans the names until this many matches, then ranks them
+MAX_FUZZY_MATCHES = 500
+
+# bit of every char in the lower-case names, the rest share the last bit
+_CHAR_BITS = np.full(256, 37, dtype=np.uint64)
+for _i, _c in enumerate(b"abcdefghijklmnopqrstuvwxyz0123456789_"):
+    _CHAR_BITS[_c] = _i
+_CHAR_BITS = np.left_shift(np.uint64(1), _CHAR_BITS)
+
+_WORD = re.compile(r"[A-Za-z_]\w*\Z")
+_CLOSING = {")": "(", "]": "["}
+
+
+def _char_mask(data: bytes) -> int:
+    return int(np.bitwise_or.reduce(_CHAR_BITS[np.frombuffer(data, dtype=np.uint8)]))
+
+
+class CompletionIndex:
+    """
+    names sorted case-insensitively, a prefix is a bisect range of the array.
+    for a subsequence (fuzzy) query, the names not having all the letters are
+    dropped by their letter bitmasks at once, the rest are matched by a regex.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names = sorted(set(names), key=lambda x: (x.lower(), x))
+        self._keys = [x.lower() for x in self.names]
+        data = "\n".join(self._keys).encode("utf-8", "replace") + b"\n"
+        lines = np.frombuffer(data, dtype=np.uint8)
+        starts = np.concatenate(([0], np.flatnonzero(lines == ord("\n"))[:-1] + 1)) if self._keys else np.zeros(0, np.int64)
+        self._masks = np.bitwise_or.reduceat(_CHAR_BITS[lines], starts) if self._keys else np.zeros(0, np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def prefix(self, text: str, limit=50) -> list[str]:
+        key = text.lower()
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key + "\uffff", lo, min(len(self._keys), lo + limit))
+        # exact case first, then the shorter ones
+        return sorted(self.names[lo: hi], key=lambda x: (not x.startswith(text), len(x), x))
+
+    def fuzzy(self, text: str, limit=50) -> list[str]:
+        """names having the letters of `text` in order, tight and word-start matches first"""
+        if not text:
+            return []
+        key = text.lower()
+        qmask = np.uint64(_char_mask(key.encode("utf-8", "replace")))
+        candidates = np.flatnonzero((self._masks & qmask) == qmask)
+        # leftmost match of each letter, no backtracking
+        pattern = re.compile("".join(
+            "[^%s]*(%s)" % (re.escape(c), re.escape(c)) for c in key
+        ))
+        scored = []
+        for i in candidates.tolist():
+            if m := pattern.match(self._keys[i]):
+                scored.append((self._score(self.names[i], m), i))
+                if len(scored) >= MAX_FUZZY_MATCHES:
+                    break
+        scored.sort()
+        return [self.names[i] for _, i in scored[:limit]]
+
+    def _score(self, name: str, m: re.Match) -> tuple:
+        pos = [m.start(g) for g in range(1, (m.lastindex or 0) + 1)]
+        gaps = pos[-1] - pos[0] - len(pos) + 1
+        words = sum(p == 0 or name[p - 1] == "_" or (name[p].isupper() and name[p - 1].islower()) for p in pos)
+        return (-words, gaps, pos[0], len(name), name)
+
+    def complete(self, text: str, limit=50) -> list[str]:
+        """prefix matches, then the fuzzy ones"""
+        out = self.prefix(text, limit)
+        if len(out) < limit and len(text) > 1:
+            seen = set(out)
+            out += [x for x in self.fuzzy(text, limit) if x not in seen][: limit - len(out)]
+        return out
+
+
+def split_member_access(text: str) -> tuple[str, str, str]:
+    """
+    split the text being typed into (lhs, notation, word), i.e.
+
+        "gA.s->szB"        -> ("gA.s", "->", "szB")
+        "(T *)gB.s[1].d"   -> ("gB.s[1]", ".", "d")
+        "sizeof(g_Mes"     -> ("", "", "g_Mes")
+
+    lhs is the postfix expression before `.` or `->`, "" for a plain symbol.
+    """
+    m = _WORD.search(text)
+    word = m.group(0) if m else ""
+    pos = len(text) - len(word)
+    if text[:pos].endswith("->"):
+        notation = "->"
+    elif text[:pos].endswith("."):
+        notation = "."
+    else:
+        return "", "", word
+    end = pos - len(notation)
+    i = end
+    depth = []
+    while i > 0:
+        c = text[i - 1]
+        if depth:
+            if c in _CLOSING:
+                depth.append(_CLOSING[c])
+            elif c == depth[-1]:
+                depth.pop()
+        elif c == ")" and i < end and (text[i].isalnum() or text[i] == "_"):
+            # a cast, i.e. (T *)gA.p->x, applies to the whole postfix expression
+            break
+        elif c in _CLOSING:
+            depth.append(_CLOSING[c])
+        elif c.isalnum() or c in "_.":
+            pass
+        elif c == ">" and text[i - 2: i] == "->":
+            i -= 1
+        else:
+            break
+        i -= 1
+    return text[i: end].strip(), notation, word
@@ -0,0 +1,217 @@
+"""
+arrays formed from the layout of one element, a record is only copied out of
+the template once the element is accessed, i.e. a row painted in the view.
+
+they are lists so the views and the record walkers need no change, but the list
+storage is never used: slicing gives a view sharing the formed records, and
+an array is read-only.
+"""
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import Self
+
+from modules.utils.lazyrecord import LazyRecord
+
+
+def copy_shifted(rec: dict, shift: int, prefix="") -> dict:
+    """copy of the layout `rec` moved by `shift` bytes, with `prefix` prepended to all the exprs"""
+    if isinstance(rec, LazyRecord) and not rec.formed:
+        # left unformed, the copy forms its members at its own address
+        fields = None
+    else:
+        fields = rec.get("fields", None)
+    out = rec.copy()
+    if out.get("address", None) is not None:
+        out["address"] += shift
+    if "expr" in out:
+        out["expr"] = prefix + out["expr"]
+    if isinstance(fields, dict):
+        out["fields"] = {k: copy_shifted(c, shift, prefix) for k, c in fields.items()}
+    elif isinstance(fields, LazyList):
+        out["fields"] = fields.shifted(shift, prefix)
+    elif isinstance(fields, list):
+        out["fields"] = [copy_shifted(c, shift, prefix) for c in fields]
+    return out
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("%s is read-only" % type(self).__name__)
+
+
+# formed rows kept by a table, the ones scrolled away are formed again once back
+MAX_CACHED_ROWS = 4096
+
+
+class BoundedCache(OrderedDict):
+    """formed items, only the `maxsize` most recently used are kept"""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class LazyList(list):
+    """`length` items formed by `_form(start + i)`, each formed once and kept"""
+
+    def __init__(self, length: int, start=0, cache: dict[int, Any] | None=None) -> None:
+        super().__init__()
+        self.length = length
+        self.start = start
+        self._cache = {} if cache is None else cache
+
+    def _form(self, i: int) -> Any:
+        raise NotImplementedError()
+
+    def _view(self, start: int, length: int) -> Self:
+        raise NotImplementedError()
+
+    def shifted(self, shift: int, prefix="") -> Self:
+        raise NotImplementedError()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __bool__(self) -> bool:
+        return self.length > 0
+
+    def __getitem__(self, key: int | slice):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._view(self.start + start, max(0, stop - start))
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("%s index out of range: %d" % (type(self).__name__, key))
+        i = self.start + key
+        if i not in self._cache:
+            self._cache[i] = self._form(i)
+        return self._cache[i]
+
+    def __iter__(self) -> Iterator:
+        return (self[i] for i in range(self.length))
+
+    def __reversed__(self) -> Iterator:
+        return (self[i] for i in reversed(range(self.length)))
+
+    def __contains__(self, x) -> bool:
+        return any(y is x or y == x for y in self)
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, list):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other) -> bool:
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None
+
+    def __add__(self, other: list) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: list) -> list:
+        return list(other) + list(self)
+
+    def __repr__(self) -> str:
+        return "<%s [%d:%d]>" % (type(self).__name__, self.start, self.start + self.length)
+
+    def copy(self) -> Self:
+        return self[:]
+
+    def index(self, x, *args) -> int:
+        for i, y in enumerate(self):
+            if y is x or y == x:
+                return i
+        raise ValueError("%r is not in %s" % (x, type(self).__name__))
+
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+
+class ElementArray(LazyList):
+    """
+    elements of an array, the i-th is `template` moved by `stride * i`
+
+    exprs of the template are relative to an element, i.e. `.a.b`, the expr of
+    the array is prepended with the index. set `expr` and `prepare` before any
+    element is accessed, `prepare(element)` is called once an element is formed.
+    """
+
+    def __init__(self, template: dict, length: int, stride: int, expr="", start=0, cache: dict[int, Any] | None=None) -> None:
+        super().__init__(length, start, cache)
+        self.template = template
+        self.stride = stride
+        self.expr = expr
+        self.prepare: Callable[[dict], None] | None = None
+
+    def _form(self, i: int) -> dict:
+        rec = copy_shifted(self.template, i * self.stride, "%s[%d]" % (self.expr, i))
+        rec["levelname"] = "[%d]" % i
+        if self.prepare:
+            self.prepare(rec)
+        return rec
+
+    def _view(self, start: int, length: int) -> Self:
+        view = ElementArray(self.template, length, self.stride, self.expr, start, self._cache)
+        view.prepare = self.prepare
+        return view
+
+    def shifted(self, shift: int, prefix="") -> Self:
+        template = copy_shifted(self.template, shift)
+        out = ElementArray(template, self.length, self.stride, prefix + self.expr, self.start)
+        out.prepare = self.prepare
+        return out
+
+    def __reduce__(self):
+        # only the template goes through pickle, the formed elements are not kept
+        return ElementArray, (self.template, self.length, self.stride, self.expr, self.start)
+
+
+class ElementRows(LazyList):
+    """
+    table rows of an array, each a list of the leaf records of one element,
+    the leaves of the i-th row are `leaves` moved by `stride * i`.
+    only the `max_cached` rows used last are kept, all if None.
+    """
+
+    def __init__(self, leaves: list[dict], length: int, stride: int, start=0, cache: dict[int, Any] | None=None, max_cached: int | None=MAX_CACHED_ROWS) -> None:
+        if cache is None and max_cached is not None:
+            cache = BoundedCache(max_cached)
+        super().__init__(length, start, cache)
+        self.leaves = leaves
+        self.stride = stride
+        self.max_cached = max_cached
+
+    def _form(self, i: int) -> list[dict]:
+        row = [copy_shifted(x, i * self.stride) for x in self.leaves]
+        for x in row:
+            if x.get("expr", None) == "":
+                # the element itself, not a member of it
+                x["levelname"] = "[%d]" % i
+        return row
+
+    def _view(self, start: int, length: int) -> Self:
+        return ElementRows(self.leaves, length, self.stride, start, self._cache, self.max_cached)
+
+    def shifted(self, shift: int, prefix="") -> Self:
+        leaves = [copy_shifted(x, shift, prefix) for x in self.leaves]
+        return ElementRows(leaves, self.length, self.stride, self.start, max_cached=self.max_cached)
+
+    def __reduce__(self):
+        return ElementRows, (self.leaves, self.length, self.stride, self.start, None, self.max_cached)
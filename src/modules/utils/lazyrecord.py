@@ -0,0 +1,99 @@
+"""
+records whose members are formed only once accessed, i.e. a row expanded in the view
+
+"fields" is left out of a record until read, then `former(record)` forms them
+and they stay. writing "fields" before that drops the former. the former is
+not pickled, a record unpickled unformed needs one `bind` in its process.
+"""
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+from modules.utils.record import Record
+
+Former = Callable[[Record], Any]
+
+
+def _unbound(record: Record):
+    raise RuntimeError("No former bound to form the members of %r" % record.get("type", None))
+
+
+class LazyRecord(Record):
+    __slots__ = ("_former", "_deferred")
+
+    def __init__(self, record: Any, former: Former) -> None:
+        super().__init__(record)
+        if Record.__contains__(self, "fields"):
+            del self.fields
+        self._former = former
+        self._deferred: list[Callable[[Record], None]] | None = None
+
+    @property
+    def formed(self) -> bool:
+        return self._former is None or Record.__contains__(self, "fields")
+
+    def form(self):
+        if self.formed:
+            self._former = None
+            return
+        former, self._former = self._former, None
+        try:
+            self.fields = former(self)
+        except Exception:
+            # formed again the next time
+            self._former = former
+            raise
+        deferred, self._deferred = self._deferred or (), None
+        for fn in deferred:
+            fn(self)
+
+    def bind(self, former: Former):
+        """form the members with `former` from now on, unless formed already"""
+        if not self.formed:
+            self._former = former
+
+    def when_formed(self, fn: Callable[[Record], None]):
+        """`fn(record)` once the members are formed, now if they are"""
+        if self.formed:
+            fn(self)
+        elif self._deferred is None:
+            self._deferred = [fn]
+        else:
+            self._deferred.append(fn)
+
+    def __missing__(self, key: str):
+        if key == "fields" and not self.formed:
+            self.form()
+            return self.fields
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return (key == "fields" and not self.formed) or Record.__contains__(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key == "fields":
+            self._former = None
+            self._deferred = None
+        Record.__setitem__(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        # all the keys are wanted, the members are formed first
+        self.form()
+        return Record.__iter__(self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in Record.__iter__(self)) + (not self.formed)
+
+    def copy(self) -> Record:
+        """a copy forming its members by itself, unless formed already"""
+        out = Record.copy(self)
+        if out._deferred is not None:
+            out._deferred = list(out._deferred)
+        return out
+
+    def __reduce__(self):
+        if self.formed:
+            return Record.__reduce__(self)
+        # left unformed, the members are only formed where they are read
+        record = {key: Record.__getitem__(self, key) for key in Record.__iter__(self)}
+        return LazyRecord, (record, _unbound)
@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Iterator
+
+from modules.utils.readplan import ReadPlanner
+from modules.utils.typ import Stream
+
+MAX_LIST_LENGTH = 0x100000
+# read this much ahead once a link falls in a page not fetched yet next to one
+# fetched, nodes allocated next to each other then cost no more read
+LIST_READ_AHEAD = 0x10000
+# pages kept while walking, a list scattered over the memory reads a page a node
+LIST_CACHE_PAGES = 0x4000
+
+
+@dataclass(eq=False)
+class ListNodes:
+    """
+    node addresses of a linked list, in the traversal order
+
+    `end` tells why the traversal stopped:
+        "null": a NULL link
+        "head": back to the list head, or to the first node of a circular list
+        "cycle": back to the node at `cycle_to`, the list is broken
+            (or a node seen already in a tree, `cycle_to` is None)
+        "max_len": more nodes may follow
+        "unreadable": the link after the last node is not readable
+    """
+    addresses: list[int] = field(default_factory=list)
+    end: str = "null"
+    cycle_to: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+
+def _read_link(reader: ReadPlanner, link: int, ptr_size: int) -> int | None:
+    """pointer stored at `link`, None if not readable"""
+    if not reader.is_cached(link, ptr_size):
+        psize = reader.page_size
+        # read ahead only while the walk moves on to the neighbouring pages
+        if reader.is_cached(link - psize, 1):
+            reader.prefetch([(link - link % psize, LIST_READ_AHEAD)])
+        else:
+            reader.prefetch([(link, ptr_size)])
+    reader.seek(link)
+    try:
+        data = reader.read(ptr_size)
+    except Exception:
+        return None
+    if len(data) < ptr_size:
+        return None
+    return int.from_bytes(data, "little")
+
+
+def walk_list(stream: Stream, first: int, next_offset: int, ptr_size=8, link_offset=0, stop=(0,), max_len=MAX_LIST_LENGTH) -> ListNodes:
+    """
+    follow the links from the pointer `first`
+
+    a link points `link_offset` bytes into the next node, i.e. CONTAINING_RECORD
+    for an intrusive list, 0 for a plain `node->next` one. the next link is
+    stored at `next_offset` of the node. links in `stop` end the list.
+    """
+    out = ListNodes()
+    for _ in iter_list(stream, first, next_offset, ptr_size, link_offset, stop, max_len, out):
+        pass
+    return out
+
+
+def iter_list(stream: Stream, first: int, next_offset: int, ptr_size=8, link_offset=0, stop=(0,), max_len=MAX_LIST_LENGTH, nodes: ListNodes | None=None) -> Iterator[int]:
+    """
+    generator of the node addresses of `walk_list`, each once its link is followed,
+    the nodes so far and the `end` once done are kept in `nodes` if given
+    """
+    reader = stream if isinstance(stream, ReadPlanner) else ReadPlanner(stream, max_pages=LIST_CACHE_PAGES)
+    stop = set(stop)
+    visited: dict[int, int] = {}
+    out = ListNodes() if nodes is None else nodes
+    ptr = first
+    while ptr not in stop:
+        node = ptr - link_offset
+        if node in visited:
+            if visited[node] == 0:
+                out.end = "head"
+            else:
+                out.end = "cycle"
+                out.cycle_to = visited[node]
+            return
+        if len(out.addresses) >= max_len:
+            out.end = "max_len"
+            return
+        visited[node] = len(out.addresses)
+        out.addresses.append(node)
+        yield node
+
+        ptr = _read_link(reader, node + next_offset, ptr_size)
+        if ptr is None:
+            out.end = "unreadable"
+            return
+    out.end = "head" if ptr else "null"
+
+
+def walk_tree(stream: Stream, root: int, left_offset: int, right_offset: int, ptr_size=8, stop=(0,), max_len=MAX_LIST_LENGTH) -> ListNodes:
+    """
+    in-order node addresses of a binary tree from the pointer `root`,
+    links in `stop` are leaves, i.e. NULL or the nil node of a red-black tree
+    """
+    reader = stream if isinstance(stream, ReadPlanner) else ReadPlanner(stream, max_pages=LIST_CACHE_PAGES)
+    stop = set(stop)
+    seen = set()
+    stack = []
+    out = ListNodes()
+    ptr = root
+    while stack or ptr not in stop:
+        if ptr not in stop:
+            if ptr in seen:
+                out.end = "cycle"
+                return out
+            seen.add(ptr)
+            stack.append(ptr)
+            ptr = _read_link(reader, ptr + left_offset, ptr_size)
+        else:
+            node = stack.pop()
+            if len(out.addresses) >= max_len:
+                out.end = "max_len"
+                return out
+            out.addresses.append(node)
+            ptr = _read_link(reader, node + right_offset, ptr_size)
+        if ptr is None:
+            out.end = "unreadable"
+            return out
+    return out
@@ -81,6 +81,122 @@ def int_from_float(val: float, nbits: int) -> int:
         return struct.unpack("Q", struct.pack("d", val))[0]
 
 
+REG_INT_LITERAL = re.compile(
+    r"(?P<SIGN>[-+]?)\s*(?:"
+    r"0[xX](?P<HEX>[0-9a-fA-F]+)"
+    r"|0[bB](?P<BIN>[01]+)"
+    r"|(?P<OCT>0[0-7]*)"
+    r"|(?P<DEC>[1-9][0-9]*)"
+    r")(?P<SUFFIX>[uUlL]*)$"
+)
+INT_SUFFIXES = {"", "u", "l", "ul", "lu", "ll", "ull", "llu"}
+
+
+def parse_int_literal(text: str, bits=64) -> tuple[int, bool]:
+    """
+    parse a C integer literal, return (value, is_unsigned)
+
+    literals having a `u` suffix are unsigned, so are hex, octal and binary ones
+    too large for a signed integer. a decimal one without `u` is signed as in C,
+    no wider type is left for one too large, it is rejected.
+    """
+    m = REG_INT_LITERAL.match(text.strip())
+    if m is None or m["SUFFIX"].lower() not in INT_SUFFIXES:
+        raise ValueError("Invalid integer literal: %r" % text)
+    if m["HEX"] is not None:
+        val = int(m["HEX"], 16)
+    elif m["BIN"] is not None:
+        val = int(m["BIN"], 2)
+    elif m["OCT"] is not None:
+        val = int(m["OCT"], 8)
+    else:
+        val = int(m["DEC"], 10)
+    unsigned = "u" in m["SUFFIX"].lower()
+    if not unsigned and val >= BIT(bits - 1):
+        if m["DEC"] is None:
+            unsigned = True
+        elif not (m["SIGN"] == "-" and val == BIT(bits - 1)):
+            # no wider type left for a decimal one, the most negative still fits
+            raise ValueError("Integer literal too large for a signed integer: %r" % text)
+    if m["SIGN"] == "-":
+        val = -val
+    return wrap_int(val, bits, unsigned), unsigned
+
+
+def wrap_int(val: int, bits: int, unsigned: bool) -> int:
+    val &= BITMASK(bits)
+    if not unsigned and val >= BIT(bits - 1):
+        val -= BIT(bits)
+    return val
+
+
+def c_unary_op(operator: str, val: int, bits=64, unsigned=False) -> int:
+    match operator:
+        case "-":
+            return wrap_int(-val, bits, unsigned)
+        case "+":
+            return val
+        case "~":
+            return wrap_int(~val, bits, unsigned)
+        case "!":
+            return int(not val)
+        case _:
+            raise ValueError("Not support unary operator: %r" % operator)
+
+
+def c_binary_op(operator: str, left: int, right: int, bits=64, unsigned=False) -> int:
+    """evaluate `left operator right` as C integers of `bits` width"""
+    if unsigned:
+        left &= BITMASK(bits)
+        right &= BITMASK(bits)
+    match operator:
+        case "+":
+            val = left + right
+        case "-":
+            val = left - right
+        case "*":
+            val = left * right
+        case "/" | "%":
+            if right == 0:
+                raise ZeroDivisionError("Division by zero: %d %s %d" % (left, operator, right))
+            # C truncates toward zero
+            quot = abs(left) // abs(right)
+            if (left < 0) != (right < 0):
+                quot = -quot
+            val = quot if operator == "/" else left - right * quot
+        case "<<" | ">>":
+            if right < 0:
+                raise ValueError("Negative shift count: %d %s %d" % (left, operator, right))
+            # all the bits are shifted out past the width, 0 or the sign fill
+            right = min(right, bits)
+            val = left << right if operator == "<<" else left >> right
+        case "&":
+            val = left & right
+        case "|":
+            val = left | right
+        case "^":
+            val = left ^ right
+        case "==":
+            return int(left == right)
+        case "!=":
+            return int(left != right)
+        case "<":
+            return int(left < right)
+        case ">":
+            return int(left > right)
+        case "<=":
+            return int(left <= right)
+        case ">=":
+            return int(left >= right)
+        case "&&":
+            return int(bool(left and right))
+        case "||":
+            return int(bool(left or right))
+        case _:
+            raise ValueError("Not support binary operator: %r" % operator)
+    return wrap_int(val, bits, unsigned)
+
+
 def escape_filename(filename: str):
     trans = str.maketrans(":", "_")
     stem = Path(filename).stem.replace("*", "star")
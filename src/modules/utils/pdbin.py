@@ -0,0 +1,431 @@
+"""
+pdbin v2, the layouts of a PDB in a file opened by mmap, nothing is decoded at open
+
+    header
+    string table    utf-8 names, a name is (offset, length) in the table
+    symbol index    fixed-size records sorted by the hash of the name
+    address index   (offset, symbol) of the global symbols sorted by offset
+    type table      fixed-size records, a type is at (offset, length) in the blob area
+    blob area       layout of each type one level deep at address 0, pickled and compressed
+
+the layouts are the ones `tpi_stream.form_structs(lf, 0, recursive=False)`
+gives, with every lf being the id of its type in the file. a type is decoded
+once its layout is asked for, and kept.
+"""
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+
+import numpy as np
+
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyarray import copy_shifted
+
+MAGIC = b"PDBIN\x00\x02\x00"
+
+# magic, pointer size, types, symbols, addresses, then the section offsets
+_HEADER = struct.Struct("<8sIIQQQQQQQ")
+
+SYMBOL_DTYPE = np.dtype([
+    ("hash", "<u8"),
+    ("name", "<u8"),
+    ("name_len", "<u4"),
+    ("kind", "<u4"),
+    ("type", "<i8"),
+    ("offset", "<u8"),
+])
+ADDRESS_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("symbol", "<u8"),
+])
+TYPE_DTYPE = np.dtype([
+    ("blob", "<u8"),
+    ("blob_len", "<u8"),
+    ("target", "<i8"),
+])
+
+SYMBOL_GLOBAL = 0
+SYMBOL_TYPE = 1
+
+# target of a type which is not a pointer, or one that cannot be dereferenced
+NOT_POINTER = -1
+DEREF_NOT_IMPLEMENTED = -2
+
+
+def name_hash(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8", "replace"), digest_size=8).digest(), "little")
+
+
+def is_pdbin_v2(filename: str | Path) -> bool:
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class TypeRef:
+    """lf of a type in a pdbin, one object per type of an opened file"""
+    __slots__ = ("index", "__weakref__")
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+
+    def __repr__(self) -> str:
+        return "<TypeRef %d>" % self.index
+
+
+class _TypeId(int):
+    """lf written as the type id"""
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        if isinstance(obj, _TypeId):
+            return int(obj)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, owner: "PdbinFile") -> None:
+        super().__init__(file)
+        self.owner = owner
+
+    def persistent_load(self, pid):
+        return self.owner.ref(pid)
+
+
+# keys of a record stored by position, the others in a dict
+_KEYS = ("levelname", "value", "type", "address", "size", "bitoff", "bitsize", "is_pointer", "is_funcptr", "is_real", "has_sign", "lf")
+
+
+def _encode(rec: dict, type_id) -> tuple:
+    """
+    (mask of the keys present, their values, other items, members) of `rec`,
+    the lfs as type ids, the elements of an array as (first one, count, stride).
+    """
+    mask = 0
+    values = []
+    for n, key in enumerate(_KEYS):
+        if key in rec:
+            mask |= 1 << n
+            values.append(_TypeId(type_id(rec[key])) if key == "lf" and rec[key] is not None else rec[key])
+    extra = {k: v for k, v in rec.items() if k not in _KEYS and k != "fields"} or None
+    fields = rec.get("fields", None)
+    if isinstance(fields, dict):
+        fields = {k: _encode(c, type_id) for k, c in fields.items()}
+    elif isinstance(fields, list) and len(fields) > 1:
+        stride = fields[1]["address"] - fields[0]["address"]
+        fields = (_encode(fields[0], type_id), len(fields), stride)
+    elif isinstance(fields, list):
+        fields = [_encode(c, type_id) for c in fields]
+    return mask, tuple(values), extra, fields
+
+
+def _decode(packed: tuple) -> dict:
+    mask, values, extra, fields = packed
+    rec = dict(zip((k for n, k in enumerate(_KEYS) if mask >> n & 1), values))
+    if extra:
+        rec.update(extra)
+    if isinstance(fields, dict):
+        fields = {k: _decode(c) for k, c in fields.items()}
+    elif isinstance(fields, tuple):
+        elem, count, stride = fields
+        fields = ElementArray(_decode(elem), count, stride)
+    elif isinstance(fields, list):
+        fields = [_decode(c) for c in fields]
+    rec["fields"] = fields
+    return rec
+
+
+def _align(f, n=8):
+    f.write(bytes(-f.tell() % n))
+
+
+# types converted between two progress reports
+PROGRESS_STEP = 1024
+
+
+def write_pdbin(p, filename: str | Path, progress: Callable[[str, int, int], None] | None=None):
+    """
+    convert the PDB `p`, the types reachable from the global symbols and the
+    struct names are kept, the structs by their names as well. the file is
+    replaced once written.
+
+    `progress(stage, done, total)` is called along, "types" with the types
+    converted of the ones found so far, then "write" with the sections written.
+    an exception raised by it stops the conversion.
+    """
+    report = progress or (lambda *_: None)
+    tpi = p.tpi_stream
+    ids: dict[int, int] = {}
+    lfs: list[Any] = []
+
+    def type_id(lf) -> int:
+        if id(lf) not in ids:
+            ids[id(lf)] = len(lfs)
+            lfs.append(lf)
+        return ids[id(lf)]
+
+    symbols: list[tuple[str, int, int, int]] = []
+    for name in p.glb_stream.symbols.keys():
+        try:
+            lf, offset = p.get_lf_from_name(name)
+        except Exception:
+            continue
+        symbols.append((name, SYMBOL_GLOBAL, -1 if lf is None else type_id(lf), offset or 0))
+    for name in getattr(tpi, "structs", {}).keys():
+        try:
+            lf, _ = p.get_lf_from_name(name)
+        except Exception:
+            continue
+        if lf is not None:
+            symbols.append((name, SYMBOL_TYPE, type_id(lf), 0))
+
+    named = {name for name, *_ in symbols}
+    blobs = io.BytesIO()
+    types: list[tuple[int, int, int]] = []
+    # lfs grows while the members and the pointer targets are found
+    i = 0
+    while i < len(lfs):
+        if i % PROGRESS_STEP == 0:
+            report("types", i, len(lfs))
+        lf = lfs[i]
+        try:
+            target = tpi.deref_pointer(lf, 0, recursive=False)["lf"]
+            target = DEREF_NOT_IMPLEMENTED if target is None else type_id(target)
+        except NotImplementedError:
+            target = DEREF_NOT_IMPLEMENTED
+        except ValueError:
+            # "Shall be a pointer type"
+            target = NOT_POINTER
+        layout = tpi.form_structs(lf, 0, recursive=False)
+        if isinstance(layout["fields"], dict) and layout["type"] not in named:
+            # a struct only reached as a member, still can be casted to
+            named.add(layout["type"])
+            symbols.append((layout["type"], SYMBOL_TYPE, i, 0))
+        data = io.BytesIO()
+        _Pickler(data, protocol=pickle.HIGHEST_PROTOCOL).dump(_encode(layout, type_id))
+        types.append((blobs.tell(), blobs.write(zlib.compress(data.getbuffer(), 1)), target))
+        i += 1
+
+    report("types", len(lfs), len(lfs))
+
+    strings = bytearray()
+    sym_table = np.zeros(len(symbols), dtype=SYMBOL_DTYPE)
+    for n, (name, kind, tid, offset) in enumerate(symbols):
+        data = name.encode("utf-8", "replace")
+        sym_table[n] = (name_hash(name), len(strings), len(data), kind, tid, offset)
+        strings += data
+    sym_table = sym_table[np.argsort(sym_table["hash"], kind="stable")]
+    glb = np.flatnonzero(sym_table["kind"] == SYMBOL_GLOBAL)
+    addr_table = np.zeros(len(glb), dtype=ADDRESS_DTYPE)
+    addr_table["offset"] = sym_table["offset"][glb]
+    addr_table["symbol"] = glb
+    addr_table = addr_table[np.argsort(addr_table["offset"], kind="stable")]
+    type_table = np.array(types, dtype=TYPE_DTYPE)
+
+    sections = (bytes(strings), sym_table.tobytes(), addr_table.tobytes(), type_table.tobytes(), blobs.getbuffer())
+    tmp = Path(str(filename) + ".tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(bytes(_HEADER.size))
+            offsets = []
+            for n, data in enumerate(sections):
+                report("write", n, len(sections))
+                _align(f)
+                offsets.append(f.tell())
+                f.write(data)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, tpi.ARCH_PTR_SIZE, len(type_table), len(sym_table), len(addr_table), *offsets))
+        os.replace(tmp, filename)
+    finally:
+        tmp.unlink(missing_ok=True)
+    report("write", len(sections), len(sections))
+
+
+class PdbinFile:
+    """sections of a pdbin v2 mapped in memory, the layouts are decoded on demand"""
+
+    def __init__(self, filename: str | Path) -> None:
+        self.filename = str(filename)
+        with open(filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.ptr_size, n_types, n_symbols, n_addrs, *offsets = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a pdbin v2 file: %r" % self.filename)
+        strings_off, symbols_off, addrs_off, types_off, self._blobs_off = offsets
+        self._strings_off = strings_off
+        self.symbols = np.frombuffer(self._mm, SYMBOL_DTYPE, n_symbols, symbols_off)
+        self.addresses = np.frombuffer(self._mm, ADDRESS_DTYPE, n_addrs, addrs_off)
+        self.types = np.frombuffer(self._mm, TYPE_DTYPE, n_types, types_off)
+        self._refs: dict[int, TypeRef] = {}
+        self._layouts: dict[int, dict] = {}
+
+    def ref(self, index: int) -> TypeRef:
+        ref = self._refs.get(index, None)
+        if ref is None:
+            ref = self._refs.setdefault(index, TypeRef(index))
+        return ref
+
+    def layout(self, index: int) -> dict:
+        """layout of the type at address 0, shall not be modified"""
+        layout = self._layouts.get(index, None)
+        if layout is None:
+            start = self._blobs_off + int(self.types[index]["blob"])
+            end = start + int(self.types[index]["blob_len"])
+            layout = _decode(_Unpickler(io.BytesIO(zlib.decompress(self._mm[start: end])), self).load())
+            layout = self._layouts.setdefault(index, layout)
+        return layout
+
+    def preload(self, indexes: Iterable[int], stop: threading.Event | None=None) -> int:
+        """
+        decode the layouts of `indexes` ahead until `stop` is set, the number
+        decoded. one asked for meanwhile is decoded by the caller at once.
+        """
+        count = 0
+        for i in indexes:
+            if stop is not None and stop.is_set():
+                break
+            if i not in self._layouts:
+                self.layout(i)
+                count += 1
+        return count
+
+    def target(self, index: int) -> int:
+        return int(self.types[index]["target"])
+
+    def name(self, i: int) -> str:
+        start = self._strings_off + int(self.symbols[i]["name"])
+        return self._mm[start: start + int(self.symbols[i]["name_len"])].decode("utf-8", "replace")
+
+    def find(self, name: str, kind: int | None=None) -> int | None:
+        """symbol record of `name`, the global one first"""
+        h = np.uint64(name_hash(name))
+        hashes = self.symbols["hash"]
+        found = None
+        for i in range(int(np.searchsorted(hashes, h)), len(hashes)):
+            if hashes[i] != h:
+                break
+            if self.name(i) == name and (kind is None or self.symbols[i]["kind"] == kind):
+                if self.symbols[i]["kind"] == SYMBOL_GLOBAL:
+                    return i
+                found = i
+        return found
+
+    def find_offset(self, offset: int) -> int | None:
+        """symbol record at `offset`"""
+        offsets = self.addresses["offset"]
+        i = int(np.searchsorted(offsets, np.uint64(offset)))
+        if i < len(offsets) and offsets[i] == offset:
+            return int(self.addresses[i]["symbol"])
+        return None
+
+
+class MappedSymbols(Mapping):
+    """global symbols by name, as `glb_stream.symbols`, the value is (lf, offset)"""
+
+    def __init__(self, file: PdbinFile, kind=SYMBOL_GLOBAL) -> None:
+        self._file = file
+        self._kind = kind
+        self._rows = np.flatnonzero(file.symbols["kind"] == kind)
+
+    def __getitem__(self, name: str) -> tuple[TypeRef | None, int]:
+        i = self._file.find(name, self._kind)
+        if i is None:
+            raise KeyError(name)
+        tid = int(self._file.symbols[i]["type"])
+        return (None if tid < 0 else self._file.ref(tid)), int(self._file.symbols[i]["offset"])
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._file.find(name, self._kind) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._file.name(int(i)) for i in self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class MappedTpi:
+    """`tpi_stream` of a pdbin v2, forming the structs from the stored layouts"""
+
+    def __init__(self, file: PdbinFile) -> None:
+        self._file = file
+        self.ARCH_PTR_SIZE = file.ptr_size
+        self.structs = MappedSymbols(file, SYMBOL_TYPE)
+
+    def form_structs(self, lf: TypeRef, addr: int | None=0, recursive=True) -> dict:
+        layout = self._file.layout(lf.index)
+        if addr is None:
+            out = copy_shifted(layout, 0)
+            out["address"] = None
+            return out
+        out = copy_shifted(layout, addr)
+        if recursive:
+            self._form_members(out)
+        return out
+
+    def _form_members(self, rec: dict):
+        """members of `rec` formed down to the leaves, the elements of an array once accessed"""
+        if rec["fields"] is None and not rec["is_pointer"] and rec.get("lf", None) is not None:
+            rec["fields"] = copy_shifted(self._file.layout(rec["lf"].index), rec["address"])["fields"]
+        fields = rec["fields"]
+        if isinstance(fields, ElementArray):
+            fields.prepare = self._form_members
+        elif isinstance(fields, dict):
+            for c in fields.values():
+                self._form_members(c)
+        elif isinstance(fields, list):
+            for c in fields:
+                self._form_members(c)
+
+    def deref_pointer(self, lf: TypeRef, addr: int, recursive=True) -> dict:
+        target = self._file.target(lf.index)
+        if target == NOT_POINTER:
+            raise ValueError("Shall be a pointer type, got: %r" % self._file.layout(lf.index)["type"])
+        if target == DEREF_NOT_IMPLEMENTED:
+            raise NotImplementedError(self._file.layout(lf.index)["type"])
+        return self.form_structs(self._file.ref(target), addr, recursive)
+
+
+class _GlobalStream:
+    def __init__(self, symbols: MappedSymbols) -> None:
+        self.symbols = symbols
+
+
+class MappedPdb:
+    """PDB read from a pdbin v2, the symbols and types the debugger looks up"""
+
+    def __init__(self, filename: str | Path) -> None:
+        self.file = PdbinFile(filename)
+        self.tpi_stream = MappedTpi(self.file)
+        self.glb_stream = _GlobalStream(MappedSymbols(self.file, SYMBOL_GLOBAL))
+
+    def get_lf_from_name(self, name: str) -> tuple[TypeRef | None, int]:
+        i = self.file.find(name)
+        if i is None:
+            return None, 0
+        tid = int(self.file.symbols[i]["type"])
+        return (None if tid < 0 else self.file.ref(tid)), int(self.file.symbols[i]["offset"])
+
+    def _get_glb(self, name: str) -> tuple[TypeRef | None, int]:
+        return self.glb_stream.symbols[name]
+
+    def get_refname_from_offset(self, offset: int) -> str | None:
+        i = self.file.find_offset(offset)
+        return None if i is None else self.file.name(i)
+
+    def preload_types(self, stop: threading.Event | None=None) -> int:
+        """decode ahead the types of the symbols, the first ones the expressions go through"""
+        types = np.unique(self.file.symbols["type"])
+        return self.file.preload(types[types >= 0].tolist(), stop)
+
@@ -0,0 +1,28 @@
+"""
+objects built once per PDB, i.e. an index of its symbols
+
+keyed by id(PDB), an entry is dropped once the PDB object is garbage collected.
+"""
+import weakref
+from functools import wraps
+from typing import Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def per_pdb(factory: Callable[..., T]) -> Callable[..., T]:
+    """`factory(p)` built on the first call for each PDB `p`, the same one after"""
+    cache: dict[int, T] = {}
+
+    @wraps(factory)
+    def get(p) -> T:
+        key = id(p)
+        obj = cache.get(key, None)
+        if obj is None:
+            obj = cache.setdefault(key, factory(p))
+            weakref.finalize(p, cache.pop, key, None)
+        return obj
+
+    get.cache = cache
+    return get
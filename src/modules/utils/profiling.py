@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from dataclasses import fields
+
+
+@dataclass(eq=False)
+class ExprProfile:
+    """
+    cost of one top-level expression
+
+    `parse_time` is taken when the plan is compiled, a `cached` plan costs no
+    parse in the current query. the value_* numbers are the leaf values read
+    by the view afterwards, accumulated over the repaints.
+    """
+    expr: str
+    parse_time: float = 0.0
+    nodes: int = 0
+    cached: bool = False
+    form_structs: int = 0
+    reads: int = 0
+    read_bytes: int = 0
+    wall_time: float = 0.0
+    value_reads: int = 0
+    value_bytes: int = 0
+    value_time: float = 0.0
+
+    def add_values(self, reads: int, read_bytes: int, elapsed: float):
+        self.value_reads += reads
+        self.value_bytes += read_bytes
+        self.value_time += elapsed
+
+    def summary(self) -> str:
+        return "\n".join([
+            "parse: %.3f ms, %d nodes%s" % (self.parse_time * 1e3, self.nodes, " (cached)" if self.cached else ""),
+            "query: %.3f ms, %d form_structs, %d reads, %d bytes" % (
+                self.wall_time * 1e3, self.form_structs, self.reads, self.read_bytes,
+            ),
+            "values: %.3f ms, %d reads, %d bytes" % (self.value_time * 1e3, self.value_reads, self.value_bytes),
+        ])
+
+
+def dump_profiles(profiles: list[ExprProfile]) -> str:
+    """profiles as a plain text table, one expression per line"""
+    names = [f.name for f in fields(ExprProfile)][1:]
+    rows = [["expr"] + names]
+    for prof in profiles:
+        row = [prof.expr]
+        for name in names:
+            val = getattr(prof, name)
+            row.append("%.3f" % (val * 1e3) if isinstance(val, float) else str(val))
+        rows.append(row)
+    widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(x.ljust(w) if i == 0 else x.rjust(w) for i, (x, w) in enumerate(zip(r, widths)))
+        for r in rows
+    )
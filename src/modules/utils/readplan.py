@@ -0,0 +1,166 @@
+import os
+from collections import OrderedDict
+from typing import Iterable
+
+from modules.utils.typ import Stream
+
+PAGE_SIZE = 0x1000
+MAX_BLOCK_SIZE = 0x10000
+
+
+def coalesce_ranges(ranges: Iterable[tuple[int, int]], page_size=PAGE_SIZE, max_block_size=MAX_BLOCK_SIZE) -> list[tuple[int, int]]:
+    """
+    merge (address, size) ranges into page aligned (address, size) blocks
+
+    adjacent and overlapping ranges end up in the same block, blocks are split
+    at `max_block_size` to keep every single read bounded.
+    """
+    pages = sorted({
+        page
+        for addr, size in ranges
+        if size > 0
+        for page in range(addr // page_size, (addr + size - 1) // page_size + 1)
+    })
+    max_pages = max(1, max_block_size // page_size)
+
+    blocks = []
+    for page in pages:
+        if blocks and blocks[-1][0] + blocks[-1][1] == page and blocks[-1][1] < max_pages:
+            blocks[-1][1] += 1
+        else:
+            blocks.append([page, 1])
+    return [(page * page_size, cnt * page_size) for page, cnt in blocks]
+
+
+class ReadPlanner:
+    """
+    stream wrapper serving small reads from coalesced page aligned block reads
+
+    `prefetch` the ranges going to be read, then every read hitting the fetched
+    pages costs no more access to the underlying stream. reads over pages not
+    fetched yet pull the whole pages in. call `invalidate` to drop the blocks
+    once the memory may have changed. with `max_pages`, the pages fetched first
+    are dropped to keep about that many.
+    """
+
+    def __init__(self, stream: Stream | None, page_size=PAGE_SIZE, max_pages: int | None=None) -> None:
+        self.stream = stream
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages: OrderedDict[int, bytes | None] = OrderedDict()
+        self._offset = 0
+        self.read_count = 0
+        self.read_bytes = 0
+
+    @property
+    def pages(self) -> dict[int, bytes | None]:
+        """the pages fetched by page number, None for an unreadable one"""
+        return self._pages
+
+    def invalidate(self):
+        self._pages.clear()
+
+    def is_cached(self, addr: int, size: int) -> bool:
+        """if all the pages of the range are fetched, even the unreadable ones"""
+        psize = self.page_size
+        first, last = addr // psize, (addr + size - 1) // psize
+        if first == last:
+            return first in self._pages
+        return all(p in self._pages for p in range(first, last + 1))
+
+    def prefetch(self, ranges: Iterable[tuple[int, int]]):
+        psize = self.page_size
+        missing = (
+            (addr, size)
+            for addr, size in coalesce_ranges(ranges, psize)
+            for addr, size in self._missing_runs(addr, size)
+        )
+        missing = list(missing)
+        if missing and self.max_pages is not None:
+            self._evict(self.max_pages - sum(size for _, size in missing) // psize)
+        for addr, size in missing:
+            try:
+                data = self._read_stream(addr, size)
+            except Exception:
+                if size == psize:
+                    # leave it to the direct read to raise the error again
+                    self._pages[addr // psize] = None
+                    continue
+                # some page inside the block is not readable, read page by page
+                for a in range(addr, addr + size, psize):
+                    self.prefetch([(a, psize)])
+                continue
+            for off in range(0, size, psize):
+                self._pages[(addr + off) // psize] = data[off: off + psize]
+
+    def _evict(self, keep: int):
+        while self._pages and len(self._pages) > keep:
+            self._pages.popitem(last=False)
+
+    def _missing_runs(self, addr: int, size: int):
+        psize = self.page_size
+        start = None
+        for a in range(addr, addr + size, psize):
+            if a // psize in self._pages:
+                if start is not None:
+                    yield start, a - start
+                    start = None
+            elif start is None:
+                start = a
+        if start is not None:
+            yield start, addr + size - start
+
+    def _read_stream(self, addr: int, size: int) -> bytes:
+        self.read_count += 1
+        self.stream.seek(addr)
+        data = self.stream.read(size)
+        self.read_bytes += len(data)
+        return data
+
+    def seek(self, offset: int, pos=os.SEEK_SET) -> int:
+        if pos == os.SEEK_SET:
+            self._offset = offset
+        elif pos == os.SEEK_CUR:
+            self._offset += offset
+        else:
+            self._offset = self.stream.seek(offset, pos)
+        return self._offset
+
+    def tell(self) -> int:
+        return self._offset
+
+    def read(self, size: int) -> bytes:
+        addr = self._offset
+        psize = self.page_size
+        first, last = addr // psize, (addr + size - 1) // psize
+        if size <= 0:
+            return bytes()
+        if not self.is_cached(addr, size):
+            self.prefetch([(addr, size)])
+
+        chunks = []
+        for page in range(first, last + 1):
+            data = self._pages[page]
+            if data is None:
+                # unreadable page, read it directly to get the same result
+                data = self._read_stream(addr, size)
+                self._offset += len(data)
+                return data
+            chunks.append(data)
+            if len(data) < psize:
+                # end of the stream
+                break
+        off = addr - first * psize
+        data = b"".join(chunks)[off: off + size]
+        self._offset += len(data)
+        return data
+
+    def write(self, buf: bytes) -> int:
+        addr = self._offset
+        psize = self.page_size
+        for page in range(addr // psize, (addr + len(buf) - 1) // psize + 1):
+            self._pages.pop(page, None)
+        self.stream.seek(addr)
+        cnt = self.stream.write(buf)
+        self._offset += cnt or 0
+        return cnt
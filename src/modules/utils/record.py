@@ -0,0 +1,128 @@
+"""
+compact record of a struct member, the same keys as pdb.StructRecord
+
+a dict costs most of the memory of a large parsed tree, a record keeps the
+common keys in slots, the UI flags set by the views in a bitfield, and the
+rest, i.e. "_role_data", in a dict only created when needed. it is a mapping,
+`record["address"]` and `record.get("_is_invalid", False)` work as for a dict.
+"""
+from collections.abc import MutableMapping
+from typing import Any
+from typing import Iterator
+
+RECORD_KEYS = (
+    "levelname",
+    "value",
+    "type",
+    "address",
+    "size",
+    "bitoff",
+    "bitsize",
+    "fields",
+    "is_pointer",
+    "is_funcptr",
+    "is_real",
+    "has_sign",
+    "lf",
+    "expr",
+)
+# boolean flags of the views, a bit telling it is set and a bit of its value
+RECORD_FLAGS = (
+    "_refresh_requested",
+    "_changed_since_prev",
+    "_is_invalid",
+)
+
+_SLOT_KEYS = frozenset(RECORD_KEYS)
+_FLAG_BITS = {k: 1 << i for i, k in enumerate(RECORD_FLAGS)}
+_FLAG_SET = len(RECORD_FLAGS)
+
+
+class Record(MutableMapping):
+    __slots__ = RECORD_KEYS + ("_flags", "_extra")
+
+    def __init__(self, record: Any=()) -> None:
+        self._flags = 0
+        self._extra = None
+        items = record.items() if hasattr(record, "items") else record
+        for key, value in items:
+            self[key] = value
+
+    def __missing__(self, key: str):
+        raise KeyError(key)
+
+    def __getitem__(self, key: str):
+        if key in _SLOT_KEYS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                return self.__missing__(key)
+        if bit := _FLAG_BITS.get(key, 0):
+            if self._flags & (bit << _FLAG_SET):
+                return bool(self._flags & bit)
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        return self.__missing__(key)
+
+    def __setitem__(self, key: str, value):
+        if key in _SLOT_KEYS:
+            setattr(self, key, value)
+        elif bit := _FLAG_BITS.get(key, 0):
+            self._flags = (self._flags & ~bit) | (bit << _FLAG_SET) | (bit if value else 0)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        if key in _SLOT_KEYS:
+            delattr(self, key)
+        elif bit := _FLAG_BITS.get(key, 0):
+            self._flags &= ~(bit | (bit << _FLAG_SET))
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key) -> bool:
+        if key in _SLOT_KEYS:
+            return hasattr(self, key)
+        if bit := _FLAG_BITS.get(key, 0):
+            return bool(self._flags & (bit << _FLAG_SET))
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        for key in RECORD_KEYS:
+            if hasattr(self, key):
+                yield key
+        for key, bit in _FLAG_BITS.items():
+            if self._flags & (bit << _FLAG_SET):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> "Record":
+        """shallow copy as dict.copy does"""
+        out = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(self, name):
+                    setattr(out, name, getattr(self, name))
+        if out._extra is not None:
+            out._extra = dict(out._extra)
+        return out
+
+    def __reduce__(self):
+        return Record, (dict(self),)
@@ -0,0 +1,326 @@
+"""
+visualizers, how a container shows in the struct tree instead of its raw members
+
+defined in a JSON file, keyed by the type name, `*` and `?` match as fnmatch does.
+expressions are relative to the container, `.size` is a member of it:
+
+    {
+        "Vector<*>": {
+            "display": "size={.size} capacity={.cap,x}",
+            "array": {"size": ".size", "pointer": ".data"}
+        },
+        "Ring<*>": {
+            "array": {"size": ".count", "pointer": ".buf", "start": ".head", "capacity": ".cap"}
+        },
+        "List<*>": {
+            "display": "size={.count}",
+            "list": {"head": ".first", "next": "next", "value": ".data"}
+        },
+        "Map<*>": {
+            "tree": {"head": ".root", "left": "left", "right": "right", "value": ".kv"}
+        }
+    }
+
+`next`, `left` and `right` are members of the node `head` points to,
+`value` is relative to each node, the whole node shows without it.
+"""
+import json
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from fnmatch import fnmatchcase
+from typing import Any
+from typing import Callable
+
+from modules.expr_parser import ExprPlan
+from modules.expr_parser import InvalidExpression
+from modules.expr_parser import compile_this_expr
+from modules.expr_parser import evaluate_plan
+from modules.layoutcache import get_layout_cache
+from modules.pdbparser.pdbparser import pdb
+from modules.utils.linkedlist import MAX_LIST_LENGTH
+from modules.utils.linkedlist import walk_list
+from modules.utils.linkedlist import walk_tree
+from modules.utils.myfunc import BITMASK
+from modules.utils.perpdb import per_pdb
+from modules.utils.readplan import ReadPlanner
+from modules.utils.typ import Stream
+
+# items shown in one layer, more are split into ranges of 100, 10000, ...
+VISUAL_PAGE_SIZE = 100
+
+_ITEM_KEYS = {
+    # kind: (required, optional)
+    "array": ({"size", "pointer"}, {"start", "capacity"}),
+    "list": ({"head", "next"}, {"size", "value"}),
+    "tree": ({"head", "left", "right"}, {"size", "value"}),
+}
+# members of the node type, not expressions
+_MEMBER_KEYS = {"next", "left", "right"}
+
+_DISPLAY_HOLE = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+
+
+@dataclass(eq=False)
+class Visualizer:
+    pattern: str
+    display: str = ""
+    kind: str = ""
+    items: dict[str, str] = field(default_factory=dict)
+
+
+def parse_visualizers(defs: dict) -> list[Visualizer]:
+    if not isinstance(defs, dict):
+        raise ValueError("Visualizers shall be an object keyed by type name, got: %r" % type(defs).__name__)
+    out = []
+    for pattern, vis in defs.items():
+        if not isinstance(vis, dict):
+            raise ValueError("Visualizer shall be an object: %r" % pattern)
+        kinds = [k for k in vis if k in _ITEM_KEYS]
+        unknown = set(vis) - set(_ITEM_KEYS) - {"display"}
+        if unknown or len(kinds) > 1:
+            raise ValueError("Unknown or conflicting keys %r in visualizer: %r" % (sorted(unknown) or kinds, pattern))
+        kind = kinds[0] if kinds else ""
+        items = vis.get(kind, {})
+        if kind:
+            required, optional = _ITEM_KEYS[kind]
+            if not isinstance(items, dict) or not required <= set(items) or not set(items) <= required | optional:
+                raise ValueError("%r of visualizer %r shall have %r, optionally %r" % (
+                    kind, pattern, sorted(required), sorted(optional),
+                ))
+        out.append(Visualizer(pattern, vis.get("display", ""), kind, dict(items)))
+    return out
+
+
+def load_visualizers(filename: str) -> list[Visualizer]:
+    with open(filename, "r", encoding="utf-8") as fs:
+        return parse_visualizers(json.load(fs))
+
+
+def _plain_text(text: str, start: int, end: int) -> str:
+    plain = text[start: end]
+    if "{" in plain or "}" in plain:
+        raise ValueError("Unmatched brace in display: %r" % text)
+    return plain
+
+
+def split_display(text: str) -> list[tuple[str, str, str]]:
+    """
+    split `size={.size,x}` to (literal, expr, format) parts, `{{` and `}}` are literal braces,
+    the format is `x` for hex or `d`, the default
+    """
+    out = []
+    literal = ""
+    pos = 0
+    for m in _DISPLAY_HOLE.finditer(text):
+        literal += _plain_text(text, pos, m.start())
+        pos = m.end()
+        if m.group(1) is None:
+            literal += m.group(0)[0]
+            continue
+        expr, _, fmt = m.group(1).rpartition(",")
+        if not expr or fmt.strip() not in {"x", "d"}:
+            expr, fmt = m.group(1), "d"
+        out.append((literal, expr.strip(), fmt.strip()))
+        literal = ""
+    literal += _plain_text(text, pos, len(text))
+    if literal:
+        out.append((literal, "", ""))
+    return out
+
+
+def _int_value(struct: pdb.StructRecord, stream: Stream) -> int:
+    if struct["value"] is not None:
+        return struct["value"]
+    if struct["fields"] is not None or not struct["size"] or struct["size"] > 8:
+        raise InvalidExpression("Shall be a number, got: %r" % struct["type"])
+    stream.seek(struct["address"])
+    val = int.from_bytes(stream.read(struct["size"]), "little", signed=struct.get("has_sign", False))
+    if struct["bitoff"] is not None and struct["bitsize"] is not None:
+        val = (val >> struct["bitoff"]) & BITMASK(struct["bitsize"])
+    return val
+
+
+@dataclass(eq=False)
+class VisualItems:
+    """
+    items of one container, records are only formed for the range being expanded
+
+    an item is at `addresses[i]` for list and tree, otherwise at
+    `base + stride * ((start + i) % capacity)`, capacity 0 for a plain array.
+    """
+    p: pdb.PDB7
+    count: int
+    display: str
+    item_lf: Any
+    item_type: str
+    item_size: int
+    addresses: list[int] | None = None
+    base: int = 0
+    stride: int = 0
+    start: int = 0
+    capacity: int = 0
+    value: ExprPlan | None = None
+    virt_base: int = 0
+    prepare: Callable[[pdb.StructRecord, Stream], None] | None = None
+
+    def address_of(self, i: int) -> int:
+        if self.addresses is not None:
+            return self.addresses[i]
+        if self.capacity:
+            i = (self.start + i) % self.capacity
+        return self.base + i * self.stride
+
+    def children(self, reader: ReadPlanner, lo=0, hi: int | None=None) -> list[pdb.StructRecord]:
+        """records of items [lo, hi), or ranges of them once more than a page"""
+        hi = self.count if hi is None else hi
+        if hi - lo > VISUAL_PAGE_SIZE:
+            step = VISUAL_PAGE_SIZE
+            while step * VISUAL_PAGE_SIZE < hi - lo:
+                step *= VISUAL_PAGE_SIZE
+            pages = []
+            for off in range(lo, hi, step):
+                end = min(hi, off + step)
+                page = pdb.new_struct(
+                    levelname="[%d:%d]" % (off, end - 1),
+                    type=self.item_type + "...",
+                    address=None,
+                )
+                page["expr"] = ""
+                page["_visual"] = self
+                page["_visual_range"] = (off, end)
+                page["_count"] = end - off
+                pages.append(page)
+            return pages
+
+        addrs = [self.address_of(i) for i in range(lo, hi)]
+        reader.prefetch((addr, self.item_size) for addr in addrs)
+        out = []
+        for i, addr in zip(range(lo, hi), addrs):
+            if self.value is None:
+                rec = self.p.tpi_stream.form_structs(self.item_lf, addr)
+            else:
+                rec = evaluate_plan(self.p, self.value, self.virt_base, reader, this=addr)
+            rec["levelname"] = "[%d]" % i
+            if self.prepare:
+                self.prepare(rec, reader)
+            out.append(rec)
+        return out
+
+
+class VisualizerPlan:
+    """expressions of a visualizer compiled for one container type"""
+
+    def __init__(self, p: pdb.PDB7, vis: Visualizer, this_lf) -> None:
+        self.vis = vis
+        self.this_lf = this_lf
+        self.display = [
+            (literal, compile_this_expr(p, this_lf, expr) if expr else None, fmt)
+            for literal, expr, fmt in split_display(vis.display)
+        ]
+        self.exprs = {
+            key: compile_this_expr(p, this_lf, expr)
+            for key, expr in vis.items.items()
+            if key not in _MEMBER_KEYS and key != "value"
+        }
+        # node type name: (node lf, member offsets, value plan)
+        self._nodes: dict[str, tuple[Any, dict[str, int], ExprPlan | None]] = {}
+
+    def _node_plan(self, p: pdb.PDB7, ptr: pdb.StructRecord):
+        key = ptr["type"]
+        if key not in self._nodes:
+            node_lf = get_layout_cache(p).pointee(ptr["lf"])
+            offsets = {}
+            for name in _MEMBER_KEYS & set(self.vis.items):
+                link = evaluate_plan(p, compile_this_expr(p, node_lf, ".%s" % self.vis.items[name]))
+                if not link["is_pointer"]:
+                    raise InvalidExpression("Shall be a pointer to the node: %r" % self.vis.items[name])
+                offsets[name] = link["address"]
+            value = self.vis.items.get("value", "")
+            self._nodes[key] = (node_lf, offsets, compile_this_expr(p, node_lf, value) if value else None)
+        return self._nodes[key]
+
+    def bind(self, p: pdb.PDB7, record: pdb.StructRecord, virt_base=0, stream: Stream=None) -> VisualItems:
+        """items of the container `record`, only the list and tree nodes are walked here"""
+        reader = stream if isinstance(stream, ReadPlanner) else ReadPlanner(stream)
+        this = record["address"]
+
+        def _eval(plan: ExprPlan) -> pdb.StructRecord:
+            return evaluate_plan(p, plan, virt_base, reader, this=this)
+
+        def _int(key: str, default: int | None=None) -> int | None:
+            if key not in self.exprs:
+                return default
+            return _int_value(_eval(self.exprs[key]), reader)
+
+        display = ""
+        for literal, plan, fmt in self.display:
+            display += literal
+            if plan is not None:
+                val = _int_value(_eval(plan), reader)
+                display += hex(val) if fmt == "x" else str(val)
+        if not self.vis.kind:
+            # only the display, no items
+            return VisualItems(p, 0, display, None, "", 0, virt_base=virt_base)
+
+        head = _eval(self.exprs["head" if "head" in self.exprs else "pointer"])
+        if not head["is_pointer"]:
+            raise InvalidExpression("Shall be a pointer: %r" % head["type"])
+        first = _int_value(head, reader)
+        node_lf, offsets, value = self._node_plan(p, head)
+        layout = get_layout_cache(p).layout(node_lf)
+        items = VisualItems(p, 0, display, node_lf, layout["type"], layout["size"], value=value, virt_base=virt_base)
+        max_len = min(MAX_LIST_LENGTH, max(0, _int("size", MAX_LIST_LENGTH)))
+        match self.vis.kind:
+            case "array":
+                items.count = max(0, _int("size"))
+                items.base = first
+                items.stride = layout["size"]
+                items.start = _int("start", 0)
+                items.capacity = _int("capacity", 0)
+            case "list":
+                nodes = walk_list(reader, first, offsets["next"], head["size"], max_len=max_len)
+                items.addresses = nodes.addresses
+                items.count = len(nodes)
+            case "tree":
+                nodes = walk_tree(reader, first, offsets["left"], offsets["right"], head["size"], max_len=max_len)
+                items.addresses = nodes.addresses
+                items.count = len(nodes)
+        return items
+
+
+class VisualizerSet:
+    """visualizers matched by type name, each compiled once per type of each PDB"""
+
+    def __init__(self, visualizers: list[Visualizer]=()) -> None:
+        self.visualizers = list(visualizers)
+        # the plans of a PDB by type name, kept while switching between modules
+        self._plans: Callable[[pdb.PDB7], dict[str, VisualizerPlan | Exception | None]] = per_pdb(lambda p: {})
+
+    def __bool__(self) -> bool:
+        return bool(self.visualizers)
+
+    def match(self, typename: str) -> Visualizer | None:
+        for vis in self.visualizers:
+            if fnmatchcase(typename, vis.pattern):
+                return vis
+        return None
+
+    def plan(self, p: pdb.PDB7, record: pdb.StructRecord) -> VisualizerPlan | None:
+        plans = self._plans(p)
+        typename = record["type"]
+        if typename not in plans:
+            vis = self.match(typename)
+            if vis is None:
+                plans[typename] = None
+            else:
+                # no lf for a record formed in a worker process
+                this_lf = record["lf"] or get_layout_cache(p).lookup(typename)[0]
+                try:
+                    plans[typename] = VisualizerPlan(p, vis, this_lf)
+                except Exception as e:
+                    plans[typename] = e
+        plan = plans[typename]
+        if isinstance(plan, Exception):
+            raise plan
+        return plan
@@ -47,6 +47,11 @@ class ProcessDebugger:
         handle = self.proc.get_handle(win32.PROCESS_VM_READ | win32.PROCESS_QUERY_INFORMATION)
         return dbghelp.SymFromName(handle, name.encode())
 
+    def get_module_bases(self) -> dict[str, int]:
+        """base address by file name of each module, scanned on every call, a DLL may be loaded since"""
+        self.proc.scan_modules()
+        return {m.get_filename(): m.get_base() for m in self.proc.iter_modules() if m.get_filename()}
+
     def read_memory(self, vaddr: int, byte_sz: int) -> bytes:
         dat = self.proc.read(vaddr, byte_sz)
         return dat
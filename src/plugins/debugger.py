@@ -89,6 +89,9 @@ class Debugger(Protocol):
     def get_virtual_base(self) -> int:
         return 0
 
+    def get_module_bases(self) -> dict[str, int]:
+        return {}
+
     def get_memory_stream(self) -> DebuggerStream:
         ...
 
@@ -137,6 +140,11 @@ class ExeDebugger(Plugin):
             raise ProcessNotConnected("No process is connected.")
         return self.pd.proc.get_main_module().get_base()
 
+    def get_module_bases(self) -> dict[str, int]:
+        if self.pd is None:
+            raise ProcessNotConnected("No process is connected.")
+        return self.pd.get_module_bases()
+
 
 class MiniDumpDebugger(Plugin):
     def post_init(self):
@@ -168,3 +176,10 @@ class MiniDumpDebugger(Plugin):
         if self.mf.peb.image_base_address is None:
             raise RuntimeError("Can not get virtual base address.")
         return self.mf.peb.image_base_address
+
+    def get_module_bases(self) -> dict[str, int]:
+        if self.mf is None:
+            raise ProcessNotConnected("No dump file is loaded.")
+        if self.mf.modules is None:
+            return {}
+        return {m.name: m.baseaddress for m in self.mf.modules.modules}
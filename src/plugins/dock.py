@@ -11,6 +11,7 @@ from ctrl.WidgetBinParser import BinParser
 from ctrl.WidgetDockTitleBar import DockTitleBar
 from ctrl.WidgetExpression import Expression
 from ctrl.WidgetMemory import Memory
+from ctrl.WidgetSymbols import Symbols
 from helper import qtmodel
 from plugins import debugger
 
@@ -31,6 +32,11 @@ class Dock(Plugin):
                         "command": "AddExpressionView",
                         "icon": ":icon/images/ctrl/VariableExpression_16x.svg",
                     },
+                    {
+                        "name": self.tr("Add Symbol Browser"),
+                        "command": "AddSymbolView",
+                        "icon": ":icon/images/vswin2019/Database_16x.svg",
+                    },
                 ],
             },
         ]
@@ -39,6 +45,7 @@ class Dock(Plugin):
         return [
             ("AddMemoryView", self.addMemoryView),
             ("AddExpressionView", self.addExpressionView),
+            ("AddSymbolView", self.addSymbolView),
         ]
 
     def post_init(self):
@@ -134,6 +141,13 @@ class Dock(Plugin):
             action.setCheckable(True)
             action.setChecked(True)
 
+            action = self._addAction(menu, self.tr("Profile expressions"))
+            action.toggled.connect(expr.setProfiling)
+            action.setCheckable(True)
+            action.setChecked(expr.profiling)
+
+            action = self._addAction(menu, self.tr("Dump expression profiles"), expr.dumpProfiles)
+
             menu.addSeparator()
 
             action = self._addAction(menu, self.tr("Refresh"), expr.refreshTree)
@@ -176,6 +190,29 @@ class Dock(Plugin):
 
         return dockWidget
 
+    def addSymbolView(self) -> QtWidgets.QDockWidget:
+        dockWidget = self.generate_dockwidget()
+        dockWidget.setWindowIcon(QtGui.QIcon(":icon/images/vswin2019/Database_16x.svg"))
+        sym = Symbols(self.app)
+        sym.symbolActivated.connect(self._addSymbolToExpression)
+        self.docks["symbol"][dockWidget] = sym
+        dockWidget.setWidget(sym)
+        dockWidget.setWindowTitle("Symbols-%d" % len(self.docks["symbol"]))
+        self.app.addDockWidget(QtCore.Qt.DockWidgetArea.RightDockWidgetArea, dockWidget)
+
+        titlebar = dockWidget.titleBarWidget()
+        if isinstance(titlebar, DockTitleBar):
+            titlebar.ui.btnClose.clicked.connect(lambda: self._close_dock(dockWidget, self.docks["symbol"]))
+
+        return dockWidget
+
+    def _addSymbolToExpression(self, name: str):
+        if not self.docks["expression"]:
+            self.addExpressionView()
+        dockWidget, expr = next(iter(self.docks["expression"].items()))
+        dockWidget.raise_()
+        expr.addExpression(name)
+
     def _openBinParserFromMemory(self, mem: Memory):
         addr = mem.requestedAddress()
         size = mem.requestedSize()
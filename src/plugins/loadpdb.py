@@ -1,13 +1,18 @@
 import logging
 import os
-import pickle
+import re
+import threading
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
+from typing import Mapping
 from typing import Optional
 from typing import Self
 from typing import TypedDict
 
+import numpy as np
 from construct import Struct
+from PyQt6 import QtCore
 from PyQt6 import QtWidgets
 
 from ctrl.qtapp import HistoryMenu
@@ -15,13 +20,52 @@ from ctrl.qtapp import MenuAction
 from ctrl.qtapp import Plugin
 from ctrl.WidgetPicklePdb import PicklePdb
 from helper import qtmodel
+from helper.qtthread import Runnable
+from modules.addrindex import AddressIndex
+from modules.addrindex import get_address_index
 from modules.expr_parser import InvalidExpression
+from modules.expr_parser import depends_changed
+from modules.expr_parser import evaluate_int_expr
+from modules.expr_parser import expr_members
+from modules.expr_parser import global_names
+from modules.expr_parser import members_former
+from modules.expr_parser import query_aggregate_from_expr
+from modules.expr_parser import query_column_from_expr
 from modules.expr_parser import query_struct_from_expr
+from modules.expr_parser import query_structs_from_exprs
+from modules.expr_parser import split_list_expr
+from modules.expr_parser import split_module_expr
+from modules.expr_parser import split_slice_expr
+from modules.layoutpool import LayoutPool
+from modules.pdbcache import PdbinCache
+from modules.pdbloader import PdbConverter
+from modules.pdbloader import load_pdb
+from modules.pdbmodules import ModuleBases
+from modules.pdbmodules import ModuleIndex
+from modules.pdbmodules import PdbModule
+from modules.pdbmodules import module_name
 from modules.pdbparser.pdbparser import pdb
-from modules.pdbparser.pdbparser import picklepdb
+from modules.symtable import SymbolTable
+from modules.symtable import get_symbol_table
+from modules.utils.column import ArrayColumn
+from modules.utils.column import column_dtype
+from modules.utils.completion import CompletionIndex
+from modules.utils.completion import split_member_access
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyarray import ElementRows
+from modules.utils.lazyrecord import LazyRecord
+from modules.utils.linkedlist import LIST_CACHE_PAGES
+from modules.utils.linkedlist import MAX_LIST_LENGTH
+from modules.utils.linkedlist import ListNodes
+from modules.utils.linkedlist import iter_list
+from modules.utils.linkedlist import walk_list
 from modules.utils.myfunc import BITMASK
 from modules.utils.myfunc import escape_filename
+from modules.utils.pdbin import MappedPdb
+from modules.utils.readplan import ReadPlanner
 from modules.utils.typ import Stream
+from modules.visualizer import VisualizerSet
+from modules.visualizer import load_visualizers
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +106,19 @@ def _read_value(item: ViewStruct, stream: Stream | None) -> int:
     return val
 
 
+def _iter_leaf_ranges(item: ViewStruct):
+    fields = item["fields"]
+    if not fields:
+        if item["value"] is None and item["size"]:
+            yield item["address"], item["size"]
+    elif isinstance(fields, list):
+        for x in fields:
+            yield from _iter_leaf_ranges(x)
+    elif isinstance(fields, dict):
+        for x in fields.values():
+            yield from _iter_leaf_ranges(x)
+
+
 @dataclass
 class CStruct:
     _record: ViewStruct
@@ -119,28 +176,33 @@ class CStruct:
     def is_plist(self):
         typ = self._record["type"]
         return typ.lower() == 'plist_struct'
- 
+
     def iter_plist_nodes(self):
+        """generator of the `size` node pointers of a PLIST_STRUCT, from `head->next` on"""
         if not self.is_plist:
-            raise TypeError("only applicable for PLIST_STRUCT, current type is %r" % self._field["type"])
+            raise TypeError("only applicable for PLIST_STRUCT, current type is %r" % self._record["type"])
         if self._stream is None:
             raise ValueError("Need _stream for this operation.")
         head = self.head.next
         size = int(self.size)
-        nodes = []
-        for i in range(size):
-            if i > 0 and hex(int(head)) == int(self.head.next):
-                raise ValueError("shall has %d elements in list: %s, got length = %d!" % (size, repr(nodes), len(nodes)))
-            nodes.append(hex(int(head)))
-            yield head
-            # deref head->next manually here
-            self._stream.seek(int(head))
-            new_node = self._stream.read(self.head._record["size"])
-            head = CStruct(head._record.copy(), self._stream)
-            head._record["value"] = int.from_bytes(new_node[:head._record["size"]], "little")
+        # a node links the next one at its start, followed as the nodes are taken
+        nodes = ListNodes()
+        for addr in iter_list(self._stream, int(head), 0, head.get_size(), max_len=size, nodes=nodes):
+            record = head._record.copy()
+            record["value"] = addr
+            yield CStruct(record, self._stream)
+        if len(nodes) < size:
+            addresses = [hex(x) for x in nodes.addresses]
+            raise ValueError("shall has %d elements in list: %s, got length = %d!" % (size, repr(addresses), len(nodes)))
 
     def iter_items(self, _record=None):
         """generator of recursive (expr: str, record: ViewStruct) pairs"""
+        if _record is None and self._stream is not None and not isinstance(self._stream, ReadPlanner):
+            # read all the leaf values in a few block reads
+            reader = ReadPlanner(self._stream)
+            reader.prefetch(_iter_leaf_ranges(self._record))
+            yield from CStruct(self._record, reader).iter_items()
+            return
         record = self._record if _record is None else _record
         fields = record["fields"]
         if fields is None:
@@ -183,25 +245,26 @@ class CStruct:
                     fs.write("{:90} = {}\n".format(expr + expr_type, hex(val)))
 
 
-def _shift_addr(s: pdb.StructRecord, shift: int=0):
-    s["address"] = s["address"] + shift
-    if isinstance(s["fields"], dict):
-        for c in s["fields"].values():
-            _shift_addr(c, shift)
-    elif isinstance(s["fields"], list):
-        for c in s["fields"]:
-            _shift_addr(c, shift)
-
-
 def _add_expr(s: pdb.StructRecord, expr: str):
     if expr.endswith("->") or expr.endswith("."):
         notation = ""
     else:
         notation = "->" if s.get("is_pointer", False) else "."
     s["expr"] = expr.rstrip(notation)
+    if isinstance(s, LazyRecord) and not s.formed:
+        # the members get theirs once formed
+        s.when_formed(partial(_add_member_exprs, expr=expr, notation=notation))
+    else:
+        _add_member_exprs(s, expr, notation)
+
+
+def _add_member_exprs(s: pdb.StructRecord, expr: str, notation: str):
     if isinstance(s["fields"], dict):
         for c in s["fields"].values():
             _add_expr(c, expr + notation + c["levelname"])
+    elif isinstance(s["fields"], ElementArray):
+        # the index is prepended once an element is formed
+        s["fields"].expr = expr
     elif isinstance(s["fields"], list):
         for c in s["fields"]:
             _add_expr(c, expr + c["levelname"])
@@ -227,11 +290,127 @@ def _remove_extra_paren(expr: str) -> str:
     return expr
 
 
+REG_LINK_NAME = re.compile(r"[A-Za-z_]\w*")
+
+
+def _list_head_address(head: ViewStruct, stream: Stream) -> int:
+    """address of a list head given as the struct, a pointer to it, or a number"""
+    if head["is_pointer"] or head["fields"] is None:
+        return _read_value(head, stream)
+    return head["address"]
+
+
+def _duplicate_as_array(expr: str, s: pdb.StructRecord, count: int) -> ViewStruct:
+    if count > 1:
+        # the elements are copied from `s` only once accessed
+        _add_expr(s, "")
+        s = pdb.new_struct(
+            levelname="%s[%d]" % (expr, count),
+            type="LF_ARRAY",
+            address=s["address"],
+            size=count * s["size"],
+            fields=ElementArray(s, count, s["size"]),
+        )
+    else:
+        s["levelname"] = expr
+    _add_expr(s, expr)
+    return s
+
+
+def _tabulate_a_struct(struct: pdb.StructRecord, count: int, total_byte: int) -> list[list[ViewStruct]]:
+    """rows of the leaves of each element, formed from the leaves of the first one once accessed"""
+    leaves = []
+    if isinstance(struct["fields"], list):
+        if count == 0:
+            count = len(struct["fields"])
+        count = min(count, len(struct["fields"]))
+        if count == 0:
+            return []
+        first = struct["fields"][0]
+        cut_pos = len(first["levelname"])
+        _flatten_dict(first, leaves)
+        for c in leaves:
+            c["expr"] = c["expr"][cut_pos:]
+        return ElementRows(leaves, count, first["size"])
+
+    if count == 0:
+        count = total_byte // struct["size"]
+    _add_expr(struct, "")
+    _flatten_dict(struct, leaves)
+    return ElementRows(leaves, max(1, count), struct["size"])
+
+
+def _parse_expr_to_struct(p: pdb.PDB7, expr: str, addr=0, count=0, data_size=0, add_dummy_root=False) -> pdb.StructRecord:
+    s = query_struct_from_expr(p, expr, addr)
+    if count == 0:
+        count = data_size // s["size"]
+    s = _duplicate_as_array(expr, s, count)
+
+    if add_dummy_root:
+        s = pdb.new_struct(
+            fields=[s],
+        )
+    return s
+
+
+def _parse_expr_to_table(p: pdb.PDB7, expr: str, addr=0, count=0, data_size=0) -> list[list[ViewStruct]]:
+    out_struct = query_struct_from_expr(p, expr, addr)
+    _add_expr(out_struct, "")
+    array = _tabulate_a_struct(out_struct, count, data_size)
+    return array
+
+
+def _query_struct(p: pdb.PDB7, expr: str, virtual_base=0, io_stream=None, profile=False, levelname="") -> ViewStruct:
+    struct = query_struct_from_expr(p, expr, virtual_base, io_stream, profile=profile)
+    # the expression as typed, i.e. with the module name
+    levelname = levelname or expr
+    struct["levelname"] = levelname
+    _add_expr(struct, levelname)
+    return struct
+
+
+def _lookup_cache(cache: PdbinCache, filename: str) -> tuple[str, Path | None]:
+    return filename, cache.lookup(filename)
+
+
+def _build_symbol_table(p: pdb.PDB7) -> tuple[pdb.PDB7, SymbolTable]:
+    return p, get_symbol_table(p)
+
+
+def _same_path(a: str, b: str) -> bool:
+    return bool(a and b) and os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _build_completion_index(p: pdb.PDB7) -> tuple[pdb.PDB7, CompletionIndex]:
+    names = [
+        name
+        for name in p.glb_stream.symbols.keys()
+        # exclude built-in special symbols
+        if not name.startswith("_") and not name.endswith("$")
+    ]
+    # struct names, if the parser keeps them by name
+    names.extend(getattr(p.tpi_stream, "structs", {}).keys())
+    return p, CompletionIndex(names)
+
+
 class LoadPdb(Plugin):
+    symbolTableBuilt = QtCore.pyqtSignal()
+    # loaded or failed, once `is_loading()` is False again
+    loadFinished = QtCore.pyqtSignal(bool)
+
     _pdb: pdb.PDB7 = None
+    _pdb_serial: int = 0
     _loading: bool = False
+    _visualizers: VisualizerSet = VisualizerSet()
+    _pool: LayoutPool | None = None
+    _completion: CompletionIndex | None = None
+    _symbol_table: SymbolTable | None = None
+    _member_indexes: dict[tuple[str, ...], CompletionIndex] = {}
+    _module_bases: ModuleBases | None = None
+    _module_index: ModuleIndex | None = None
 
     def registerMenues(self) -> list[MenuAction]:
+        backend = self.app.app_setting.value("LoadPdb/backend", "")
         return [
             {
                 "name": self.tr("PDB"),
@@ -245,7 +424,43 @@ class LoadPdb(Plugin):
                         "name": self.tr("Recently PDBs"),
                         "submenus": [],
                     },
+                    {
+                        "name": self.tr("Add Module PDB..."),
+                        "command": "AddModulePdb",
+                    },
+                    {
+                        "name": self.tr("Unload Module PDBs"),
+                        "command": "UnloadModulePdbs",
+                    },
+                    {
+                        "name": self.tr("Watch Build Folder..."),
+                        "command": "WatchPdbFolder",
+                    },
+                    {
+                        "name": self.tr("Stop Watching Folders"),
+                        "command": "UnwatchPdbFolders",
+                    },
                     {"name": "---",},
+                    {
+                        "name": self.tr("Parse Backend"),
+                        "actionGroup": True,
+                        "submenus": [
+                            {
+                                "name": self.tr("Threads"),
+                                "command": "UseThreadBackend",
+                                "checked": backend != "process",
+                            },
+                            {
+                                "name": self.tr("Worker Processes"),
+                                "command": "UseProcessBackend",
+                                "checked": backend == "process",
+                            },
+                        ],
+                    },
+                    {
+                        "name": self.tr("Load Visualizers..."),
+                        "command": "LoadVisualizers",
+                    },
                     {
                         "name": self.tr("Show PDB status..."),
                         "command": "ShowPdbStatus",
@@ -258,6 +473,13 @@ class LoadPdb(Plugin):
         return [
             ("ShowPdbStatus", self.show_status),
             ("ShowPicklePdb", self.show_pickle_pdb),
+            ("LoadVisualizers", self.load_visualizers),
+            ("AddModulePdb", self.add_module),
+            ("UnloadModulePdbs", self.unload_modules),
+            ("WatchPdbFolder", self.watch_folder),
+            ("UnwatchPdbFolders", self.unwatch_folders),
+            ("UseThreadBackend", lambda: self.set_backend("")),
+            ("UseProcessBackend", lambda: self.set_backend("process")),
         ]
 
     def post_init(self):
@@ -265,8 +487,43 @@ class LoadPdb(Plugin):
         self.app.evt.add_hook("ApplicationClosed", self._onClosed)
 
         self._pdb_fname = ""
+        self._source_fname = ""
+        # PDBs of the other modules of the process, by module name
+        self._modules: dict[str, PdbModule] = {}
+        self._module_sources: dict[str, str] = {}
+
+        # the indexes are built and the types decoded ahead after load, one job
+        # at a time and not in the pool of the app, the queries are not queued
+        # behind them
+        self._background = QtCore.QThreadPool(self)
+        self._background.setMaxThreadCount(1)
+        self._preload_stop = threading.Event()
         current_pdb = self.app.app_setting.value("LoadPdb/pdbin", "")
 
+        # .pdb opened are converted to pdbins in the cache, once per build
+        cache_dir = self.app.app_setting.value("LoadPdb/cache_dir", str(self.app.app_dir / "pdbin_cache"))
+        self._pdbin_cache = PdbinCache(cache_dir)
+        self._converter: PdbConverter | None = None
+        self._convert_queue: dict[str, None] = {}
+        self._load_after_convert = ""
+        self._convert_timer = QtCore.QTimer(self)
+        self._convert_timer.setInterval(200)
+        self._convert_timer.timeout.connect(self._poll_conversion)
+
+        # new PDBs in the build folders are converted once the linker is done
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watch_timer = QtCore.QTimer(self)
+        self._watch_timer.setSingleShot(True)
+        self._watch_timer.setInterval(2000)
+        self._watch_timer.timeout.connect(self._scan_watched_folders)
+        self._watcher.directoryChanged.connect(lambda _: self._watch_timer.start())
+        self._watcher.fileChanged.connect(lambda _: self._watch_timer.start())
+        for folder in self.app.app_setting.value("LoadPdb/watch_folders", [], type=list):
+            if os.path.isdir(folder):
+                self._watcher.addPath(folder)
+        if self._watcher.directories():
+            self._watch_timer.start()
+
         menu = self.app.menu(self.tr("Recently PDBs"))
         _recently_used = self.app.app_setting.value("LoadPdb/recent_used", [])
         _recently_used = [x for x in _recently_used if os.path.exists(x)]
@@ -276,10 +533,45 @@ class LoadPdb(Plugin):
 
         if current_pdb:
             self.load_pdbin(current_pdb)
+        for f in self.app.app_setting.value("LoadPdb/modules", [], type=list):
+            if os.path.exists(f):
+                self.add_module(f)
+
+        if visualizers := self.app.app_setting.value("LoadPdb/visualizers", ""):
+            try:
+                self._visualizers = VisualizerSet(load_visualizers(visualizers))
+            except Exception as e:
+                logger.warning("visualizers %r: %s", visualizers, e)
 
     def _onClosed(self, evt):
+        self._stop_background()
         if self.widget:
             self.widget.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._converter is not None:
+            self._convert_timer.stop()
+            self._converter.cancel_all()
+            self._converter.shutdown()
+
+    def set_backend(self, backend: str):
+        """
+        "process" to form the layouts in worker processes, each loads the PDB once,
+        else in the thread pool of the app
+        """
+        if backend:
+            self.app.app_setting.setValue("LoadPdb/backend", backend)
+        else:
+            self.app.app_setting.remove("LoadPdb/backend")
+        self._restart_pool()
+
+    def _restart_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        backend = self.app.app_setting.value("LoadPdb/backend", "")
+        if backend == "process" and self._pdb_fname:
+            self._pool = LayoutPool(self._pdb_fname, former=members_former(self._pdb))
 
     def load_pdbin(self, filename=""):
         if not filename:
@@ -294,42 +586,359 @@ class LoadPdb(Plugin):
             self._hist_pdbs.add_data(filename)
             self.app.app_setting.setValue("LoadPdb/recent_used", list(self._hist_pdbs.data_list))
 
-            def _cb(_pdb):
-                if _pdb is None:
-                    self.app.statusBar().showMessage("Pdbin load failed!")
-                    return
-                self.app.app_setting.setValue("LoadPdb/pdbin", filename)
-                self._pdb_fname = filename
-                self._pdb = _pdb
+            path = Path(filename)
+            if path.suffix == ".pdb":
+                # the pdbin in the cache is opened, converted first if not there
+                self._open_cached(filename)
+            elif path.suffix == ".pdbin":
+                self._open_pdb(filename, filename)
+            self._loading = True
+            self.app.statusBar().showMessage("Loading... %r" % filename)
+
+    def _open_cached(self, filename: str, module=False):
+        """open the pdbin in the cache of the .pdb `filename`, converted first if not there"""
+        self.app.exec_async(
+            _lookup_cache,
+            self._pdbin_cache,
+            filename,
+            finished_cb=partial(self._onCacheLookedUp, module=module),
+            errored_cb=lambda expt, tb: self._open_pdb(filename, filename, module),
+        )
+
+    def _onCacheLookedUp(self, found: tuple[str, Path | None] | None, module=False):
+        if found is None:
+            # not read as a PDB 7.0 file, parsed as it is
+            return
+        filename, pdbin = found
+        if pdbin is None:
+            # a module is opened once converted, as it is in `_module_sources`
+            self._convert([filename], load=not module)
+        else:
+            self._open_pdb(filename, str(pdbin), module)
+
+    def _open_pdb(self, source: str, filename: str, module=False):
+        """
+        load `filename`, which is `source` or the pdbin converted from it,
+        as the main module, or with `module` as one of the other modules.
+        """
+        def _cb(_pdb):
+            if _pdb is None:
+                self.app.statusBar().showMessage("Pdbin load failed!")
+                return
+            if module:
+                self._onModuleLoaded(source, filename, _pdb)
+                return
+            self.app.app_setting.setValue("LoadPdb/pdbin", source)
+            self._pdb_fname = filename
+            self._source_fname = source
+            self._pdb = _pdb
+            self._pdb_serial += 1
+            self._restart_pool()
+            self._completion = None
+            self._symbol_table = None
+            self._member_indexes = {}
+            self._stop_background()
+            self._exec_background(_build_completion_index, _pdb, finished_cb=self._onCompletionIndexBuilt)
+            self._exec_background(_build_symbol_table, _pdb, finished_cb=self._onSymbolTableBuilt)
+            # the function pointers are named by it
+            self._exec_background(get_address_index, _pdb)
+            if isinstance(_pdb, MappedPdb):
+                # an expression decodes the types it needs by itself meanwhile
+                self._exec_background(_pdb.preload_types, self._preload_stop)
+            if self._modules:
+                self._build_module_index()
+            self._loading = False
+            self.loadFinished.emit(True)
+            self.app.statusBar().showMessage("Pdbin is Loaded.")
+            self.app.log("PDB is loaded!")
+
+        def _err(expt, tb):
+            if module:
+                self._drop_module(source)
+            else:
+                self._hist_pdbs.remove_data(source)
                 self._loading = False
-                self.app.statusBar().showMessage("Pdbin is Loaded.")
-                self.app.log("PDB is loaded!")
+                self.loadFinished.emit(False)
+            QtWidgets.QMessageBox.warning(
+                self.app,
+                self.__class__.__name__,
+                str(expt),
+            )
+
+        self.app.exec_async(
+            load_pdb,
+            filename,
+            finished_cb=_cb,
+            errored_cb=_err,
+        )
+
+    def _exec_background(self, fn, *args, finished_cb=None):
+        worker = Runnable(fn, *args)
+        if finished_cb:
+            worker.finished.connect(finished_cb)
+        worker.errored.connect(lambda expt, tb: logger.warning(tb))
+        self._background.start(worker)
+
+    def _stop_background(self):
+        """drop the jobs of the former PDB, the running one stops if it can"""
+        self._background.clear()
+        self._preload_stop.set()
+        self._preload_stop = threading.Event()
+
+    def _convert_missing(self, pdb_files: list[str]):
+        """convert the files not in the cache, hashed off the GUI thread"""
+        self.app.exec_async(
+            self._pdbin_cache.missing,
+            pdb_files,
+            finished_cb=lambda files: files and self._convert(files),
+        )
+
+    def _convert(self, pdb_files: list[str], load=False):
+        """convert into the cache in background, with `load` the last file is loaded once done"""
+        if load:
+            self._load_after_convert = pdb_files[-1]
+        running = self._converter.files if self._converter is not None else []
+        for f in pdb_files:
+            if f not in running:
+                self._convert_queue[f] = None
+        if self._converter is None:
+            self._start_conversion()
+
+    def _start_conversion(self):
+        files = list(self._convert_queue)
+        self._convert_queue.clear()
+        if not files:
+            return
+        logger.debug("convert: %r", files)
+        self._converter = PdbConverter(files, self._pdbin_cache.dir, outputs=self._pdbin_cache.outputs(files))
+        self._converter.start()
+        self._convert_timer.start()
+
+    def _poll_conversion(self):
+        converter = self._converter
+        converter.poll()
+        if not converter.finished:
+            self.app.statusBar().showMessage("Converting PDB... %d%%" % (converter.fraction() * 100))
+            return
+        self._convert_timer.stop()
+        converter.shutdown()
+        self._converter = None
+
+        rewritten = []
+        for f, ev in converter.progress.items():
+            if ev.stage == "done" and self._pdbin_cache.is_stale(f):
+                # written by the linker meanwhile, the output may be of either build
+                converter.outputs[f].unlink(missing_ok=True)
+                rewritten.append(f)
+            elif ev.stage == "done":
+                self.app.log("PDB is converted: %r" % f)
+                if _same_path(f, self._load_after_convert) or _same_path(f, self._source_fname):
+                    # opened, or rebuilt while loaded
+                    self._open_pdb(f, str(converter.outputs[f]))
+                elif self._is_module_source(f):
+                    self._open_pdb(f, str(converter.outputs[f]), module=True)
+            elif ev.stage == "failed":
+                logger.warning("convert %r: %s", f, ev.error)
+                if self._is_module_source(f) and module_name(f) not in self._modules:
+                    self._drop_module(f)
+                if _same_path(f, self._load_after_convert):
+                    self._hist_pdbs.remove_data(f)
+                    self._loading = False
+                    self.loadFinished.emit(False)
+                    QtWidgets.QMessageBox.warning(
+                        self.app,
+                        self.__class__.__name__,
+                        ev.error,
+                    )
+        if self._load_after_convert in converter.progress and self._load_after_convert not in rewritten:
+            self._load_after_convert = ""
+        loaded = [self._pdb_fname, *(m.filename for m in self._modules.values())]
+        self._pdbin_cache.prune(keep=[x for x in [*loaded, *converter.outputs.values()] if x])
+        if rewritten:
+            self._convert_missing(rewritten)
+        self._start_conversion()
+
+    def add_module(self, filename=""):
+        """
+        load the PDB of one more module of the process, i.e. a DLL, besides the
+        main one. its names are `module!symbol`, or unqualified if not in the
+        modules loaded before it.
+        """
+        if not filename:
+            filename, _ = QtWidgets.QFileDialog.getOpenFileName(
+                self.app,
+                caption="Add Module PDB",
+                filter="PDB (*.pdb *.pdbin);;Any (*.*)"
+            )
+        if not filename:
+            return
+        if module_name(filename) == self._main_module():
+            self.app.statusBar().showMessage("Already loaded as the main module: %r" % filename)
+            return
+        logger.debug("add module: %r", filename)
+        self._module_sources[module_name(filename)] = filename
+        self.app.app_setting.setValue("LoadPdb/modules", list(self._module_sources.values()))
+        if Path(filename).suffix == ".pdb":
+            self._open_cached(filename, module=True)
+        else:
+            self._open_pdb(filename, filename, module=True)
+        self.app.statusBar().showMessage("Loading... %r" % filename)
+
+    def unload_modules(self):
+        """drop all the modules but the main one"""
+        self._modules = {}
+        self._module_sources = {}
+        self._module_index = None
+        self._pdb_serial += 1
+        self.app.app_setting.remove("LoadPdb/modules")
+
+    def _is_module_source(self, filename: str) -> bool:
+        return any(_same_path(filename, f) for f in self._module_sources.values())
+
+    def _drop_module(self, source: str):
+        name = module_name(source)
+        self._module_sources.pop(name, None)
+        self.app.app_setting.setValue("LoadPdb/modules", list(self._module_sources.values()))
+
+    def _onModuleLoaded(self, source: str, filename: str, _pdb: pdb.PDB7):
+        name = module_name(source)
+        if name not in self._module_sources:
+            # unloaded meanwhile
+            return
+        self._modules[name] = PdbModule(name, source, filename, _pdb)
+        # an unqualified name may be of this one now
+        self._pdb_serial += 1
+        self._exec_background(get_address_index, _pdb)
+        if isinstance(_pdb, MappedPdb):
+            self._exec_background(_pdb.preload_types, self._preload_stop)
+        self._build_module_index()
+        self.app.statusBar().showMessage("Module %r is Loaded." % name)
+        self.app.log("PDB of module %r is loaded!" % name)
+
+    def _main_module(self) -> str:
+        return module_name(self._source_fname) if self._source_fname else ""
+
+    def _module_list(self) -> list[tuple[str, pdb.PDB7]]:
+        """(name, PDB) of all the modules, the main one first"""
+        return [(self._main_module(), self._pdb), *((m.name, m.pdb) for m in self._modules.values())]
+
+    def _build_module_index(self):
+        self._module_index = None
+        self._exec_background(
+            ModuleIndex,
+            self._module_list(),
+            finished_cb=partial(self._onModuleIndexBuilt, self._pdb_serial),
+        )
+
+    def _onModuleIndexBuilt(self, serial: int, index: ModuleIndex | None):
+        if index is not None and serial == self._pdb_serial:
+            self._module_index = index
 
-            def _err(expt, tb):
-                self._hist_pdbs.remove_data(filename)
+    def _get_module_index(self) -> ModuleIndex:
+        """built here if not yet in background"""
+        index = self._module_index
+        if index is None:
+            index = ModuleIndex(self._module_list())
+            self._module_index = index
+        return index
+
+    def load_module_bases(self, dbg):
+        """bases of the modules besides the main one, from the module list of the debugger `dbg`"""
+        if self._modules:
+            self._module_bases = ModuleBases(dbg.get_module_bases())
+
+    def _module_of(self, expr: str) -> tuple[str, str]:
+        """
+        module `expr` is of and `expr` without the module names, the module named
+        in it, else the first one having any of its global names. "" for the main one.
+        """
+        split = split_module_expr(expr) if "!" in expr else None
+        if split is not None:
+            name, expr = split
+        elif self._modules:
+            name = self._get_module_index().resolve(global_names(expr)) or self._main_module()
+        else:
+            return "", expr
+        if name == self._main_module():
+            return "", expr
+        if name not in self._modules:
+            raise InvalidExpression("Module not loaded: %r" % name)
+        return name, expr
+
+    def _module_pdb(self, module: str) -> pdb.PDB7:
+        return self._modules[module].pdb if module else self._pdb
+
+    def _module_base(self, module: str, virtual_base: int) -> int:
+        """base of `module`, `virtual_base` is of the main one"""
+        if not module:
+            return virtual_base
+        bases = self._module_bases
+        if bases is not None and module in bases:
+            return bases.get(module)
+        if virtual_base == 0:
+            # not in a process, i.e. a binary file
+            return 0
+        raise InvalidExpression("Module not found in the process: %r" % module)
+
+    def _resolve(self, expr: str, virtual_base: int) -> tuple[str, pdb.PDB7, str, int]:
+        """(module, PDB, expression without the module names, base) of `expr`"""
+        module, sub_expr = self._module_of(expr)
+        return module, self._module_pdb(module), sub_expr, self._module_base(module, virtual_base)
+
+    def _address_index_at(self, addr: int, virtual_base: int) -> tuple[AddressIndex, int, str]:
+        """address index of the module `addr` is in, its base, and the prefix of the names"""
+        bases = self._module_bases
+        if self._modules and bases is not None and (found := bases.locate(addr)) is not None:
+            name, base = found
+            if name in self._modules:
+                return get_address_index(self._modules[name].pdb), base, name + "!"
+        return get_address_index(self._pdb), virtual_base, ""
+
+    def watch_folder(self, folder=""):
+        """PDBs built into `folder` are converted into the cache"""
+        if not folder:
+            folder = QtWidgets.QFileDialog.getExistingDirectory(
+                self.app,
+                caption="Watch Build Folder",
+            )
+        if folder:
+            self._watcher.addPath(folder)
+            self.app.app_setting.setValue("LoadPdb/watch_folders", self._watcher.directories())
+            self._watch_timer.start()
+
+    def unwatch_folders(self):
+        if paths := self._watcher.directories() + self._watcher.files():
+            self._watcher.removePaths(paths)
+        self.app.app_setting.remove("LoadPdb/watch_folders")
+
+    def _scan_watched_folders(self):
+        pdbs = [str(f) for folder in self._watcher.directories() for f in Path(folder).glob("*.pdb")]
+        # an incremental link rewrites the file in place, not seen by the folder
+        watched = set(self._watcher.files())
+        if new := [f for f in pdbs if f not in watched]:
+            self._watcher.addPaths(new)
+        if pdbs:
+            self._convert_missing(pdbs)
+
+    def load_visualizers(self, filename=""):
+        if not filename:
+            filename, _ = QtWidgets.QFileDialog.getOpenFileName(
+                self.app,
+                caption="Open File",
+                filter="JSON (*.json);;Any (*.*)"
+            )
+        if filename:
+            try:
+                self._visualizers = VisualizerSet(load_visualizers(filename))
+            except Exception as e:
                 QtWidgets.QMessageBox.warning(
                     self.app,
                     self.__class__.__name__,
-                    str(expt),
-                )
-
-            path = Path(filename)
-            if path.suffix == ".pdbin":
-                self.app.exec_async(
-                    picklepdb.load_pdbin,
-                    filename,
-                    finished_cb=_cb,
-                    errored_cb=_err,
-                )
-            elif path.suffix == ".pdb":
-                self.app.exec_async(
-                    pdb.parse,
-                    filename,
-                    finished_cb=_cb,
-                    errored_cb=_err,
+                    str(e),
                 )
-            self._loading = True
-            self.app.statusBar().showMessage("Loading... %r" % filename)
+                return
+            self.app.app_setting.setValue("LoadPdb/visualizers", filename)
+            self.app.statusBar().showMessage("Visualizers are Loaded.")
 
     def is_loading(self):
         return self._loading
@@ -343,10 +952,15 @@ class LoadPdb(Plugin):
 
     def show_status(self):
         if self._pdb_fname:
+            msg = "Loaded File: %r" % self._source_fname
+            if self._pdb_fname != self._source_fname:
+                msg += "\nConverted: %r" % self._pdb_fname
+            for m in self._modules.values():
+                msg += "\nModule %r: %r" % (m.name, m.source)
             QtWidgets.QMessageBox.information(
                 self.app,
                 "PDB Status",
-                "Loaded File: %r" % self._pdb_fname,
+                msg,
             )
         else:
             QtWidgets.QMessageBox.warning(
@@ -355,105 +969,328 @@ class LoadPdb(Plugin):
                 "Not loaded",
             )
 
-    def get_global_symbols(self) -> dict[str, int]:
-        symbols = {}
-        for name in self._pdb.glb_stream.symbols.keys():
-            if name.startswith("_") or name.endswith("$"):
-                # exclude built-in special symbols
-                continue
-            try:
-                _, off = self._pdb._get_glb(name)
-            except IndexError:
-                print(name)
-            else:
-                symbols[name] = off
-        return symbols
+    def _onCompletionIndexBuilt(self, index: tuple[pdb.PDB7, CompletionIndex] | None):
+        if index is not None and index[0] is self._pdb:
+            self._completion = index[1]
 
-    def _duplicate_as_array(self, expr: str, s: pdb.StructRecord, count: int) -> ViewStruct:
-        if count > 1:
-            s["levelname"] = "[0]"
-            childs = [s]
-            backup = pickle.dumps(s)
-            for n in range(1, count):
-                copied = pickle.loads(backup)
-                copied["levelname"] = "[%d]" % n
-                _shift_addr(copied, n * s["size"])
-                childs.append(copied)
-            s = pdb.new_struct(
-                levelname="%s[%d]" % (expr, count),
-                type="LF_ARRAY",
-                address=s["address"],
-                size=count * s["size"],
-                fields=childs,
-            )
+    def complete_expr(self, text: str, limit=50) -> list[str]:
+        """
+        completions of the expression being typed, each is the whole text completed.
+        global symbols and type names, or the members once after `.` or `->`.
+        """
+        if self._pdb is None:
+            return []
+        lhs, notation, word = split_member_access(text)
+        head = text[: len(text) - len(word)]
+        if notation:
+            if not lhs:
+                return []
+            try:
+                module, lhs = self._module_of(lhs)
+                members = tuple(expr_members(self._module_pdb(module), lhs, notation))
+            except Exception:
+                return []
+            if members not in self._member_indexes:
+                self._member_indexes[members] = CompletionIndex(members)
+            index = self._member_indexes[members]
+        elif word and self._completion is not None:
+            index = self._completion
         else:
-            s["levelname"] = expr
-        _add_expr(s, expr)
-        return s
+            return []
+        return [head + x for x in index.complete(word, limit)]
+
+    def _onSymbolTableBuilt(self, built: tuple[pdb.PDB7, SymbolTable] | None):
+        if built is not None and built[0] is self._pdb:
+            self._symbol_table = built[1]
+            self.symbolTableBuilt.emit()
+
+    def get_symbol_table(self, wait=True) -> SymbolTable | None:
+        """
+        global symbols of the loaded PDB, built once in background after load.
+        without `wait`, None until it is built.
+        """
+        if self._symbol_table is None and wait and self._pdb is not None:
+            self._symbol_table = get_symbol_table(self._pdb)
+        return self._symbol_table
+
+    def get_global_symbols(self) -> Mapping[str, int]:
+        """offset by name, excluding the built-in special symbols, shall not be modified"""
+        return self.get_symbol_table().symbols
 
     def parse_expr_to_struct(self, expr: str, addr=0, count=0, data_size=0, add_dummy_root=False) -> pdb.StructRecord:
         if expr == "":
             return pdb.new_struct()
+        module, expr = self._module_of(expr)
+        if self._pool is not None and not module:
+            return self._pool.run(_parse_expr_to_struct, expr, addr, count, data_size, add_dummy_root)
+        return _parse_expr_to_struct(self._module_pdb(module), expr, addr, count, data_size, add_dummy_root)
+
+    def parse_expr_to_table(self, expr: str, addr=0, count=0, data_size=0) -> list[list[ViewStruct]]:
+        module, expr = self._module_of(expr)
+        if self._pool is not None and not module:
+            return self._pool.run(_parse_expr_to_table, expr, addr, count, data_size)
+        return _parse_expr_to_table(self._module_pdb(module), expr, addr, count, data_size)
+
+    def _visualize(self, struct: ViewStruct, virtual_base=0, io_stream=None, _root: ViewStruct | None=None, p: pdb.PDB7 | None=None) -> bool:
+        """
+        show the containers in `struct` as their visualizer tells, the items are formed
+        only once expanded, and the raw members move to a `[Raw View]` child.
+        return True if any is visualized, its items may change without notice.
+        `p` is the PDB of the module of `struct`, the main one if None.
+        """
+        if not self._visualizers or io_stream is None:
+            return False
+        root = struct if _root is None else _root
+        p = self._pdb if p is None else p
+        if isinstance(struct, LazyRecord) and not struct.formed and self._visualizers.match(struct["type"]) is None:
+            # the members are visualized once formed, the top record then is always queried again
+
+            def _later(rec: ViewStruct):
+                if self._visualize(rec, virtual_base, io_stream, root, p):
+                    root["_depends"] = None
+
+            struct.when_formed(_later)
+            return False
+        if isinstance(struct["fields"], ElementArray):
+            # visualized once an element is formed
+            struct["fields"].prepare = lambda rec: self._visualize(rec, virtual_base, io_stream, p=p)
+            return False
+        found = False
+        for _, c in qtmodel.iter_children(struct["fields"]):
+            found |= self._visualize(c, virtual_base, io_stream, root, p)
+        if not isinstance(struct["fields"], dict) or struct["address"] is None:
+            return found
+        try:
+            plan = self._visualizers.plan(p, struct)
+            if plan is None:
+                return found
+            visual = plan.bind(p, struct, virtual_base, io_stream)
+        except Exception as e:
+            struct["_display"] = "<%s>" % e
+            return found
+
+        def _prepare(rec: ViewStruct, reader: Stream):
+            _add_expr(rec, "(*(%s *)0x%x)" % (rec["type"], rec["address"]))
+            self._visualize(rec, virtual_base, reader, p=p)
+
+        visual.prepare = _prepare
+        raw = struct.copy()
+        raw["levelname"] = "[Raw View]"
+        struct["_visual"] = visual
+        struct["_raw_view"] = raw
+        struct["_display"] = visual.display
+        struct["_count"] = visual.count
+        struct["fields"] = None
+        return True
+
+    def query_struct(self, expr: str, virtual_base: int | None=0, io_stream=None, profile=False) -> ViewStruct:
+        if virtual_base is None:
+            raise ValueError(self.tr("`virtual_base` is None! Maybe forgot to attach to a live process?"))
+        if split_list_expr(expr) is not None:
+            return self.query_list(expr, virtual_base, io_stream)
+        module, p, sub_expr, base = self._resolve(expr, virtual_base)
+        levelname = expr if sub_expr != expr else ""
+        if self._pool is not None and io_stream is not None and not module:
+            struct = self._pool.run_with_memory(_query_struct, io_stream, sub_expr, base, profile=profile, levelname=levelname)
+        else:
+            struct = _query_struct(p, sub_expr, base, io_stream, profile, levelname)
+        struct["_pdb_serial"] = self._pdb_serial
+        struct["_module"] = module
+        if self._visualize(struct, base, io_stream, p=p):
+            struct["_depends"] = None
+        return struct
 
-        s = query_struct_from_expr(self._pdb, expr, addr)
-        if count == 0:
-            count = data_size // s["size"]
-        s = self._duplicate_as_array(expr, s, count)
-
-        if add_dummy_root:
-            s = pdb.new_struct(
-                fields=[s],
+    def query_structs(self, exprs: list[str], virtual_base: int | None=0, io_stream=None, profile=False) -> list[ViewStruct | Exception]:
+        """query all the expressions in one go, a failed one gets its exception in the list"""
+        if virtual_base is None:
+            raise ValueError(self.tr("`virtual_base` is None! Maybe forgot to attach to a live process?"))
+        structs: list[ViewStruct | Exception | None] = [None] * len(exprs)
+        # indexes of the expressions of each module, queried together
+        groups: dict[str, list[int]] = {}
+        resolved = {}
+        for i, expr in enumerate(exprs):
+            try:
+                if split_list_expr(expr) is not None:
+                    structs[i] = self.query_list(expr, virtual_base, io_stream)
+                    continue
+                resolved[i] = self._resolve(expr, virtual_base)
+            except Exception as e:
+                structs[i] = e
+                continue
+            groups.setdefault(resolved[i][0], []).append(i)
+        for module, indexes in groups.items():
+            _, p, _, base = resolved[indexes[0]]
+            results = query_structs_from_exprs(
+                p,
+                [resolved[i][2] for i in indexes],
+                base,
+                io_stream,
+                profile=profile,
             )
-        return s
-
-    def _tabulate_a_struct(self, struct: pdb.StructRecord, count: int, total_byte: int) -> list[ViewStruct]:
-        if isinstance(struct["fields"], list):
-            array = []
-            if count == 0:
-                count = len(struct["fields"])
-            for x in struct["fields"][: count]:
-                cut_pos = len(x["levelname"])
-                row = []
-                _flatten_dict(x, row)
-                for c in row:
-                    c["expr"] = c["expr"][cut_pos:]
-                array.append(row)
-        else:
-            backup = pickle.dumps(struct)
-            if count == 0:
-                count = total_byte // struct["size"]
-            array = []
-            for n in range(max(1, count)):
-                copied = pickle.loads(backup)
-                copied["levelname"] = "[%d]" % n
-                _shift_addr(copied, n * struct["size"])
-                _add_expr(copied, "")
-                row = []
-                _flatten_dict(copied, row)
-                array.append(row)
-        return array
-
-    def parse_expr_to_table(self, expr: str, addr=0, count=0, data_size=0) -> list[ViewStruct]:
-        out_struct = query_struct_from_expr(self._pdb, expr, addr)
-        _add_expr(out_struct, "")
-        array = self._tabulate_a_struct(out_struct, count, data_size)
-        return array
-
-    def query_struct(self, expr: str, virtual_base: int | None=0, io_stream=None) -> ViewStruct:
+            for i, struct in zip(indexes, results):
+                structs[i] = struct
+                if isinstance(struct, Exception):
+                    continue
+                struct["levelname"] = exprs[i]
+                struct["_pdb_serial"] = self._pdb_serial
+                struct["_module"] = module
+                _add_expr(struct, exprs[i])
+                if self._visualize(struct, base, io_stream, p=p):
+                    struct["_depends"] = None
+        return structs
+
+    def query_column(self, expr: str, virtual_base: int | None=0, io_stream=None) -> ArrayColumn:
+        """query a slice expression, ie: `g_table.entries[0:100].refcnt`, the array span is read at once"""
+        if virtual_base is None:
+            raise ValueError(self.tr("`virtual_base` is None! Maybe forgot to attach to a live process?"))
+        _, p, expr, base = self._resolve(expr, virtual_base)
+        return query_column_from_expr(p, expr, base, io_stream)
+
+    def query_aggregate(self, expr: str, virtual_base: int | None=0, io_stream=None) -> int | float:
+        """
+        sum/min/max/count/any/all over a slice, filtered by `where` on the element members
+
+            count(g_pool.items[*] where .state == 3)
+            max(g_pool.items[0:100].latency where .state != 0)
+        """
+        if virtual_base is None:
+            raise ValueError(self.tr("`virtual_base` is None! Maybe forgot to attach to a live process?"))
+        _, p, expr, base = self._resolve(expr, virtual_base)
+        return query_aggregate_from_expr(p, expr, base, io_stream)
+
+    def _member_layout(self, p: pdb.PDB7, ptr_type: str, path: str) -> ViewStruct:
+        """member `path` of the struct `ptr_type` points to, its address is the offset"""
+        return query_struct_from_expr(p, "((%s)0)->%s" % (ptr_type, path), allow_null_pointer=True)
+
+    def query_list(self, expr: str, virtual_base: int | None=0, io_stream=None) -> ViewStruct:
+        """
+        nodes of a linked list as an array of pointers to the nodes
+
+            list(g_head, next)                          from a pointer to the first node
+            list(g_tail, prev, 1000)                    the other way, at most 1000 nodes
+            list_entry(g_mgr.jobs, JOB, link)           LIST_ENTRY list, nodes found as CONTAINING_RECORD does
+            list_entry(g_mgr.jobs, JOB, link, Blink)
+
+        a list ends at a NULL link, or once it links back to the head.
+        """
         if virtual_base is None:
             raise ValueError(self.tr("`virtual_base` is None! Maybe forgot to attach to a live process?"))
-        struct = query_struct_from_expr(self._pdb, expr, virtual_base, io_stream)
-        struct["levelname"] = expr
-        _add_expr(struct, expr)
+        if io_stream is None:
+            raise InvalidExpression("You shall provide a io_stream for the expression: %r" % expr)
+        module, p, sub_expr, base = self._resolve(expr, virtual_base)
+        func, args = split_list_expr(sub_expr) or ("", ())
+        reader = ReadPlanner(io_stream, max_pages=LIST_CACHE_PAGES)
+        if func == "list" and len(args) in {2, 3}:
+            head_expr, next_path, *extra = args
+            head = query_struct_from_expr(p, head_expr, base, reader)
+            if head["is_pointer"]:
+                ptr_type = _remove_extra_paren(head["type"])
+                first = _read_value(head, reader)
+            else:
+                ptr_type = "%s *" % head["type"]
+                first = head["address"]
+            link_offset = 0
+            stop = (0,)
+        elif func == "list_entry" and len(args) in {3, 4, 5}:
+            head_expr, node_type, entry, *extra = args
+            link_name = extra.pop(0) if extra and REG_LINK_NAME.fullmatch(extra[0]) else "Flink"
+            ptr_type = "%s *" % node_type
+            next_path = "%s.%s" % (entry, link_name)
+            link_offset = self._member_layout(p, ptr_type, entry)["address"]
+            head = query_struct_from_expr(p, head_expr, base, reader)
+            head_addr = _list_head_address(head, reader)
+            first = None
+            stop = (0, head_addr)
+        else:
+            raise InvalidExpression(
+                "Shall be list(first, next[, max_len]) or list_entry(head, TYPE, field[, Flink|Blink][, max_len]): %r" % expr
+            )
+        if len(extra) > 1:
+            raise InvalidExpression("Too many arguments: %r" % expr)
+        max_len = evaluate_int_expr(extra[0]) if extra else MAX_LIST_LENGTH
+
+        link = self._member_layout(p, ptr_type, next_path)
+        if not link["is_pointer"]:
+            raise InvalidExpression("Shall be a pointer to the next node: %r" % next_path)
+        next_offset = link["address"]
+        ptr_size = link["size"]
+        if first is None:
+            # the head is a link itself
+            reader.seek(head_addr + next_offset - link_offset)
+            first = int.from_bytes(reader.read(ptr_size), "little")
+
+        nodes = walk_list(reader, first, next_offset, ptr_size, link_offset, stop, max_len)
+        if nodes.end == "cycle":
+            logger.warning("%r: node [%d] links back to node [%d]", expr, len(nodes) - 1, nodes.cycle_to)
+        elif nodes.end != "null" and nodes.end != "head":
+            logger.warning("%r: stopped at %d nodes, %s", expr, len(nodes), nodes.end)
+
+        fields = []
+        for i, addr in enumerate(nodes.addresses):
+            node = pdb.new_struct(
+                levelname="[%d]" % i,
+                type=ptr_type,
+                value=addr,
+                # the value is the node address, not what the link stores
+                address=None,
+                size=ptr_size,
+                is_pointer=True,
+            )
+            node["expr"] = "((%s%s)0x%x)" % (module + "!" if module else "", ptr_type, addr)
+            fields.append(node)
+        struct = pdb.new_struct(
+            levelname=expr,
+            type="%s[%d]" % (ptr_type, len(nodes)),
+            value=len(nodes),
+            address=None,
+            fields=fields,
+        )
+        struct["expr"] = expr
+        struct["_pdb_serial"] = self._pdb_serial
+        struct["_module"] = module
+        # nodes may change anywhere, walk again on every refresh
+        struct["_depends"] = None
+        struct["_virt_base"] = base
         return struct
 
+    def is_struct_outdated(self, struct: ViewStruct, virtual_base: int | None=0, io_stream=None) -> bool:
+        """check if the address chain of a queried struct has changed, only pointer words are read"""
+        if struct.get("_pdb_serial", None) != self._pdb_serial:
+            return True
+        try:
+            base = self._module_base(struct.get("_module", ""), virtual_base)
+        except InvalidExpression:
+            return True
+        return depends_changed(struct, base, io_stream)
+
+    def reload_structs(self, structs: list[ViewStruct], exprs: list[str], virtual_base: int | None=0, io_stream=None, profile=False) -> list[ViewStruct | Exception | None]:
+        """
+        query again the expressions whose address chain has changed,
+        None is placed for the ones still valid, only their leaf values need refreshing.
+        """
+        reader = None
+        if io_stream is not None:
+            # the pointer words of all the structs in one pass
+            reader = ReadPlanner(io_stream)
+            reader.prefetch((addr, len(data)) for s in structs for addr, data in s.get("_depends", None) or ())
+        outdated = [i for i, s in enumerate(structs) if self.is_struct_outdated(s, virtual_base, reader)]
+        results = [None] * len(structs)
+        if outdated:
+            new_structs = self.query_structs([exprs[i] for i in outdated], virtual_base, io_stream, profile)
+            for i, s in zip(outdated, new_structs):
+                results[i] = s
+        return results
+
     def deref_struct(self, struct: ViewStruct, io_stream: Stream, count=1, casting=False) -> ViewStruct:
         if count == 0:
             raise ValueError("Deref count at least 1, got: %d" % count)
         _type = _remove_extra_paren(struct["type"])
         addr = struct["value"] or _read_value(struct, io_stream)
         expr = "*((%s)%d)" % (_type, addr)
-        out_struct = query_struct_from_expr(self._pdb, expr, io_stream=io_stream)
+        # the type is of the module the struct is from
+        module, _ = self._module_of(struct.get("expr", "") or "")
+        p = self._module_pdb(module)
+        out_struct = query_struct_from_expr(p, expr, io_stream=io_stream)
 
         _expr = _remove_extra_paren(struct.get("expr", "") or "")
         if casting:
@@ -468,16 +1305,17 @@ class LoadPdb(Plugin):
 
         if isinstance(out_struct["fields"], list):
             if count > 1:
-                _arr = self._duplicate_as_array(_expr, out_struct["fields"][0], count)
+                _arr = _duplicate_as_array(_expr, out_struct["fields"][0], count)
                 out_struct["fields"] = _arr["fields"]
                 out_struct["size"] = _arr["size"]
             else:
-                out_struct = self._duplicate_as_array(_expr, out_struct, 1)
+                out_struct = _duplicate_as_array(_expr, out_struct, 1)
         elif isinstance(out_struct["fields"], dict):
-            out_struct = self._duplicate_as_array(_expr, out_struct, count)
+            out_struct = _duplicate_as_array(_expr, out_struct, count)
         # else:
         #     raise NotImplementedError(out_struct["fields"])
 
+        self._visualize(out_struct, 0, io_stream, p=p)
         return out_struct
 
     def deref_function_pointer(self, struct: ViewStruct, io_stream: Stream, count: int, virtual_base=0) -> ViewStruct | None:
@@ -486,48 +1324,103 @@ class LoadPdb(Plugin):
         addr = struct["value"] or _read_value(struct, io_stream)
         if addr == 0:
             return
-        name = self._pdb.get_refname_from_offset(addr - virtual_base)
+        index, base, prefix = self._address_index_at(addr, virtual_base)
+        name = index.refname(addr - base)
         if name is None:
             return
 
         y = struct.copy()
-        y["levelname"] = name
+        y["levelname"] = prefix + name
         y["type"] = struct["type"][:-2] if struct["type"].endswith(" *") else ""
         y["is_pointer"] = False
         y["fields"] = None
         y["address"] = addr
 
         if count > 1:
-            out_struct = self._duplicate_as_array("", y, count)
-            for child in out_struct["fields"]:
-                io_stream.seek(child["address"])
-                val = int.from_bytes(io_stream.read(child["size"]), "little")
-                child["value"] = val
-                child["levelname"] = self._pdb.get_refname_from_offset(val - virtual_base) or "NULL"
+            out_struct = _duplicate_as_array("", y, count)
+            # the whole table in one read, named in one pass
+            size = y["size"]
+            io_stream.seek(addr)
+            data = io_stream.read(count * size)
+            # a table running past the readable memory, the rest is left unnamed
+            values = np.frombuffer(data, column_dtype(size), len(data) // size)
+            names = index.refnames(values, base)
+
+            def _prepare(child: ViewStruct):
+                i = (child["address"] - addr) // size
+                if i >= len(values):
+                    child["value"] = None
+                    return
+                child["value"] = int(values[i])
+                child["levelname"] = prefix + names[i] if names[i] else "NULL"
+
+            out_struct["fields"].prepare = _prepare
             return out_struct
         else:
             x = struct.copy()
             x["fields"] = {
-                name: y,
+                y["levelname"]: y,
             }
             return x
 
     # for scripting
 
     def _insert_fptr_name(self, s: ViewStruct, virtual_base: int=0, io_stream=None):
+        """
+        name the function pointers of `s` by their targets, those of the formed
+        members in one read, the others read again once their members or
+        elements are formed, the target may have run since
+        """
         if io_stream is None:
             return
+        leaves = []
+        self._collect_fptrs(s, leaves, virtual_base, io_stream)
+        if not leaves:
+            return
+        reader = ReadPlanner(io_stream)
+        reader.prefetch((x["address"], x["size"]) for x in leaves if x["value"] is None)
+
+        groups = {}
+        for x in leaves:
+            val = _read_value(x, reader)
+            index, base, prefix = self._address_index_at(val, virtual_base)
+            _, _, _, items, values = groups.setdefault((id(index), base), (index, base, prefix, [], []))
+            items.append(x)
+            values.append(val)
+        for index, base, prefix, items, values in groups.values():
+            names = index.refnames(np.array(values, dtype=np.uint64), base)
+            for x, name in zip(items, names):
+                x["levelname"] = prefix + name if name else ""
+
+    def _collect_fptrs(self, s: ViewStruct, leaves: list[ViewStruct], virtual_base: int, io_stream: Stream):
         if s["is_funcptr"]:
-            val = _read_value(s, io_stream)
-            s["levelname"] = self._pdb.get_refname_from_offset(val - virtual_base) or ""
-        if isinstance(s["fields"], dict):
-            for c in s["fields"].values():
-                self._insert_fptr_name(c, virtual_base)
-        elif isinstance(s["fields"], list):
-            for c in s["fields"]:
-                self._insert_fptr_name(c, virtual_base)
-    
-    def query_cstruct(self, expr: str, virtual_base: int=0, io_stream=None) -> CStruct:
+            leaves.append(s)
+        if isinstance(s, LazyRecord) and not s.formed:
+            s.when_formed(lambda r: self._insert_fptr_name(r, virtual_base, io_stream))
+            return
+        fields = s["fields"]
+        if isinstance(fields, ElementArray):
+            self._name_elements(fields, virtual_base, io_stream)
+        elif isinstance(fields, dict):
+            for c in fields.values():
+                self._collect_fptrs(c, leaves, virtual_base, io_stream)
+        elif isinstance(fields, list):
+            for c in fields:
+                self._collect_fptrs(c, leaves, virtual_base, io_stream)
+
+    def _name_elements(self, arr: ElementArray, virtual_base: int, io_stream: Stream):
+        prepare = arr.prepare
+
+        def _prepare(child: ViewStruct):
+            if prepare:
+                prepare(child)
+            self._insert_fptr_name(child, virtual_base, io_stream)
+
+        arr.prepare = _prepare
+
+    def query_cstruct(self, expr: str, virtual_base: int=0, io_stream=None) -> CStruct | ArrayColumn:
+        if split_slice_expr(expr) is not None:
+            return self.query_column(expr, virtual_base, io_stream)
         s = self.query_struct(expr, virtual_base, io_stream)
         self._insert_fptr_name(s, virtual_base, io_stream)
         return CStruct(s, io_stream)
@@ -11,3 +11,4 @@ pyuic6.exe .\view\WidgetFileSelector.ui -o .\view\WidgetFileSelector.py
 pyuic6.exe .\view\WidgetDockTitleBar.ui -o .\view\WidgetDockTitleBar.py
 pyuic6.exe .\view\WidgetPicklePdb.ui -o .\view\WidgetPicklePdb.py
 pyuic6.exe .\view\WidgetScript.ui -o .\view\WidgetScript.py
+pyuic6.exe .\view\WidgetSymbols.ui -o .\view\WidgetSymbols.py
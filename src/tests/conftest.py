@@ -0,0 +1,98 @@
+"""
+a fake PDB for the tests, the types are dicts named and sized like the LF
+records, one object per type as in a parsed PDB
+"""
+from typing import Any
+from typing import Callable
+
+import pytest
+
+from modules.utils.pdbin import MappedPdb
+from modules.utils.pdbin import write_pdbin
+
+
+def make_record(**kwargs) -> dict:
+    s = dict(levelname="", value=None, type="", address=0, size=0, bitoff=None, bitsize=None,
+             fields=None, is_pointer=False, is_real=False, has_sign=False, lf=None)
+    s.update(kwargs)
+    return s
+
+
+class FakeType(dict):
+    __hash__ = object.__hash__
+    __eq__ = object.__eq__
+
+
+T_INT = FakeType(name="int", size=4)
+ARR = FakeType(name="int[8]", size=32, elem=T_INT, count=8)
+INNER = FakeType(name="Inner", size=36, members=[("n", T_INT, 0), ("arr", ARR, 4)])
+PTR = FakeType(name="Inner *", size=8, target=INNER)
+OUTER = FakeType(name="Outer", size=48, members=[("a", T_INT, 0), ("p", PTR, 4), ("in", INNER, 12)])
+
+
+class FakeTpi:
+    ARCH_PTR_SIZE = 8
+
+    def __init__(self, structs=()) -> None:
+        self.structs = dict.fromkeys(structs)
+        self.calls = 0
+
+    def form_structs(self, lf, addr: int, recursive=True) -> dict:
+        self.calls += 1
+        if "members" in lf:
+            fields = {n: self._member(n, t, addr + off, recursive) for n, t, off in lf["members"]}
+        elif "elem" in lf:
+            fields = [self._member("[%d]" % i, lf["elem"], addr + 4 * i, recursive) for i in range(lf["count"])]
+        else:
+            fields = None
+        return make_record(type=lf["name"], address=addr, size=lf["size"], fields=fields, lf=lf, is_pointer=lf is PTR)
+
+    def _member(self, name, lf, addr, recursive) -> dict:
+        if recursive:
+            s = self.form_structs(lf, addr, recursive)
+        else:
+            s = make_record(type=lf["name"], address=addr, size=lf["size"], lf=lf, is_pointer=lf is PTR)
+        s["levelname"] = name
+        return s
+
+    def deref_pointer(self, lf, addr: int, recursive=True) -> dict:
+        if "target" not in lf:
+            raise ValueError("Shall be a pointer type, got: %r" % lf["name"])
+        return self.form_structs(lf["target"], addr, recursive)
+
+
+class FakeSymbols:
+    def __init__(self, symbols: dict[str, tuple[Any, int]]) -> None:
+        self.symbols = symbols
+
+
+class FakePdb:
+    """
+    `symbols` are the globals, (lf, offset) by name, `types` are looked up by
+    name as well, only the `structs` are listed by the TPI stream
+    """
+
+    def __init__(self, symbols: dict[str, tuple[Any, int]], types: dict[str, Any] | None=None, structs=()) -> None:
+        self.tpi_stream = FakeTpi(structs)
+        self.glb_stream = FakeSymbols(symbols)
+        self.types = types or {}
+        self.lookups = 0
+
+    def get_lf_from_name(self, name: str):
+        self.lookups += 1
+        if name in self.glb_stream.symbols:
+            return self.glb_stream.symbols[name]
+        return self.types.get(name, None), 0
+
+
+@pytest.fixture(params=["pdb", "pdbin"])
+def as_pdb(request, tmp_path) -> Callable[[FakePdb], Any]:
+    """a fake PDB as it is, or written to a pdbin and mapped"""
+
+    def _open(p: FakePdb):
+        if request.param == "pdb":
+            return p
+        write_pdbin(p, tmp_path / "x.pdbin")
+        return MappedPdb(tmp_path / "x.pdbin")
+
+    return _open
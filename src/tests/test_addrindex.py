@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from conftest import FakePdb
+
+from modules.addrindex import AddressIndex
+
+
+@pytest.fixture
+def index(as_pdb) -> AddressIndex:
+    offsets = {"main": 0x1000, "foo": 0x1040, "foo_alias": 0x1040, "bar": 0x1100, "extern_x": 0}
+    return AddressIndex.from_pdb(as_pdb(FakePdb({name: (None, offset) for name, offset in offsets.items()})))
+
+
+@pytest.mark.parametrize(
+    "offset, name",
+    [
+        (0x1000, "main"),
+        (0x1010, "main+0x10"),
+        (0x103f, "main+0x3f"),
+        (0x1100, "bar"),
+        # the last one has no size
+        (0x1104, None),
+        (0xfff, None),
+        (0, None),
+        (-4, None),
+    ]
+)
+def test_refname(index: AddressIndex, offset: int, name: str | None):
+    assert index.refname(offset) == name
+
+
+def test_refnames(index: AddressIndex):
+    values = np.array([0, 0x401000, 0x401010, 0x401100, 0x401104, 0x3fffff], dtype=np.uint64)
+    names = index.refnames(values, 0x400000)
+    assert names == [None, "main", "main+0x10", "bar", None, None]
+    assert names == [index.refname(int(x) - 0x400000) for x in values]
+
+
+def test_alias(index: AddressIndex):
+    # one name for all the offsets of the symbol
+    name = index.refname(0x1040)
+    assert name in {"foo", "foo_alias"}
+    assert index.lookup(0x1044) == (name, 4)
+    assert index.refnames(np.array([0x1040, 0x10ff])) == [name, name + "+0xbf"]
+
+
+def test_empty():
+    index = AddressIndex([], [])
+    assert index.refname(0x1000) is None
+    assert index.refnames(np.array([1, 2], dtype=np.uint32)) == [None, None]
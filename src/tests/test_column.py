@@ -0,0 +1,74 @@
+import io
+import struct
+
+import numpy as np
+import pytest
+
+from modules.utils.column import ArrayColumn
+
+
+def _column(data: bytes, count: int, stride: int, size: int, offset=0, **kw) -> ArrayColumn:
+    return ArrayColumn(
+        expr="arr[0:%d]" % count,
+        type="",
+        address=0x1000 + offset,
+        data=data,
+        offset=offset,
+        stride=stride,
+        count=count,
+        size=size,
+        index=range(count),
+        **kw,
+    )
+
+
+@pytest.mark.parametrize(
+    "fmt, size, has_sign, is_real",
+    [
+        ("<i", 4, True, False),
+        ("<I", 4, False, False),
+        ("<h", 2, True, False),
+        ("<q", 8, True, False),
+        ("<d", 8, True, True),
+        ("<f", 4, True, True),
+    ]
+)
+def test_strided_values(fmt: str, size: int, has_sign: bool, is_real: bool):
+    # struct { pad[3]; value; pad[5]; }
+    stride = 3 + size + 5
+    values = [-2, -1, 0, 1, 2] if has_sign else [0, 1, 2, 0xFFFF, 7]
+    data = b"".join(b"\xAA" * 3 + struct.pack(fmt, v) + b"\xBB" * 5 for v in values)
+    column = _column(data, len(values), stride, size, offset=3, has_sign=has_sign, is_real=is_real)
+    assert list(column) == values
+    assert column[1] == values[1]
+    assert list(column.addresses) == [0x1003 + stride * n for n in range(len(values))]
+
+
+def test_reversed_values():
+    data = struct.pack("<5i", *range(5))
+    column = _column(data, 5, -4, 4, offset=16, has_sign=True)
+    assert list(column) == [4, 3, 2, 1, 0]
+
+
+def test_bitfield_values():
+    data = struct.pack("<4I", *(n << 3 | 0b101 for n in range(4)))
+    column = _column(data, 4, 4, 4, bitoff=3, bitsize=2)
+    assert list(column) == [0, 1, 2, 3]
+
+
+def test_member_columns():
+    data = struct.pack("<iHxx", 1, 2) + struct.pack("<iHxx", 3, 4)
+    column = _column(data, 2, 8, 8)
+    column.fields = {
+        "a": _column(data, 2, 8, 4, has_sign=True),
+        "b": _column(data, 2, 8, 2, offset=4),
+    }
+    assert column.leaves() == [column.fields["a"], column.fields["b"]]
+    assert list(column.a) == [1, 3]
+    assert list(column["b"]) == [2, 4]
+    assert np.sum(column.b) == 6
+
+    stream = io.BytesIO(bytes(0x1000) + struct.pack("<iHxx", 5, 6) + struct.pack("<iHxx", 7, 8))
+    column.reload(stream)
+    assert list(column.a) == [5, 7]
+    assert list(column.b) == [6, 8]
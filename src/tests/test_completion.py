@@ -0,0 +1,50 @@
+import pytest
+
+from modules.utils.completion import CompletionIndex
+from modules.utils.completion import split_member_access
+
+
+@pytest.fixture
+def index():
+    return CompletionIndex([
+        "gMessage", "g_MessageQueue", "g_msg_count", "gA", "gB",
+        "MessageHandler", "TextHolder", "g_Message", "gMessage",
+    ])
+
+
+def test_prefix(index):
+    assert index.prefix("g_mes") == ["g_Message", "g_MessageQueue"]
+    assert index.prefix("gM") == ["gMessage"]
+    assert index.prefix("xyz") == []
+    assert len(index.prefix("g", limit=2)) == 2
+
+
+def test_fuzzy(index):
+    out = index.fuzzy("gmq")
+    assert out[0] == "g_MessageQueue"
+    assert "gA" not in out
+    # word starts first
+    assert index.fuzzy("mh")[0] == "MessageHandler"
+    assert index.fuzzy("") == []
+
+
+def test_complete(index):
+    out = index.complete("txh")
+    assert out == ["TextHolder"]
+    assert index.complete("gA")[0] == "gA"
+    assert len(set(index.complete("g"))) == len(index.complete("g"))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("gA", ("", "", "gA")),
+    ("gA.", ("gA", ".", "")),
+    ("gA.s->szB", ("gA.s", "->", "szB")),
+    ("gB.s[1].d", ("gB.s[1]", ".", "d")),
+    ("(T *)gB.s[1].d", ("gB.s[1]", ".", "d")),
+    ("sizeof(g_Mes", ("", "", "g_Mes")),
+    ("gA.b[gB.i].c", ("gA.b[gB.i]", ".", "c")),
+    ("1 + gA->b", ("gA", "->", "b")),
+    ("(gA->p)->q", ("(gA->p)", "->", "q")),
+])
+def test_split_member_access(text, expected):
+    assert split_member_access(text) == expected
@@ -0,0 +1,71 @@
+import pytest
+from conftest import ARR
+from conftest import INNER
+from conftest import OUTER
+from conftest import PTR
+from conftest import T_INT
+from conftest import FakePdb
+
+from modules.layoutcache import get_layout_cache
+
+
+def _pdb() -> FakePdb:
+    return FakePdb({"gOuter": (OUTER, 0x100)}, {"Outer": OUTER})
+
+
+def test_formed_once():
+    p = _pdb()
+    cache = get_layout_cache(p)
+    assert get_layout_cache(p) is cache
+    first = cache.form(OUTER, 0x1000)
+    first["fields"]["a"]["value"] = 1
+    calls = p.tpi_stream.calls
+    for addr in range(0, 0x10000, 0x30):
+        s = cache.form(OUTER, addr)
+        assert s["address"] == addr
+        assert s["fields"]["in"]["address"] == addr + 12
+        assert s["fields"]["a"]["value"] is None
+    assert p.tpi_stream.calls == calls == 1
+
+
+def test_array_and_deref():
+    p = _pdb()
+    cache = get_layout_cache(p)
+    arr = cache.form(ARR, 0x200)
+    assert len(arr["fields"]) == 8
+    assert arr["fields"][5]["address"] == 0x214
+    assert arr["fields"][5]["levelname"] == "[5]"
+    assert cache.deref(PTR, 0x400)["fields"]["arr"]["address"] == 0x404
+    assert cache.pointee(PTR) is INNER
+    with pytest.raises(ValueError):
+        cache.pointee(T_INT)
+    calls = p.tpi_stream.calls
+    cache.deref(PTR, 0x800)
+    with pytest.raises(ValueError):
+        cache.pointee(T_INT)
+    assert p.tpi_stream.calls == calls
+
+
+def test_lookup():
+    p = _pdb()
+    cache = get_layout_cache(p)
+    assert cache.lookup("gOuter") == (OUTER, 0x100)
+    assert cache.lookup("gOuter") == (OUTER, 0x100)
+    assert cache.lookup("nothing") == (None, 0)
+    assert p.lookups == 2
+    assert cache.sizeof(OUTER) == 48
+
+
+def test_members():
+    p = _pdb()
+    cache = get_layout_cache(p)
+    assert list(cache.members(OUTER)) == ["a", "p", "in", "in.n", "in.arr"]
+    x = cache.member(OUTER, "in.arr")
+    assert (x.offset, x.size, x.lf) == (16, 32, ARR)
+    assert cache.member(OUTER, "p").target is INNER
+    assert cache.member(OUTER, "in.arr[3]").offset == 28
+    assert cache.member(OUTER, ".in .arr[ 7 ]").offset == 44
+    with pytest.raises(KeyError):
+        cache.member(OUTER, "in.arr[8]")
+    with pytest.raises(KeyError):
+        cache.member(OUTER, "in.x")
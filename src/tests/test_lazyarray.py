@@ -0,0 +1,89 @@
+import pickle
+
+import pytest
+
+from modules.utils.lazyarray import ElementArray
+from modules.utils.lazyarray import ElementRows
+
+
+def _record(levelname: str, address: int, expr="", fields=None) -> dict:
+    return {"levelname": levelname, "address": address, "size": 8, "expr": expr, "fields": fields}
+
+
+@pytest.fixture
+def template() -> dict:
+    return _record("", 0x100, fields={
+        "a": _record("a", 0x100, ".a"),
+        "b": _record("b", 0x104, ".b", [_record("[0]", 0x104, ".b[0]"), _record("[1]", 0x106, ".b[1]")]),
+    })
+
+
+def test_element_array(template):
+    arr = ElementArray(template, 1000000, 8, "g")
+    assert len(arr) == 1000000
+    assert isinstance(arr, list) and arr
+    last = arr[-1]
+    assert last["levelname"] == "[999999]"
+    assert last["address"] == 0x100 + 999999 * 8
+    assert last["fields"]["b"]["fields"][1]["expr"] == "g[999999].b[1]"
+    assert last["fields"]["b"]["fields"][1]["address"] == 0x106 + 999999 * 8
+    # formed once, the view keeps its state
+    assert arr[999999] is last
+    assert template["fields"]["a"]["address"] == 0x100
+    with pytest.raises(IndexError):
+        arr[1000000]
+    with pytest.raises(TypeError):
+        arr.append({})
+
+
+def test_element_array_slice(template):
+    arr = ElementArray(template, 250, 8)
+    view = arr[200: 300]
+    assert len(view) == 50
+    assert view[0] is arr[200]
+    assert [x["levelname"] for x in view[48:]] == ["[248]", "[249]"]
+    assert len(arr[:10] + arr[20:]) == 240
+    assert arr[:3] == [arr[0], arr[1], arr[2]]
+    assert arr[:0] == []
+
+
+def test_element_array_pickle(template):
+    arr = ElementArray(template, 10, 8, "g")
+    arr[3]["value"] = 1
+    copied = pickle.loads(pickle.dumps(arr))
+    assert copied._cache == {}
+    assert copied[3]["expr"] == arr[3]["expr"]
+    assert copied[3]["address"] == arr[3]["address"]
+
+
+def test_element_array_prepare(template):
+    arr = ElementArray(template, 10, 8)
+    formed = []
+    arr.prepare = formed.append
+    arr[2:][5]
+    assert [x["levelname"] for x in formed] == ["[7]"]
+
+
+def test_element_rows():
+    leaves = [_record("a", 0x10, ".a"), _record("b", 0x14, ".b")]
+    rows = ElementRows(leaves, 100000, 8)
+    assert len(rows) == 100000
+    assert [(x["expr"], x["address"]) for x in rows[99999]] == [(".a", 0x10 + 99999 * 8), (".b", 0x14 + 99999 * 8)]
+    assert rows != []
+    # an element being a leaf itself is named by its index
+    rows = ElementRows([_record("x", 0x10, "")], 4, 8)
+    assert [r[0]["levelname"] for r in rows] == ["[0]", "[1]", "[2]", "[3]"]
+
+
+def test_element_rows_bounded():
+    rows = ElementRows([_record("a", 0x10, ".a")], 100, 8, max_cached=3)
+    first = rows[0]
+    view = rows[10:]
+    for i in range(1, 6):
+        view[i]
+    assert len(rows._cache) == 3 and list(rows._cache) == [13, 14, 15]
+    # formed again once evicted
+    assert rows[0] is not first and rows[0] == first
+    copied = pickle.loads(pickle.dumps(rows))
+    assert copied.max_cached == 3 and copied[99][0]["address"] == 0x10 + 99 * 8
+    assert len(ElementRows([], 10, 8, max_cached=None)._cache) == 0
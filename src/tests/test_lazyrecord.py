@@ -0,0 +1,79 @@
+import pickle
+
+import pytest
+
+from modules.utils.lazyrecord import LazyRecord
+from modules.utils.record import Record
+
+
+def _former(calls: list):
+    def _form(record: dict) -> dict:
+        calls.append(record["levelname"])
+        return {"x": {"levelname": "x", "address": record["address"], "fields": None}}
+    return _form
+
+
+def test_formed_once_accessed():
+    calls = []
+    rec = LazyRecord({"levelname": "a", "address": 0x10, "fields": None}, _former(calls))
+    assert not rec.formed
+    assert rec["levelname"] == "a"
+    assert "fields" in rec
+    assert calls == []
+    assert rec["fields"]["x"]["address"] == 0x10
+    assert rec.get("fields")["x"]["levelname"] == "x"
+    assert calls == ["a"]
+    assert rec.formed
+
+
+def test_when_formed():
+    calls = []
+    rec = LazyRecord({"levelname": "a", "address": 0, "fields": None}, _former(calls))
+    seen = []
+    rec.when_formed(lambda r: seen.append(r["expr"]))
+    rec["expr"] = "gA"
+    assert seen == []
+    list(rec.items())
+    assert seen == ["gA"]
+    rec.when_formed(lambda r: seen.append(2))
+    assert seen == ["gA", 2]
+
+
+def test_fields_written_first():
+    calls = []
+    rec = LazyRecord({"levelname": "a", "address": 0, "fields": None}, _former(calls))
+    rec.when_formed(lambda r: calls.append("deferred"))
+    rec["fields"] = None
+    assert rec["fields"] is None
+    rec = LazyRecord({"levelname": "b", "address": 0}, _former(calls))
+    rec.update({"fields": []})
+    assert rec["fields"] == []
+    assert calls == []
+
+
+def test_copy_and_merge():
+    calls = []
+    rec = LazyRecord({"levelname": "a", "address": 4}, _former(calls))
+    copied = rec.copy()
+    assert isinstance(copied, LazyRecord) and not copied.formed
+    assert calls == []
+    item = {}
+    item.update(rec)
+    assert item["fields"]["x"]["address"] == 4
+    assert dict(copied) == item
+    assert calls == ["a", "a"]
+
+
+def test_pickle():
+    calls = []
+    rec = LazyRecord({"levelname": "a", "address": 4}, _former(calls))
+    copied = pickle.loads(pickle.dumps(rec))
+    assert isinstance(copied, LazyRecord) and not copied.formed
+    assert calls == []
+    with pytest.raises(RuntimeError):
+        copied["fields"]
+    copied.bind(_former(calls))
+    assert copied == rec
+    assert calls == ["a", "a"]
+    # formed, a plain record
+    assert type(pickle.loads(pickle.dumps(rec))) is Record
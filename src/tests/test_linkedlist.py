@@ -0,0 +1,137 @@
+import io
+import itertools
+import struct
+
+import pytest
+
+from modules.utils.linkedlist import ListNodes
+from modules.utils.linkedlist import iter_list
+from modules.utils.linkedlist import walk_list
+from modules.utils.linkedlist import walk_tree
+from modules.utils.readplan import ReadPlanner
+
+
+class Memory(io.BytesIO):
+    def __init__(self, size=0x40000) -> None:
+        super().__init__(bytes(size))
+        self.reads = 0
+
+    def read(self, size: int) -> bytes:
+        self.reads += 1
+        return super().read(size)
+
+    def put_ptr(self, addr: int, ptr: int):
+        self.seek(addr)
+        self.write(struct.pack("<Q", ptr))
+
+
+def _chain(mem: Memory, nodes: list[int], next_offset: int, link_offset=0, last=0):
+    """link `nodes` in order, the last one links to `last`"""
+    for node, nxt in zip(nodes, nodes[1:] + [None]):
+        mem.put_ptr(node + next_offset, last if nxt is None else nxt + link_offset)
+
+
+@pytest.fixture
+def mem() -> Memory:
+    return Memory()
+
+
+def test_singly_linked(mem: Memory):
+    nodes = [0x1000 + 0x20 * i for i in range(1000)]
+    _chain(mem, nodes, next_offset=8)
+    result = walk_list(mem, nodes[0], next_offset=8)
+    assert result.addresses == nodes
+    assert result.end == "null"
+    # nodes next to each other are fetched in a few block reads
+    assert mem.reads <= 2
+
+
+def test_scattered_list(mem: Memory):
+    # a node every other page, no read ahead and only the last pages kept
+    nodes = [0x1000 * i + 0x10 for i in range(1, 0x40, 2)]
+    _chain(mem, nodes, next_offset=8)
+    reader = ReadPlanner(mem, max_pages=4)
+    result = walk_list(reader, nodes[0], next_offset=8)
+    assert result.addresses == nodes
+    assert reader.read_bytes == len(nodes) * 0x1000
+    assert len(reader._pages) <= 4
+
+
+def test_iter_list(mem: Memory):
+    # a node every other page, each taken node costs one more read
+    nodes = [0x1000 * i + 0x10 for i in range(1, 0x40, 2)]
+    _chain(mem, nodes, next_offset=8)
+    found = ListNodes()
+    assert list(itertools.islice(iter_list(mem, nodes[0], 8, nodes=found), 3)) == nodes[:3]
+    assert found.addresses == nodes[:3]
+    assert mem.reads <= 3
+
+    found = ListNodes()
+    assert list(iter_list(mem, nodes[0], 8, nodes=found)) == nodes
+    assert found.end == "null"
+
+
+def test_intrusive_list(mem: Memory):
+    # LIST_ENTRY at offset 0x10 of the node, the head is a LIST_ENTRY at 0x100
+    head = 0x100
+    nodes = [0x3000, 0x1800, 0x2400]
+    _chain(mem, nodes, next_offset=0x10, link_offset=0x10, last=head)
+    result = walk_list(mem, nodes[0] + 0x10, next_offset=0x10, link_offset=0x10, stop=(0, head))
+    assert result.addresses == nodes
+    assert result.end == "head"
+
+
+def test_circular_list(mem: Memory):
+    nodes = [0x1000, 0x1100, 0x1200]
+    _chain(mem, nodes, next_offset=0, last=nodes[0])
+    result = walk_list(mem, nodes[0], next_offset=0)
+    assert result.addresses == nodes
+    assert result.end == "head"
+
+
+def test_cycle(mem: Memory):
+    nodes = [0x1000, 0x1100, 0x1200, 0x1300]
+    _chain(mem, nodes, next_offset=0, last=nodes[2])
+    result = walk_list(mem, nodes[0], next_offset=0)
+    assert result.addresses == nodes
+    assert (result.end, result.cycle_to) == ("cycle", 2)
+
+
+def test_max_len(mem: Memory):
+    nodes = [0x1000 + 0x10 * i for i in range(100)]
+    _chain(mem, nodes, next_offset=0)
+    result = walk_list(mem, nodes[0], next_offset=0, max_len=10)
+    assert result.addresses == nodes[:10]
+    assert result.end == "max_len"
+
+
+def test_unreadable_link(mem: Memory):
+    mem.put_ptr(0x1000, 0x80000)
+    result = walk_list(mem, 0x1000, next_offset=0)
+    assert result.addresses == [0x1000, 0x80000]
+    assert result.end == "unreadable"
+
+
+def test_tree_in_order(mem: Memory):
+    #        0x1040
+    #       /      \
+    #   0x1000    0x1080
+    #       \
+    #      0x1020
+    left, right = 0x8, 0x10
+    mem.put_ptr(0x1040 + left, 0x1000)
+    mem.put_ptr(0x1040 + right, 0x1080)
+    mem.put_ptr(0x1000 + right, 0x1020)
+    result = walk_tree(mem, 0x1040, left, right)
+    assert result.addresses == [0x1000, 0x1020, 0x1040, 0x1080]
+    assert result.end == "null"
+    result = walk_tree(mem, 0x1040, left, right, max_len=2)
+    assert result.addresses == [0x1000, 0x1020]
+    assert result.end == "max_len"
+
+
+def test_tree_cycle(mem: Memory):
+    mem.put_ptr(0x1000 + 0x8, 0x1020)
+    mem.put_ptr(0x1020 + 0x8, 0x1000)
+    result = walk_tree(mem, 0x1000, 0x8, 0x10)
+    assert result.end == "cycle"
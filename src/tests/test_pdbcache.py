@@ -0,0 +1,70 @@
+import os
+import struct
+import uuid
+
+import pytest
+
+from modules import pdbcache
+from modules.pdbcache import PdbinCache
+from modules.pdbcache import read_guid_age
+
+GUID = uuid.UUID("12345678-9abc-def0-1122-334455667788")
+BLOCK = 512
+
+
+def _write_pdb(filename, age: int, extra: bytes=b""):
+    # superblock, block map, directory, stream 0 (empty), stream 1 (PDB info)
+    info = struct.pack("<III16s", 20000404, 0, age, GUID.bytes_le) + extra
+    directory = struct.pack("<III", 2, 0xFFFFFFFF, len(info)) + struct.pack("<I", 3)
+    head = struct.pack("<32sIIIIII", pdbcache.MSF_MAGIC, BLOCK, 1, 4, len(directory), 0, 1)
+    blocks = [head, struct.pack("<I", 2), directory, info]
+    with open(filename, "wb") as fs:
+        fs.write(b"".join(x.ljust(BLOCK, b"\0") for x in blocks))
+
+
+def test_guid_age(tmp_path):
+    _write_pdb(tmp_path / "a.pdb", 3)
+    assert read_guid_age(tmp_path / "a.pdb") == ("123456789ABCDEF01122334455667788", 3)
+    (tmp_path / "b.pdb").write_bytes(b"Microsoft C/C++ program database 2.00\r\n")
+    with pytest.raises(ValueError):
+        read_guid_age(tmp_path / "b.pdb")
+
+
+def test_signature(tmp_path, monkeypatch):
+    pdb_file = tmp_path / "a.pdb"
+    _write_pdb(pdb_file, 3)
+    cache = PdbinCache(tmp_path / "cache")
+    sig = cache.signature(pdb_file)
+    assert sig.key.startswith("123456789ABCDEF011223344556677883-")
+
+    # not read again until modified
+    monkeypatch.setattr(pdbcache, "file_digest", lambda f: pytest.fail("hashed again"))
+    assert not cache.is_stale(pdb_file)
+    assert PdbinCache(tmp_path / "cache").signature(pdb_file) == sig
+    monkeypatch.undo()
+
+    # rebuilt with the same GUID and age
+    _write_pdb(pdb_file, 3, b"changed")
+    os.utime(pdb_file, ns=(0, 1))
+    assert cache.is_stale(pdb_file)
+    assert cache.path_of(pdb_file) != tmp_path / "cache" / ("a-%s.pdbin" % sig.key)
+
+
+def test_lookup_prune(tmp_path):
+    cache = PdbinCache(tmp_path / "cache", max_entries=2)
+    files = []
+    for i in range(3):
+        files.append(tmp_path / ("m%d.pdb" % i))
+        _write_pdb(files[-1], i)
+    assert cache.missing(files + [tmp_path / "none.pdb"]) == [str(x) for x in files]
+
+    cache.dir.mkdir(exist_ok=True)
+    for i, f in enumerate(files):
+        cache.path_of(f).write_bytes(b"PDBIN\x00\x02\x00")
+        os.utime(cache.path_of(f), ns=(i, i))
+    assert cache.missing(files) == []
+    assert cache.lookup(files[0]) == cache.path_of(files[0])
+
+    # m0 is used last, m1 is the least recently used
+    cache.prune()
+    assert sorted(x.name for x in cache.dir.glob("*.pdbin")) == sorted([cache.path_of(files[0]).name, cache.path_of(files[2]).name])
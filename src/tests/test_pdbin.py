@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from conftest import INNER
+from conftest import OUTER
+from conftest import T_INT
+from conftest import FakePdb
+from conftest import FakeTpi
+from conftest import FakeType
+
+from modules.utils.pdbin import MappedPdb
+from modules.utils.pdbin import TypeRef
+from modules.utils.pdbin import is_pdbin_v2
+from modules.utils.pdbin import write_pdbin
+
+UNUSED = FakeType(name="Unused", size=4, members=[("x", T_INT, 0)])
+
+
+def _pdb() -> FakePdb:
+    return FakePdb(
+        {"gOuter": (OUTER, 0x100), "gCount": (T_INT, 0x200), "main": (None, 0x1000)},
+        {"Outer": OUTER, "Inner": INNER, "Unused": UNUSED},
+        structs=["Outer", "Inner"],
+    )
+
+
+def _strip_lf(rec):
+    if isinstance(rec, dict):
+        return {k: _strip_lf(v) for k, v in rec.items() if k != "lf"}
+    if isinstance(rec, list):
+        return [_strip_lf(x) for x in rec]
+    return rec
+
+
+@pytest.fixture
+def mapped(tmp_path) -> MappedPdb:
+    filename = tmp_path / "x.pdbin"
+    write_pdbin(_pdb(), filename)
+    assert is_pdbin_v2(filename)
+    return MappedPdb(filename)
+
+
+def test_lookup(mapped: MappedPdb):
+    assert mapped.file._layouts == {}
+    lf, offset = mapped.get_lf_from_name("gOuter")
+    assert isinstance(lf, TypeRef) and offset == 0x100
+    assert mapped.get_lf_from_name("Outer")[0] is lf
+    assert mapped.get_lf_from_name("main") == (None, 0x1000)
+    assert mapped.get_lf_from_name("Unused") == (None, 0)
+    assert sorted(mapped.glb_stream.symbols.keys()) == ["gCount", "gOuter", "main"]
+    assert "gCount" in mapped.glb_stream.symbols and "Outer" not in mapped.glb_stream.symbols
+    assert sorted(mapped.tpi_stream.structs) == ["Inner", "Outer"]
+    assert mapped.get_refname_from_offset(0x200) == "gCount"
+    assert mapped.get_refname_from_offset(0x204) is None
+    assert mapped.tpi_stream.ARCH_PTR_SIZE == 8
+    assert mapped.file._layouts == {}
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_form_structs(mapped: MappedPdb, recursive: bool):
+    tpi = FakeTpi()
+    lf, _ = mapped.get_lf_from_name("Outer")
+    s = mapped.tpi_stream.form_structs(lf, 0x100, recursive=recursive)
+    assert _strip_lf(s) == _strip_lf(tpi.form_structs(OUTER, 0x100, recursive=recursive))
+    assert len(mapped.file._layouts) == (1 if not recursive else 4)
+
+
+def test_deref(mapped: MappedPdb):
+    lf, _ = mapped.get_lf_from_name("Outer")
+    ptr = mapped.tpi_stream.form_structs(lf, 0, recursive=False)["fields"]["p"]["lf"]
+    s = mapped.tpi_stream.deref_pointer(ptr, 0x400, recursive=False)
+    assert s["type"] == "Inner" and s["fields"]["arr"]["address"] == 0x404
+    with pytest.raises(ValueError):
+        mapped.tpi_stream.deref_pointer(lf, 0)
+
+
+def test_progress(tmp_path):
+    events = []
+    write_pdbin(_pdb(), tmp_path / "x.pdbin", progress=lambda *args: events.append(args))
+    assert events[0][0] == "types" and events[-1] == ("write", 5, 5)
+
+    def cancel(stage, done, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        write_pdbin(_pdb(), tmp_path / "y.pdbin", progress=cancel)
+    assert sorted(x.name for x in tmp_path.iterdir()) == ["x.pdbin"]
+
+
+def test_parser_errors(tmp_path):
+    p = _pdb()
+    lookup = p.get_lf_from_name
+
+    def get_lf_from_name(name: str):
+        if name == "Inner":
+            raise KeyError(name)
+        return lookup(name)
+
+    # a struct the parser cannot resolve is skipped, still found as a member of Outer
+    p.get_lf_from_name = get_lf_from_name
+    write_pdbin(p, tmp_path / "x.pdbin")
+    mapped = MappedPdb(tmp_path / "x.pdbin")
+    assert sorted(mapped.tpi_stream.structs) == ["Inner", "Outer"]
+
+    def deref_pointer(lf, addr, recursive=True):
+        raise RuntimeError("broken TPI")
+
+    # an error of the parser is not taken as a type not being a pointer
+    p.tpi_stream.deref_pointer = deref_pointer
+    with pytest.raises(RuntimeError):
+        write_pdbin(p, tmp_path / "y.pdbin")
+
+
+def test_preload(mapped: MappedPdb):
+    stop = threading.Event()
+    stop.set()
+    assert mapped.preload_types(stop) == 0 and mapped.file._layouts == {}
+    # one already decoded by a query is kept
+    lf, _ = mapped.get_lf_from_name("gCount")
+    layout = mapped.tpi_stream.form_structs(lf, 0x200)
+    # Outer and Inner are left
+    assert mapped.preload_types() == 2
+    assert len(mapped.file._layouts) == 3
+    assert mapped.tpi_stream.form_structs(lf, 0x200) == layout
+    assert mapped.preload_types() == 0
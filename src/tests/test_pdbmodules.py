@@ -0,0 +1,48 @@
+import pytest
+from conftest import FakePdb
+
+from modules.pdbmodules import ModuleBases
+from modules.pdbmodules import ModuleIndex
+from modules.pdbmodules import module_name
+
+
+def _pdb(names: list[str], structs: list[str]) -> FakePdb:
+    return FakePdb(dict.fromkeys(names, (None, 0x1000)), structs=structs)
+
+
+@pytest.mark.parametrize(
+    "filename, name",
+    [
+        ("app.pdb", "app"),
+        ("C:\\bin\\App.exe", "app"),
+        ("/tmp/build/core.dll.pdbin", "core.dll"),
+        ("Core", "core"),
+    ]
+)
+def test_module_name(filename: str, name: str):
+    assert module_name(filename) == name
+
+
+def test_index():
+    index = ModuleIndex([
+        ("app", _pdb(["gApp", "gShared"], ["APP_CTX"])),
+        ("core", _pdb(["gCore", "gShared", "__imp_Sleep"], ["JOB", "APP_CTX"])),
+        ("none", None),
+    ])
+    assert index.modules == ["app", "core", "none"]
+    assert index.owner("gApp") == "app" and index.owner("gCore") == "core"
+    # the first module having it
+    assert index.owner("gShared") == "app" and index.owner("APP_CTX") == "app"
+    assert index.owner("JOB") == "core"
+    assert index.owner("__imp_Sleep") is None
+    assert index.resolve(["list", "gCore", "gApp"]) == "core"
+    assert index.resolve(["x", "y"]) is None
+
+
+def test_bases():
+    bases = ModuleBases({"C:\\bin\\App.exe": 0x400000, "C:\\bin\\core.dll": 0x10000000})
+    assert "app" in bases and bases.get("core") == 0x10000000 and bases.get("ntdll") is None
+    assert bases.locate(0x400010) == ("app", 0x400000)
+    assert bases.locate(0x10000000) == ("core", 0x10000000)
+    assert bases.locate(0x3fffff) is None
+    assert ModuleBases({}).locate(0x400000) is None
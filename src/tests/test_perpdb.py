@@ -0,0 +1,25 @@
+import gc
+
+from modules.utils.perpdb import per_pdb
+
+
+class _Pdb:
+    pass
+
+
+def test_per_pdb():
+    built = []
+
+    @per_pdb
+    def get(p):
+        built.append(p)
+        return object()
+
+    p, q = _Pdb(), _Pdb()
+    assert get(p) is get(p)
+    assert get(p) is not get(q)
+    assert built == [p, q]
+
+    del p, built[:]
+    gc.collect()
+    assert list(get.cache) == [id(q)]
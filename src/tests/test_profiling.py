@@ -0,0 +1,22 @@
+from modules.utils.profiling import ExprProfile
+from modules.utils.profiling import dump_profiles
+
+
+def test_add_values():
+    profile = ExprProfile("gA")
+    profile.add_values(1, 8, 0.5)
+    profile.add_values(2, 16, 0.25)
+    assert (profile.value_reads, profile.value_bytes, profile.value_time) == (3, 24, 0.75)
+
+
+def test_dump_profiles():
+    profiles = [
+        ExprProfile("gA", parse_time=0.001, nodes=1),
+        ExprProfile("gB.s->szBuffer[1]", nodes=4, form_structs=3, reads=1, read_bytes=8),
+    ]
+    header, *lines = dump_profiles(profiles).splitlines()
+    assert header.split()[:3] == ["expr", "parse_time", "nodes"]
+    assert len(lines) == 2
+    assert lines[0].split()[:3] == ["gA", "1.000", "1"]
+    assert lines[1].split()[:7] == ["gB.s->szBuffer[1]", "0.000", "4", "False", "3", "1", "8"]
+    assert len({len(x) for x in [header, *lines]}) == 1
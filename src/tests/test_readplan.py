@@ -0,0 +1,90 @@
+import io
+
+import pytest
+
+from modules.utils.readplan import ReadPlanner
+from modules.utils.readplan import coalesce_ranges
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data: bytes, bad_pages=()):
+        super().__init__(data)
+        self.reads = 0
+        self.bad_pages = set(bad_pages)
+
+    def read(self, size: int) -> bytes:
+        self.reads += 1
+        first = self.tell() // 0x1000
+        last = (self.tell() + size - 1) // 0x1000
+        if self.bad_pages & set(range(first, last + 1)):
+            raise OSError("unreadable memory at %#x" % self.tell())
+        return super().read(size)
+
+
+@pytest.fixture
+def stream() -> CountingStream:
+    return CountingStream(bytes(x & 0xFF for x in range(0x5000)))
+
+
+@pytest.mark.parametrize(
+    "ranges, blocks",
+    [
+        ([(0x10, 4), (0x20, 4)], [(0x0, 0x1000)]),
+        ([(0x10, 4), (0x1FFE, 4)], [(0x0, 0x3000)]),
+        ([(0x10, 4), (0x3000, 4)], [(0x0, 0x1000), (0x3000, 0x1000)]),
+        ([(0x10, 0)], []),
+    ]
+)
+def test_coalesce_ranges(ranges, blocks):
+    assert coalesce_ranges(ranges) == blocks
+
+
+def test_prefetch_fields(stream: CountingStream):
+    reader = ReadPlanner(stream)
+    fields = [(0x100 + 4 * i, 4) for i in range(200)]
+    reader.prefetch(fields)
+    for addr, size in fields:
+        reader.seek(addr)
+        assert reader.read(size) == bytes(x & 0xFF for x in range(addr, addr + size))
+    assert stream.reads == 1
+
+
+def test_read_across_pages(stream: CountingStream):
+    reader = ReadPlanner(stream)
+    reader.seek(0xFFE)
+    assert reader.read(4) == bytes([0xFE, 0xFF, 0x00, 0x01])
+    assert reader.tell() == 0x1002
+    reader.seek(0x4FFE)
+    assert reader.read(4) == bytes([0xFE, 0xFF])
+    assert stream.reads == 2
+
+
+def test_unreadable_page(stream: CountingStream):
+    stream.bad_pages = {1}
+    reader = ReadPlanner(stream)
+    reader.prefetch([(0x10, 4), (0x1010, 4), (0x2010, 4)])
+    reader.seek(0x2010)
+    assert reader.read(1) == b"\x10"
+    with pytest.raises(OSError):
+        reader.seek(0x1010)
+        reader.read(4)
+
+
+def test_max_pages(stream: CountingStream):
+    reader = ReadPlanner(stream, max_pages=2)
+    for addr in (0x10, 0x1010, 0x2010, 0x10):
+        reader.seek(addr)
+        assert reader.read(2) == bytes([0x10, 0x11])
+    # the first page is fetched again once dropped
+    assert stream.reads == 4
+    assert list(reader._pages) == [2, 0]
+
+
+def test_write_invalidates_page(stream: CountingStream):
+    reader = ReadPlanner(stream)
+    reader.seek(0x10)
+    reader.read(4)
+    reader.seek(0x10)
+    reader.write(b"\xAA")
+    reader.seek(0x10)
+    assert reader.read(2) == b"\xAA\x11"
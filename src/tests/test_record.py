@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+from modules.utils.record import Record
+
+
+def test_mapping():
+    rec = Record({"levelname": "a", "address": 0x10, "fields": None, "_role_data": 1})
+    assert rec["address"] == 0x10
+    assert rec.get("value") is None
+    assert "value" not in rec and "_role_data" in rec
+    with pytest.raises(KeyError):
+        rec["value"]
+    assert dict(rec) == {"levelname": "a", "address": 0x10, "fields": None, "_role_data": 1}
+    item = {}
+    item.update(rec)
+    assert item == rec
+    del rec["_role_data"]
+    assert len(rec) == 3
+
+
+def test_flags():
+    rec = Record({"levelname": "a"})
+    assert "_is_invalid" not in rec
+    assert rec.get("_is_invalid", False) is False
+    rec["_is_invalid"] = True
+    rec["_changed_since_prev"] = False
+    assert rec["_is_invalid"] is True
+    assert "_changed_since_prev" in rec and rec["_changed_since_prev"] is False
+    rec["_is_invalid"] = False
+    assert rec["_is_invalid"] is False
+    del rec["_is_invalid"]
+    assert "_is_invalid" not in rec
+    assert rec._extra is None
+
+
+def test_copy():
+    rec = Record({"levelname": "a", "address": 4, "_role_data": {}})
+    rec["_is_invalid"] = True
+    copied = rec.copy()
+    copied["address"] = 8
+    copied["_is_invalid"] = False
+    copied["_x"] = 1
+    assert rec["address"] == 4 and rec["_is_invalid"]
+    assert "_x" not in rec
+    assert copied["_role_data"] is rec["_role_data"]
+
+
+def test_pickle():
+    rec = Record({"levelname": "a", "address": 4, "fields": {"x": Record({"levelname": "x"})}})
+    rec["_refresh_requested"] = True
+    copied = pickle.loads(pickle.dumps(rec))
+    assert type(copied) is Record
+    assert copied == rec
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from conftest import T_INT
+from conftest import FakePdb
+from conftest import FakeType
+
+from modules.symtable import SymbolTable
+from modules.symtable import get_symbol_table
+
+T_MSG = FakeType(name="Message", size=64)
+
+
+def _pdb() -> FakePdb:
+    return FakePdb({
+        "gCount": (T_INT, 0x2000),
+        "gCounter": (T_INT, 0x2010),
+        "gMessage": (T_MSG, 0x2100),
+        "main": (None, 0x1000),
+        "mainCRTStartup": (None, 0x1100),
+        "__imp_Sleep": (None, 0x3000),
+        "x$": (None, 0x3008),
+    })
+
+
+@pytest.fixture
+def table(as_pdb) -> SymbolTable:
+    return SymbolTable.from_pdb(as_pdb(_pdb()))
+
+
+def _names(table: SymbolTable, rows) -> list[str]:
+    return [table.names[i] for i in rows]
+
+
+def test_table(table: SymbolTable):
+    assert table.names == ["gCount", "gCounter", "gMessage", "main", "mainCRTStartup"]
+    assert table.offset("gMessage") == 0x2100 and "__imp_Sleep" not in table
+    assert table.sizes.tolist() == [4, 4, 64, 0, 0]
+    assert [table.type_name(i) for i in table.type_ids.tolist()] == ["int", "int", "Message", "", ""]
+    assert dict(table.symbols) == {name: offset for name, offset in table.items()}
+    assert list(table.items([2])) == [("gMessage", 0x2100)]
+
+
+@pytest.mark.parametrize(
+    "query, names",
+    [
+        (dict(), ["gCount", "gCounter", "gMessage", "main", "mainCRTStartup"]),
+        (dict(prefix="gCount"), ["gCount", "gCounter"]),
+        (dict(prefix="z"), []),
+        (dict(pattern="CRT|^gM"), ["gMessage", "mainCRTStartup"]),
+        (dict(type_name="int"), ["gCount", "gCounter"]),
+        (dict(start=0x1000, end=0x2010), ["gCount", "main", "mainCRTStartup"]),
+        (dict(start=0x2010), ["gCounter", "gMessage"]),
+        (dict(prefix="main", end=0x1100), ["main"]),
+        (dict(prefix="g", type_name="int", pattern="er$"), ["gCounter"]),
+    ]
+)
+def test_select(table: SymbolTable, query: dict, names: list[str]):
+    rows = table.select(**query)
+    assert _names(table, rows) == names
+    # kept for the same query
+    assert table.select(**query) is rows
+    assert not rows.flags.writeable
+
+
+def test_cached():
+    p = _pdb()
+    table = get_symbol_table(p)
+    assert get_symbol_table(p) is table
+    assert table.symbols is table.symbols
+    assert isinstance(table.offsets, np.ndarray)
@@ -1,10 +1,34 @@
+import copy
 import os
 
 import pytest
 
 from modules.pdbparser.pdbparser import pdb
+from modules.expr_parser import ExprPlan
 from modules.expr_parser import InvalidExpression
+from modules.expr_parser import _compile_node
+from modules.expr_parser import _compile_simple_expr
+from modules.expr_parser import compile_expr
+from modules.expr_parser import compile_this_expr
+from modules.expr_parser import depends_changed
+from modules.expr_parser import evaluate_int_expr
+from modules.expr_parser import evaluate_plan
+from modules.expr_parser import expr_members
+from modules.expr_parser import get_syntax_tree
+from modules.expr_parser import global_names
+from modules.expr_parser import query_aggregate_from_expr
+from modules.expr_parser import query_column_from_expr
 from modules.expr_parser import query_struct_from_expr
+from modules.expr_parser import query_structs_from_exprs
+from modules.expr_parser import split_aggregate_expr
+from modules.expr_parser import split_list_expr
+from modules.expr_parser import split_module_expr
+from modules.expr_parser import split_slice_expr
+from modules.utils.lazyarray import ElementArray
+from modules.utils.readplan import ReadPlanner
+from modules.visualizer import VisualizerSet
+from modules.visualizer import parse_visualizers
+from modules.visualizer import split_display
 
 
 class TestStream:
@@ -109,6 +133,8 @@ def test_expr_addr(p: pdb.PDB7, expr: str, expected_addr: int):
         "gB.s[0].szBuffer",
         "gA",
         "sizeof(gA)",
+        "sizeof(struct A *)",
+        "sizeof(A)",
         "(BDefPtr)100",
         "gA.x[0]",
         "offsetof(struct A, arr)",
@@ -117,4 +143,394 @@ def test_expr_addr(p: pdb.PDB7, expr: str, expected_addr: int):
 )
 def test_good_expr(stream: TestStream, p: pdb.PDB7, expr: str):
     result = query_struct_from_expr(p, expr, io_stream=stream, allow_null_pointer=True)
-    assert isinstance(result, dict)
\ No newline at end of file
+    assert isinstance(result, dict)
+
+
+def test_plan_is_cached(p: pdb.PDB7):
+    assert compile_expr(p, "gB.s->szBuffer[1]") is compile_expr(p, "gB.s->szBuffer[1]")
+
+
+@pytest.mark.parametrize(
+    "expr, offset",
+    [
+        ("gB.s->szBuffer", 0),
+        ("gB.s->szBuffer[1]", 1),
+        ("((struct A *)gA.pint)->attr", 0),
+    ]
+)
+def test_plan_reevaluation(p: pdb.PDB7, expr: str, offset: int):
+    for addr in (12, 100):
+        result = query_struct_from_expr(p, expr, io_stream=TestStream(addr))
+        assert result["address"] == addr + offset
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "((struct A *)100)->attr",
+        "((TextHolder)124)[4]",
+        "*((struct A *)100)",
+        "&(B.s->szBuffer)",
+        "A.arr[1][3]",
+        "gA.afunc->c",
+        "gA.s.szBuffer[gA.attr]",
+        "gA.s->szBuffer[gA.attr]",
+        "gB.s[0].szBuffer",
+        "gC.bb",
+        "g_Message.szBuffer[999]",
+    ]
+)
+def test_simple_parser(p: pdb.PDB7, expr: str):
+    def _eval(root):
+        try:
+            return evaluate_plan(p, ExprPlan(expr, root), io_stream=TestStream(12))["address"]
+        except InvalidExpression as e:
+            return str(e)
+
+    root = _compile_simple_expr(p, expr)
+    assert root is not None
+    assert _eval(root) == _eval(_compile_node(p, get_syntax_tree(expr).root_node))
+
+
+@pytest.mark.parametrize(
+    "expr, value",
+    [
+        ("0x10 + 3 * 2", 22),
+        ("-7 / 2", -3),
+        ("-7 % 3", -1),
+        ("1 && 5", 1),
+        ("!0", 1),
+        ("~0", -1),
+        ("~0u", 0xFFFFFFFFFFFFFFFF),
+        ("0x10u - 0x20", 0xFFFFFFFFFFFFFFF0),
+        ("1 << 3 | 0b1", 9),
+        ("1 << 10000000000", 0),
+        ("-8 >> 100", -1),
+        ("0x80u >> 64", 0),
+        ("0xFFFFFFFFFFFFFFFF", 0xFFFFFFFFFFFFFFFF),
+        ("9223372036854775807", 0x7FFFFFFFFFFFFFFF),
+        ("18446744073709551615u", 0xFFFFFFFFFFFFFFFF),
+        ("010", 8),
+        ("1 ? 4 : 9", 4),
+    ]
+)
+def test_int_expr(expr: str, value: int):
+    assert evaluate_int_expr(expr) == value
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "1 / 0",
+        "1.5",
+        "08",
+        "9223372036854775808",
+        "gA",
+    ]
+)
+def test_bad_int_expr(expr: str):
+    with pytest.raises(InvalidExpression):
+        evaluate_int_expr(expr)
+
+
+def test_query_structs(p: pdb.PDB7):
+    exprs = [
+        "gB.s->szBuffer[1]",
+        "gB.s->szBuffer[2]",
+        "gB.s->dwLen",
+        "gB.s",
+        "gA.afunc->c",
+        "gB.s->not_exist",
+    ]
+    results = query_structs_from_exprs(p, exprs, io_stream=TestStream(12))
+    for expr, result in zip(exprs, results):
+        try:
+            expected = query_struct_from_expr(p, expr, io_stream=TestStream(12))
+        except InvalidExpression as e:
+            assert isinstance(result, InvalidExpression)
+            assert str(result) == str(e)
+        else:
+            assert result["address"] == expected["address"]
+            assert result["type"] == expected["type"]
+
+
+class SparseStream:
+    def __init__(self, depends) -> None:
+        self._mem = {addr + i: b for addr, data in depends for i, b in enumerate(data)}
+        self._offset = 0
+
+    def seek(self, offset, *args):
+        self._offset = offset
+        return offset
+
+    def read(self, size):
+        return bytes(self._mem.get(self._offset + i, 0) for i in range(size))
+
+
+@pytest.mark.parametrize(
+    "expr, has_depends",
+    [
+        ("gB.s->szBuffer[1]", True),
+        ("gA.s.szBuffer[gA.attr]", True),
+        ("gA.s.szBuffer[1]", False),
+    ]
+)
+def test_depends_changed(p: pdb.PDB7, expr: str, has_depends: bool):
+    struct = query_struct_from_expr(p, expr, io_stream=TestStream(12))
+    assert bool(struct["_depends"]) == has_depends
+    assert not depends_changed(struct, 0, SparseStream(struct["_depends"]))
+    assert depends_changed(struct, 0x1000, SparseStream(struct["_depends"]))
+    if has_depends:
+        (addr, data), *rest = struct["_depends"]
+        changed = [(addr, bytes(len(data)))] + rest
+        assert depends_changed(struct, 0, SparseStream(changed))
+
+
+def test_depends_changed_batch(p: pdb.PDB7):
+    structs = [query_struct_from_expr(p, expr, io_stream=TestStream(12)) for expr in ("gB.s->szBuffer[1]", "gA.s.szBuffer[gA.attr]")]
+    depends = [x for s in structs for x in s["_depends"]]
+    reader = ReadPlanner(SparseStream(depends))
+    reader.prefetch((addr, len(data)) for addr, data in depends)
+    count = reader.read_count
+    assert not any(depends_changed(s, 0, reader) for s in structs)
+    assert reader.read_count == count
+
+
+@pytest.mark.parametrize(
+    "expr, parts",
+    [
+        ("gA.arr[1:3][2]", ("gA.arr", ("1", "3"), "[2]")),
+        ("((struct A *)100)[0:4:2].attr", ("((struct A *)100)", ("0", "4", "2"), ".attr")),
+        ("g_Message.szBuffer[::-1]", ("g_Message.szBuffer", ("", "", "-1"), "")),
+        ("gA.arr[gA.attr ? 1 : 2]", None),
+        ("gA.s.szBuffer[1]", None),
+    ]
+)
+def test_split_slice_expr(expr: str, parts):
+    assert split_slice_expr(expr) == parts
+
+
+@pytest.mark.parametrize(
+    "expr, count",
+    [
+        ("g_Message.szBuffer[0:8]", 8),
+        ("g_Message.szBuffer[::64]", 4),
+        ("g_Message.szBuffer[8:0:-2]", 4),
+        ("gA.arr[1:3][2]", 2),
+        ("gB.s[0:4].dwLen", 4),
+        ("((struct A *)100)[0:3].s.szBuffer[2]", 3),
+    ]
+)
+def test_slice_column(p: pdb.PDB7, expr: str, count: int):
+    column = query_column_from_expr(p, expr, io_stream=TestStream(12))
+    assert len(column) == count
+    prefix, _, suffix = split_slice_expr(expr)
+    for n, addr in zip(column.index, column.addresses):
+        struct = query_struct_from_expr(p, "%s[%d]%s" % (prefix, n, suffix), io_stream=TestStream(12))
+        assert struct["address"] == addr
+
+
+@pytest.mark.parametrize(
+    "expr, err_msg",
+    [
+        ("gA.attr[0:2]", "Shall be an array or pointer: 'gA.attr'"),
+        ("gB.s[0:]", "Slice of a pointer needs non-negative start and stop: 'gB.s[0:]'"),
+        ("gB.s[0:4]->dwLen", "Only members and constant indexes are allowed after a slice: '->dwLen'"),
+        ("g_Message.szBuffer[0:4:0]", "Slice step cannot be zero: 'g_Message.szBuffer[0:4:0]'"),
+    ]
+)
+def test_bad_slice(p: pdb.PDB7, expr: str, err_msg: str):
+    with pytest.raises(InvalidExpression) as excinfo:
+        query_column_from_expr(p, expr, io_stream=TestStream(12))
+    assert err_msg == str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "expr, parts",
+    [
+        ("count(gA.arr[*])", ("count", "gA.arr[*]", None)),
+        ("max(gB.s[0:4].dwLen where .dwLen < 3)", ("max", "gB.s[0:4].dwLen", ".dwLen < 3")),
+        ("count(gA.arr[*]) + 1", None),
+        ("maximum(gA.arr[*])", None),
+    ]
+)
+def test_split_aggregate_expr(expr: str, parts):
+    assert split_aggregate_expr(expr) == parts
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        ("sum(X.attr)", lambda xs: sum(xs)),
+        ("min(X.attr)", lambda xs: min(xs)),
+        ("max(X.attr where .attr % 2 == 0)", lambda xs: max(x for x in xs if x % 2 == 0)),
+        ("count(X)", lambda xs: len(xs)),
+        ("count(X where .attr > 0)", lambda xs: sum(1 for x in xs if x > 0)),
+        ("count(X where .attr / 2 == -1)", lambda xs: sum(1 for x in xs if int(x / 2) == -1)),
+        ("any(X where .attr == 4)", lambda xs: int(4 in xs)),
+        ("all(X where .attr >= -3)", lambda xs: int(all(x >= -3 for x in xs))),
+        ("all(X.attr)", lambda xs: int(all(xs))),
+    ]
+)
+def test_aggregate(p: pdb.PDB7, expr: str, expected):
+    column_expr = "((struct A *)0x1000)[0:8].attr"
+    column = query_column_from_expr(p, column_expr, io_stream=SparseStream([]))
+    stream = SparseStream([
+        (int(addr), (n - 3).to_bytes(column.size, "little", signed=True))
+        for n, addr in enumerate(column.addresses)
+    ])
+    values = list(query_column_from_expr(p, column_expr, io_stream=stream))
+    expr = expr.replace("X", "((struct A *)0x1000)[0:8]")
+    assert query_aggregate_from_expr(p, expr, io_stream=stream) == expected(values)
+    assert query_struct_from_expr(p, expr, io_stream=stream)["value"] == expected(values)
+
+
+@pytest.mark.parametrize(
+    "expr, err_msg",
+    [
+        ("sum(gA)", "Shall be a slice to sum, ie: a[*]: 'gA'"),
+        ("sum(((struct A *)0x1000)[0:8])", "Shall be a number to sum: '((struct A *)0x1000)[0:8]'"),
+        ("count(((struct A *)0x1000)[0:8] where attr)", "Member shall start with '.' in where: b'attr'"),
+        ("max(((struct A *)0x1000)[0:8].attr where .attr > 100)", "Nothing selected to max: b'max(((struct A *)0x1000)[0:8].attr where .attr > 100)'"),
+    ]
+)
+def test_bad_aggregate(p: pdb.PDB7, expr: str, err_msg: str):
+    with pytest.raises(InvalidExpression) as excinfo:
+        query_aggregate_from_expr(p, expr, io_stream=SparseStream([]))
+    assert err_msg == str(excinfo.value)
+
+
+@pytest.mark.parametrize(
+    "expr, reads",
+    [
+        ("gA.s.szBuffer[1]", 0),
+        ("gB.s->szBuffer[1]", 1),
+        ("gA.s.szBuffer[gA.attr]", 1),
+    ]
+)
+def test_profile(p: pdb.PDB7, expr: str, reads: int):
+    struct = query_struct_from_expr(p, expr, io_stream=TestStream(12), profile=True)
+    profile = struct["_profile"]
+    assert profile.expr == expr
+    assert profile.nodes > 0
+    assert profile.form_structs > 0
+    assert profile.reads == reads
+    assert profile.read_bytes == sum(len(data) for _, data in struct["_depends"])
+    assert profile.wall_time > 0
+    assert query_struct_from_expr(p, expr, io_stream=TestStream(12), profile=True)["_profile"].cached
+    assert "_profile" not in query_struct_from_expr(p, expr, io_stream=TestStream(12))
+
+
+@pytest.mark.parametrize(
+    "expr, parts",
+    [
+        ("list(gHead, next)", ("list", ("gHead", "next"))),
+        ("list(gA.s[0].p, link.next, 0x100)", ("list", ("gA.s[0].p", "link.next", "0x100"))),
+        ("list_entry(&g_mgr.jobs, struct JOB, link, Blink)", ("list_entry", ("&g_mgr.jobs", "struct JOB", "link", "Blink"))),
+        ("list_entry(f(a, b), JOB, link)", ("list_entry", ("f(a, b)", "JOB", "link"))),
+        ("list(gHead, next) + 1", None),
+        ("list(gHead, next", None),
+        ("gList(a, b)", None),
+    ]
+)
+def test_split_list_expr(expr: str, parts):
+    assert split_list_expr(expr) == parts
+
+
+@pytest.mark.parametrize(
+    "expr, parts",
+    [
+        ("app!gA.s->p", ("app", "gA.s->p")),
+        ("App.exe!gA.attr + app!gB", ("app", "gA.attr + gB")),
+        ("((core!struct JOB *)0x10)->link", ("core", "((struct JOB *)0x10)->link")),
+        ("list(core!gHead, next)", ("core", "list(gHead, next)")),
+        ("gA.attr != 3", None),
+        ("!gA.attr && gB", None),
+    ]
+)
+def test_split_module_expr(expr: str, parts):
+    assert split_module_expr(expr) == parts
+
+
+def test_split_module_expr_of_two():
+    with pytest.raises(InvalidExpression):
+        split_module_expr("app!gA + core!gB")
+
+
+def test_global_names():
+    names = global_names("count(g.items[*] where .state == 0x10) + sizeof(struct JOB) + p->next")
+    assert list(names) == ["count", "g", "where", "JOB", "p"]
+
+
+@pytest.mark.parametrize(
+    "expr, same_as",
+    [
+        (".attr", "gA.attr"),
+        ("this.s.szBuffer[2]", "gA.s.szBuffer[2]"),
+        (".s.szBuffer[.attr]", "gA.s.szBuffer[gA.attr]"),
+    ]
+)
+def test_this_expr(p: pdb.PDB7, stream: TestStream, expr: str, same_as: str):
+    lf, _ = p.get_lf_from_name("gA")
+    base = query_struct_from_expr(p, "gA", 0x1000)["address"]
+    plan = compile_this_expr(p, lf, expr)
+    struct = evaluate_plan(p, plan, io_stream=stream, this=base)
+    assert struct["address"] == query_struct_from_expr(p, same_as, 0x1000, stream)["address"]
+
+
+def test_expr_members(p: pdb.PDB7, stream: TestStream):
+    assert expr_members(p, "gA", ".") == list(query_struct_from_expr(p, "gA")["fields"])
+    # no memory read for the pointer
+    assert expr_members(p, "gB.s", "->") == list(query_struct_from_expr(p, "*gB.s", 0, stream)["fields"])
+    with pytest.raises(InvalidExpression):
+        expr_members(p, "gA.nonexist", ".")
+
+
+def test_split_display():
+    assert split_display("size={.size} cap={ .cap, x }") == [
+        ("size=", ".size", "d"),
+        (" cap=", ".cap", "x"),
+    ]
+    assert split_display("{{{f(a, b)}}}") == [("{", "f(a, b)", "d"), ("}", "", "")]
+    with pytest.raises(ValueError):
+        split_display("size={.size")
+
+
+def test_parse_visualizers():
+    vis, = parse_visualizers({"Vector<*>": {"display": "{.size}", "array": {"size": ".size", "pointer": ".data"}}})
+    assert (vis.pattern, vis.kind, vis.items["pointer"]) == ("Vector<*>", "array", ".data")
+    with pytest.raises(ValueError):
+        parse_visualizers({"List<*>": {"list": {"head": ".first"}}})
+    with pytest.raises(ValueError):
+        parse_visualizers({"List<*>": {"list": {"head": ".first", "next": "next"}, "tree": {}}})
+
+
+def test_display_only_visualizer(p: pdb.PDB7, stream: TestStream):
+    struct = query_struct_from_expr(p, "gA", 0x1000, stream)
+    visualizers = VisualizerSet(parse_visualizers({struct["type"]: {"display": "{{A}} attr={.attr,x}"}}))
+    items = visualizers.plan(p, struct).bind(p, struct, 0x1000, stream)
+    assert items.count == 0
+    assert items.display.startswith("{A} attr=0x")
+
+
+def test_array_left_unformed(p: pdb.PDB7, stream: TestStream):
+    struct = query_struct_from_expr(p, "gA.s.szBuffer", 0x1000, stream)
+    fields = struct["fields"]
+    assert isinstance(fields, ElementArray)
+    assert not fields._cache
+    assert fields[255]["address"] == struct["address"] + 255
+
+    struct = query_struct_from_expr(p, "gA", 0x1000, stream)
+    fields = struct["fields"]["s"]["fields"]["szBuffer"]["fields"]
+    assert isinstance(fields, ElementArray)
+    assert not fields._cache
+
+
+def test_visualizer_plans_per_pdb(p: pdb.PDB7, stream: TestStream):
+    struct = query_struct_from_expr(p, "gA", 0x1000, stream)
+    visualizers = VisualizerSet(parse_visualizers({struct["type"]: {"display": "{.attr}"}}))
+    other = copy.copy(p)
+    plan = visualizers.plan(p, struct)
+    # switching to another module keeps the plans of the first one
+    assert visualizers.plan(other, struct) is not plan
+    assert visualizers.plan(p, struct) is plan
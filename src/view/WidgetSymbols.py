@@ -0,0 +1,63 @@
+# Form implementation generated from reading ui file '.\view\WidgetSymbols.ui'
+#
+# Created by: PyQt6 UI code generator 6.4.2
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(560, 420)
+        self.verticalLayout = QtWidgets.QVBoxLayout(Form)
+        self.verticalLayout.setContentsMargins(0, 0, 0, 0)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.lineName = QtWidgets.QLineEdit(parent=Form)
+        self.lineName.setClearButtonEnabled(True)
+        self.lineName.setObjectName("lineName")
+        self.horizontalLayout.addWidget(self.lineName)
+        self.chkRegex = QtWidgets.QCheckBox(parent=Form)
+        self.chkRegex.setObjectName("chkRegex")
+        self.horizontalLayout.addWidget(self.chkRegex)
+        self.lineType = QtWidgets.QLineEdit(parent=Form)
+        self.lineType.setClearButtonEnabled(True)
+        self.lineType.setObjectName("lineType")
+        self.horizontalLayout.addWidget(self.lineType)
+        self.lineFrom = QtWidgets.QLineEdit(parent=Form)
+        self.lineFrom.setMaximumSize(QtCore.QSize(100, 16777215))
+        self.lineFrom.setObjectName("lineFrom")
+        self.horizontalLayout.addWidget(self.lineFrom)
+        self.lineTo = QtWidgets.QLineEdit(parent=Form)
+        self.lineTo.setMaximumSize(QtCore.QSize(100, 16777215))
+        self.lineTo.setObjectName("lineTo")
+        self.horizontalLayout.addWidget(self.lineTo)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.tableSymbols = QtWidgets.QTableView(parent=Form)
+        self.tableSymbols.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tableSymbols.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tableSymbols.setObjectName("tableSymbols")
+        self.tableSymbols.horizontalHeader().setStretchLastSection(True)
+        self.tableSymbols.verticalHeader().setVisible(False)
+        self.verticalLayout.addWidget(self.tableSymbols)
+        self.labelCount = QtWidgets.QLabel(parent=Form)
+        self.labelCount.setObjectName("labelCount")
+        self.verticalLayout.addWidget(self.labelCount)
+
+        self.retranslateUi(Form)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Form"))
+        self.lineName.setPlaceholderText(_translate("Form", "Name prefix"))
+        self.chkRegex.setText(_translate("Form", "Regex"))
+        self.lineType.setPlaceholderText(_translate("Form", "Type"))
+        self.lineFrom.setPlaceholderText(_translate("Form", "From offset"))
+        self.lineTo.setPlaceholderText(_translate("Form", "To offset"))
+        self.labelCount.setText(_translate("Form", "Not loaded"))